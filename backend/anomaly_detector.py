@@ -1,22 +1,113 @@
 """
 Anomali Tespit Sistemi
-Yapılandırılabilir eşiklere dayalı dinamik anomali tespiti
+Yapılandırılabilir eşiklere ve istatistiksel modellere dayalı dinamik anomali tespiti
 """
-import sqlite3
 import json
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
-import random
+from typing import List, Dict, Optional, Tuple
+import uuid
+from anomaly_repository import AnomalyRepository
+from db_pool import DB_PATH, get_pool
+from detector_aggregates import apply_pending_changes
+from id_generator import anomaly_ids
+from partitions import each_order_source
+from statistical_detectors import run_statistical_detectors
+from stock_levels import fetch_low_stock
+
+# Bu sütunlar aynıysa tespit sonucu değişmemiştir ve kayda dokunulmaz
+ANOMALY_COMPARE_COLUMNS = ('severity', 'description', 'cancel_rate_threshold', 'late_shipping_threshold',
+                           'stock_out_threshold')
+ANOMALY_UPDATE_COLUMNS = ANOMALY_COMPARE_COLUMNS + ('date', 'suggestions')
+
+# Grup anomalilerinde ilişkili sipariş de karşılaştırılır (ör. en son iptal edilen sipariş değişti)
+GROUP_COMPARE_COLUMNS = ANOMALY_COMPARE_COLUMNS + ('orderId',)
+GROUP_UPDATE_COLUMNS = ANOMALY_UPDATE_COLUMNS + ('orderId',)
+
+ORDER_SPIKE_TYPE = 'anomaly.orderSpike'
+
+# Kapsam → (özet tablosu, orders sütunu)
+GROUP_SCOPES = {
+    'product': ('detector_daily', 'product'),
+    'customer': ('detector_customer_daily', 'customer'),
+}
+
+# Küçük örneklemlerde (ör. 1 siparişin 1'i iptal) yanlış alarmı önleyen alt sınırlar
+GROUP_MIN_ORDERS = {'product': 5, 'customer': 3}
+GROUP_MIN_CANCELLED = {'product': 3, 'customer': 2}
+GROUP_MIN_LATE_ORDERS = {'product': 5, 'customer': 2}
+SPIKE_MIN_ORDERS = {'product': 10, 'customer': 5}
+
+# Geciken siparişi olan grupların ortalamasının bu katını aşan gruplar raporlanır; geniş katalogda
+# her gruptaki birkaç gecikme yerine gerçekten öne çıkan ürün/müşteriler görünür
+LATE_OUTLIER_FACTOR = 3.0
+
+# Son 24 saatteki sipariş, önceki günlerin günlük ortalamasının bu katını aşarsa artış sayılır
+SPIKE_FACTOR = 3.0
+SPIKE_BASELINE_DAYS = 7
+
+GROUP_SUGGESTIONS = {
+    ('anomaly.highCancelRate', 'product'): [
+        "Ürün açıklamasını ve görsellerini gözden geçirin",
+        "Ürünün teslimat süresini ve stok bilgisini kontrol edin",
+        "İptal nedenlerini müşteri geri bildirimlerinden inceleyin"
+    ],
+    ('anomaly.highCancelRate', 'customer'): [
+        "Müşterinin iptal nedenlerini inceleyin",
+        "Hesabı olası kötüye kullanım açısından kontrol edin",
+        "Müşteriyle iletişime geçin"
+    ],
+    ('anomaly.lateShipping', 'product'): [
+        "Ürünün tedarik ve depo süreçlerini kontrol edin",
+        "Teslimat tahminlerini güncelleyin",
+        "Alternatif kargo şirketlerini değerlendirin"
+    ],
+    ('anomaly.lateShipping', 'customer'): [
+        "Müşteriyi gecikme hakkında bilgilendirin",
+        "Teslimat adresini ve bölgedeki kargo durumunu kontrol edin"
+    ],
+    (ORDER_SPIKE_TYPE, 'product'): [
+        "Stok seviyesini kontrol edin",
+        "Fiyat veya kampanya hatası olup olmadığını doğrulayın",
+        "Tedarikçiyle yeniden stok planlayın"
+    ],
+    (ORDER_SPIKE_TYPE, 'customer'): [
+        "Siparişleri olası dolandırıcılık açısından inceleyin",
+        "Toplu/kurumsal alım olup olmadığını doğrulayın"
+    ],
+}
+
+# İstatistiksel modellerin olay anomalileri (saat/sipariş kapsamlı); tip başına en yeni
+# bu kadar kayıt tutulur
+STATISTICAL_EVENT_LIMIT = 200
+
+STATISTICAL_SUGGESTIONS = {
+    (ORDER_SPIKE_TYPE, 'hour'): [
+        "Kampanya veya fiyat hatası olup olmadığını kontrol edin",
+        "Stok ve kargo kapasitesini gözden geçirin"
+    ],
+    ('anomaly.orderDrop', 'hour'): [
+        "Ödeme ve sipariş akışında hata olup olmadığını kontrol edin",
+        "Sitenin erişilebilirliğini ve kampanya bitişlerini doğrulayın"
+    ],
+    ('anomaly.highCancelRate', 'hour'): [
+        "O saatteki iptal edilen siparişleri inceleyin",
+        "Ödeme sağlayıcısı ve stok senkronizasyonunu kontrol edin"
+    ],
+    ('anomaly.priceAnomaly', 'order'): [
+        "Siparişin fiyat ve indirim bilgilerini doğrulayın",
+        "Ürün fiyatında hatalı güncelleme olup olmadığını kontrol edin",
+        "Gerekirse siparişi onaydan önce bekletin"
+    ],
+}
 
 class AnomalyDetector:
-    def __init__(self, db_path: str = 'ecommerce.db'):
+    def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        self.pool = get_pool(db_path)
         
     def get_db_connection(self):
-        """Veritabanı bağlantısını al"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Paylaşılan havuzdan veritabanı bağlantısı al (close() havuza iade eder)"""
+        return self.pool.acquire()
         
     def get_current_settings(self) -> Dict:
         """Mevcut anomali tespit ayarlarını al"""
@@ -39,82 +130,79 @@ class AnomalyDetector:
                 'stockOutThreshold': 5
             }
     
+    def window_start_date(self, hours: int) -> str:
+        """Son `hours` saate düşen en erken sipariş günü (YYYY-MM-DD).
+
+        Sipariş tarihleri gün hassasiyetinde saklandığından datetime(date) >= datetime('now', '-N hours')
+        koşulu date >= bu gün koşuluna eşittir; böylece date üzerindeki indeks kullanılabilir.
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=hours)
+        start = cutoff.date()
+        if cutoff.time() != datetime.min.time():
+            start += timedelta(days=1)
+        return start.strftime('%Y-%m-%d')
+    
+    def window_end_date(self, hours: int) -> str:
+        """Gece yarısı `hours` saatten daha eski olan en geç sipariş günü (YYYY-MM-DD)"""
+        return (datetime.utcnow() - timedelta(hours=hours)).strftime('%Y-%m-%d')
+    
+    def refresh_aggregates(self) -> int:
+        """Son filigrandan beri değişen siparişleri tespit özetine katla; katlanan değişiklik sayısını döndür"""
+        conn = self.get_db_connection()
+        try:
+            applied = apply_pending_changes(conn.cursor())
+            conn.commit()
+        finally:
+            conn.close()
+        return applied
+    
     def calculate_cancel_rate(self, time_window_hours: int = 24) -> float:
         """Belirtilen zaman dilimindeki iptal oranı yüzdesini hesapla"""
         conn = self.get_db_connection()
         
-        # Son zaman penceresindeki toplam siparişleri al
+        # Toplam ve iptal edilen siparişler gün/durum özetinden tek geçişte toplanır
         cursor = conn.execute("""
-            SELECT COUNT(*) as total_orders
-            FROM orders 
-            WHERE datetime(date) >= datetime('now', '-{} hours')
-        """.format(time_window_hours))
-        total_orders = cursor.fetchone()['total_orders']
+            SELECT COALESCE(SUM(orders), 0) as total_orders,
+                   COALESCE(SUM(CASE WHEN status = 'cancelled' THEN orders END), 0) as cancelled_orders
+            FROM detector_daily 
+            WHERE day >= ?
+        """, (self.window_start_date(time_window_hours),))
+        row = cursor.fetchone()
+        conn.close()
         
-        if total_orders == 0:
-            conn.close()
+        if row['total_orders'] == 0:
             return 0.0
-            
-        # Son zaman penceresindeki iptal edilen siparişleri al
-        cursor = conn.execute("""
-            SELECT COUNT(*) as cancelled_orders
-            FROM orders 
-            WHERE datetime(date) >= datetime('now', '-{} hours')
-            AND status = 'cancelled'
-        """.format(time_window_hours))
-        cancelled_orders = cursor.fetchone()['cancelled_orders']
-        
-        conn.close()
-        return (cancelled_orders / total_orders) * 100
+        return (row['cancelled_orders'] / row['total_orders']) * 100
     
-    def get_late_shipping_orders(self, threshold_hours: int) -> List[Dict]:
-        """Belirtilen kargo süresi eşiğini aşan siparişleri getir"""
+    def count_late_shipping_orders(self, threshold_hours: int) -> int:
+        """Belirtilen kargo süresi eşiğini aşan sipariş sayısını getir"""
         conn = self.get_db_connection()
         
         cursor = conn.execute("""
-            SELECT * FROM orders 
+            SELECT COALESCE(SUM(orders), 0) FROM detector_daily 
             WHERE status IN ('pending', 'shipped')
-            AND datetime(date) <= datetime('now', '-{} hours')
-        """.format(threshold_hours))
+            AND day <= ?
+        """, (self.window_end_date(threshold_hours),))
         
-        late_orders = cursor.fetchall()
+        late_count = cursor.fetchone()[0]
         conn.close()
         
-        return [dict(order) for order in late_orders]
+        return late_count
     
-    def get_low_stock_products(self, threshold: int) -> List[str]:
-        """Düşük stok tespitini simüle et (gerçek sistemde envanter kontrol edilir)"""
-        # Envanter tablosu olmadığından, son sipariş desenlerine dayalı simülasyon yapacağız
+    def get_low_stock_products(self, threshold: int) -> List[Dict]:
+        """Envanterde yeniden sipariş seviyesinin (min_stock) veya stockOutThreshold'un altındaki ürünler.
+
+        Her ürün için son siparişlerden günlük satış hızı ve tahmini tükenme günü de döner.
+        """
         conn = self.get_db_connection()
-        
-        # Yüksek son sipariş hacmine sahip ürünleri al (düşük stok simülasyonu)
-        cursor = conn.execute("""
-            SELECT product, COUNT(*) as order_count
-            FROM orders 
-            WHERE datetime(date) >= datetime('now', '-7 days')
-            GROUP BY product
-            HAVING COUNT(*) > 15
-            ORDER BY COUNT(*) DESC
-            LIMIT 5
-        """)
-        
-        high_demand_products = cursor.fetchall()
-        conn.close()
-        
-        # Bunlardan bazılarının düşük stokta olduğunu simüle et
-        low_stock = []
-        for product in high_demand_products:
-            if random.random() < 0.4:  # %40 düşük stok olma şansı
-                low_stock.append(product['product'])
-                
-        return low_stock
+        try:
+            return fetch_low_stock(conn, threshold)
+        finally:
+            conn.close()
     
     def generate_anomaly_id(self) -> str:
-        """Benzersiz anomali kimliği oluştur"""
-        import time
-        timestamp = str(int(time.time() * 1000))[-6:]  # Zaman damgasının son 6 hanesi
-        random_suffix = str(random.randint(100, 999))
-        return f"ANO-{timestamp}-{random_suffix}"
+        """Benzersiz anomali kimliği oluştur (zaman sıralı; süreçler arasında çakışmaz)"""
+        return anomaly_ids.next_id()
     
     def create_cancel_rate_anomaly(self, current_rate: float, threshold: int) -> Dict:
         """İptal oranı anomalisi oluştur"""
@@ -170,11 +258,24 @@ class AnomalyDetector:
             'stock_out_threshold': None
         }
     
-    def create_stock_out_anomaly(self, products: List[str], threshold: int) -> Dict:
+    def create_stock_out_anomaly(self, products: List[Dict], threshold: int) -> Dict:
         """Stok tükendi anomalisi oluştur"""
-        severity = 'high' if len(products) > 3 else 'medium'
-        
-        product_list = ', '.join(products[:3])  # İlk 3 ürünü göster
+        # Stoğu bitmiş, eşiğin altına inmiş veya 3 gün içinde tükenecek ürün varsa öncelik yüksektir
+        urgent = [item for item in products
+                  if item['current_stock'] < threshold
+                  or (item['days_until_stockout'] is not None and item['days_until_stockout'] <= 3)]
+        severity = 'high' if urgent or len(products) > 3 else 'medium'
+        
+        def describe(item: Dict) -> str:
+            if item['current_stock'] == 0:
+                return f"{item['product_name']} (stokta yok)"
+            if item['days_until_stockout'] is None:
+                return f"{item['product_name']} ({item['current_stock']} adet)"
+            return f"{item['product_name']} ({item['current_stock']} adet, ~{item['days_until_stockout']:g} günde tükenir)"
+        
+        product_list = ', '.join(describe(item) for item in products[:3])  # En acil ilk 3 ürünü göster
+        if len(products) > 3:
+            product_list += f" ve {len(products) - 3} ürün daha"
         unit_text = f"{threshold} adet altında" if threshold > 1 else "kritik seviyede düşük"
         
         # Her zaman güncel eşik değerini kullan
@@ -200,121 +301,229 @@ class AnomalyDetector:
             'stock_out_threshold': threshold
         }
     
-    def save_anomaly(self, anomaly: Dict):
-        """Anomaliyi veritabanına kaydet"""
+    def get_group_metrics(self, scope: str, late_threshold_hours: int) -> Dict[str, Dict]:
+        """Kapsamdaki her grup (ürün / müşteri) için pencere ve geç kargo sayılarını özetten topla.
+
+        Grup başına sorgu yerine her ölçü tek GROUP BY geçişiyle hesaplanır: son 24 saat (iptal oranı,
+        artış adayları), sadece artış adayları için önceki SPIKE_BASELINE_DAYS gün ve eşikten eski
+        bekleyen/kargodaki siparişler (geç kargo). Alt sınırların altındaki ve geç kargoda ortalamadan
+        öne çıkmayan gruplar SQL içinde elenir; Python'a sadece aday gruplar gelir.
+        """
+        table, column = GROUP_SCOPES[scope]
+        recent_start = self.window_start_date(24)
         conn = self.get_db_connection()
         
-        # Mevcut ayarları al
-        settings = self.get_current_settings()
-        
         try:
-            conn.execute("""
-                INSERT INTO anomalies (id, type, severity, description, date, orderId, suggestions, 
-                                     cancel_rate_threshold, late_shipping_threshold, stock_out_threshold)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                anomaly['id'],
-                anomaly['type'],
-                anomaly['severity'],
-                anomaly['description'],
-                anomaly['date'],
-                anomaly['orderId'],
-                anomaly['suggestions'],
-                anomaly.get('cancel_rate_threshold'),
-                anomaly.get('late_shipping_threshold'),
-                anomaly.get('stock_out_threshold')
-            ))
-            conn.commit()
-            print(f"✅ Anomali kaydedildi: {anomaly['type']} - {anomaly['description']}")
-        except Exception as e:
-            print(f"❌ Hata: Anomali kaydedilemedi: {str(e)}")
+            metrics: Dict[str, Dict] = {}
+            cursor = conn.execute(f"""
+                SELECT {column} AS subject, SUM(orders) AS recent,
+                       SUM(CASE WHEN status = 'cancelled' THEN orders ELSE 0 END) AS cancelled
+                FROM {table}
+                WHERE day >= ?
+                GROUP BY {column}
+                HAVING SUM(orders) >= ?
+            """, (recent_start, min(GROUP_MIN_ORDERS[scope], SPIKE_MIN_ORDERS[scope])))
+            for row in cursor.fetchall():
+                metrics[row['subject']] = {'recent': row['recent'], 'cancelled': row['cancelled'],
+                                           'baseline': 0, 'late': 0}
+            
+            # Karşılaştırma dönemi geniş olduğundan sadece artış adayı gruplar için okunur
+            spike_candidates = [subject for subject, values in metrics.items()
+                                if values['recent'] >= SPIKE_MIN_ORDERS[scope]]
+            if spike_candidates:
+                cursor = conn.execute(f"""
+                    SELECT {column} AS subject, SUM(orders) AS baseline
+                    FROM {table}
+                    WHERE day >= ? AND day < ? AND {column} IN (SELECT value FROM json_each(?))
+                    GROUP BY {column}
+                """, (self.window_start_date((SPIKE_BASELINE_DAYS + 1) * 24), recent_start,
+                      json.dumps(spike_candidates)))
+                for row in cursor.fetchall():
+                    metrics[row['subject']]['baseline'] = row['baseline']
+            
+            cursor = conn.execute(f"""
+                SELECT subject, late FROM (
+                    SELECT {column} AS subject, SUM(orders) AS late, AVG(SUM(orders)) OVER () AS average_late
+                    FROM {table}
+                    WHERE status IN ('pending', 'shipped') AND day <= ?
+                    GROUP BY {column}
+                )
+                WHERE late >= ? AND late > average_late * ?
+            """, (self.window_end_date(late_threshold_hours), GROUP_MIN_LATE_ORDERS[scope], LATE_OUTLIER_FACTOR))
+            for row in cursor.fetchall():
+                metrics.setdefault(row['subject'], {'recent': 0, 'cancelled': 0, 'baseline': 0})['late'] = row['late']
         finally:
             conn.close()
-    
-    def cleanup_old_dynamic_anomalies(self):
-        """Karmaşayı önlemek için eski dinamik olarak oluşturulan anomalileri kaldır"""
-        conn = self.get_db_connection()
         
-        # Her tipten sadece en son 50 anomaliyi tut
-        try:
-            for anomaly_type in ['anomaly.highCancelRate', 'anomaly.lateShipping', 'anomaly.stockOut']:
-                conn.execute("""
-                    DELETE FROM anomalies 
-                    WHERE id NOT IN (
-                        SELECT id FROM anomalies 
-                        WHERE type = ? 
-                        ORDER BY datetime(date) DESC 
-                        LIMIT 20
-                    ) AND type = ?
-                """, (anomaly_type, anomaly_type))
+        return metrics
+    
+    def create_group_anomaly(self, anomaly_type: str, scope: str, subject: str, severity: str,
+                             description: str, **thresholds) -> Dict:
+        """Ürün veya müşteri bazlı anomali oluştur"""
+        return {
+            'id': self.generate_anomaly_id(),
+            'type': anomaly_type,
+            'severity': severity,
+            'description': description,
+            'date': datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'orderId': None,
+            'suggestions': json.dumps(GROUP_SUGGESTIONS[(anomaly_type, scope)]),
+            'cancel_rate_threshold': thresholds.get('cancel_rate_threshold'),
+            'late_shipping_threshold': thresholds.get('late_shipping_threshold'),
+            'stock_out_threshold': None,
+            'scope': scope,
+            'subject': subject
+        }
+    
+    def detect_grouped_anomalies(self, settings: Dict) -> List[Dict]:
+        """İptal oranı, geç kargo ve sipariş artışını ürün ve müşteri bazında tespit et"""
+        cancel_threshold = settings['cancelRateThreshold']
+        late_threshold = settings['lateShippingThreshold']
+        anomalies = []
+        
+        for scope in GROUP_SCOPES:
+            metrics = self.get_group_metrics(scope, late_threshold)
+            label = "{}" if scope == 'product' else "Müşteri {}"
             
-            conn.commit()
-        except Exception as e:
-            print(f"❌ Hata: Anomaliler temizlenirken hata oluştu: {str(e)}")
-        finally:
-            conn.close()
+            for subject, values in metrics.items():
+                name = label.format(subject)
+                recent = values['recent']
+                
+                if recent >= GROUP_MIN_ORDERS[scope] and values['cancelled'] >= GROUP_MIN_CANCELLED[scope]:
+                    rate = values['cancelled'] / recent * 100
+                    if rate > cancel_threshold:
+                        anomalies.append(self.create_group_anomaly(
+                            'anomaly.highCancelRate', scope, subject,
+                            'high' if rate > cancel_threshold * 1.5 else 'medium',
+                            f'{name} için iptal oranı ({rate:.1f}%) son 24 saatte eşik değerini ({cancel_threshold}%) aştı',
+                            cancel_rate_threshold=cancel_threshold
+                        ))
+                
+                late = values['late']
+                if late >= GROUP_MIN_LATE_ORDERS[scope]:
+                    anomalies.append(self.create_group_anomaly(
+                        'anomaly.lateShipping', scope, subject,
+                        'high' if late > 20 else 'medium' if late > 10 else 'low',
+                        f'{name} için {late} sipariş {late_threshold} saatlik kargo eşik değerini aştı',
+                        late_shipping_threshold=late_threshold
+                    ))
+                
+                daily_average = values['baseline'] / SPIKE_BASELINE_DAYS
+                if recent >= SPIKE_MIN_ORDERS[scope] and recent > daily_average * SPIKE_FACTOR:
+                    anomalies.append(self.create_group_anomaly(
+                        ORDER_SPIKE_TYPE, scope, subject,
+                        'high' if recent > daily_average * SPIKE_FACTOR * 2 else 'medium',
+                        f'{name} için sipariş artışı: son 24 saatte {recent} sipariş '
+                        f'(önceki {SPIKE_BASELINE_DAYS} gün ortalaması {daily_average:.1f}/gün)'
+                    ))
+        
+        self.attribute_group_orders(anomalies, late_threshold)
+        return anomalies
     
-    def cleanup_threshold_based_anomalies(self):
-        """Yenilerini oluşturmadan önce tüm eşik tabanlı anomalileri kaldır"""
+    def attribute_group_orders(self, anomalies: List[Dict], late_threshold_hours: int):
+        """Grup anomalilerine ilişkili siparişi ata (kaynak, tip ve kapsam başına tek sorgu).
+
+        İptal oranı → penceredeki en son iptal, geç kargo → en eski geciken, artış → en son sipariş.
+        Sayılar mühürlenmiş ayları da içeren özetten geldiğinden sipariş sıcak tablodan ve ay
+        dosyalarından (partitions.each_order_source) seçilir.
+        """
+        groups: Dict[Tuple[str, str], List[Dict]] = {}
+        for anomaly in anomalies:
+            groups.setdefault((anomaly['type'], anomaly['scope']), []).append(anomaly)
+        if not groups:
+            return
+        
+        recent_start = self.window_start_date(24)
+        # Geç kargo sayımı day <= window_end_date ile yapılır; aynı günler date < ertesi gün ile seçilir
+        late_before = (datetime.strptime(self.window_end_date(late_threshold_hours), '%Y-%m-%d')
+                       + timedelta(days=1)).strftime('%Y-%m-%d')
+        # (tip, kapsam) → grup → (ts, sipariş numarası); kaynaklar arasında en yeni / en eski olan kalır
+        picked: Dict[Tuple[str, str], Dict[str, Tuple[int, str]]] = {key: {} for key in groups}
         conn = self.get_db_connection()
         
         try:
-            # Eşik bilgisi içeren tüm dinamik anomalileri kaldır
-            conn.execute("""
-                DELETE FROM anomalies 
-                WHERE (
-                    description LIKE '%exceeded threshold%' OR
-                    description LIKE '%eşik değerini aştı%' OR
-                    description LIKE '%shipping threshold%' OR
-                    description LIKE '%kargo eşik değerini aştı%' OR
-                    description LIKE '%below % units%' OR
-                    description LIKE '%adet altında%'
-                ) AND type IN ('anomaly.highCancelRate', 'anomaly.lateShipping', 'anomaly.stockOut')
-            """)
-            
-            deleted_count = conn.total_changes
-            conn.commit()
-            print(f"🧹 {deleted_count} eski eşik tabanlı anomali temizlendi")
-            
-        except Exception as e:
-            print(f"❌ Hata: Eşik tabanlı anomaliler temizlenirken hata oluştu: {str(e)}")
+            for source_cursor, source in each_order_source(conn.cursor()):
+                for (anomaly_type, scope), members in groups.items():
+                    column = GROUP_SCOPES[scope][1]
+                    if anomaly_type == 'anomaly.highCancelRate':
+                        condition, params, newest = "status = 'cancelled' AND ts >= unixepoch(?)", [recent_start], True
+                    elif anomaly_type == 'anomaly.lateShipping':
+                        condition, params, newest = "status IN ('pending', 'shipped') AND ts < unixepoch(?)", [late_before], False
+                    else:
+                        condition, params, newest = "ts >= unixepoch(?)", [recent_start], True
+                    
+                    # SQLite'ta MIN/MAX ile seçilen yalın sütun (id), o değere sahip satırdan gelir
+                    source_cursor.execute(f"""
+                        SELECT {column} AS subject, id, {'MAX' if newest else 'MIN'}(ts)
+                        FROM {source} AS orders
+                        WHERE {condition} AND {column} IN (SELECT value FROM json_each(?))
+                        GROUP BY {column}
+                    """, params + [json.dumps([anomaly['subject'] for anomaly in members])])
+                    chosen = picked[(anomaly_type, scope)]
+                    for subject, order_id, ts in source_cursor.fetchall():
+                        current = chosen.get(subject)
+                        if current is None or (ts > current[0] if newest else ts < current[0]):
+                            chosen[subject] = (ts, order_id)
         finally:
             conn.close()
+        
+        for key, members in groups.items():
+            for anomaly in members:
+                found = picked[key].get(anomaly['subject'])
+                anomaly['orderId'] = found[1] if found else None
+    
+    def create_statistical_anomaly(self, event: Dict) -> Dict:
+        """İstatistiksel modelin olayından anomali kaydı oluştur"""
+        return dict(
+            event,
+            id=self.generate_anomaly_id(),
+            suggestions=json.dumps(STATISTICAL_SUGGESTIONS.get((event['type'], event['scope']), [])),
+            cancel_rate_threshold=None,
+            late_shipping_threshold=None,
+            stock_out_threshold=None,
+        )
     
-    def detect_and_create_anomalies(self) -> List[Dict]:
+    def detect_and_create_anomalies(self, run_id: Optional[str] = None) -> List[Dict]:
         """Ana tespit fonksiyonu - mevcut ayarlara göre anomalileri tespit eder"""
+        return self.run(run_id)['anomalies']
+    
+    def run(self, run_id: Optional[str] = None) -> Dict:
+        """Tespit turunu çalıştır; aktif anomalileri ve kaynak bazında yazma sayılarını döndür"""
+        run_id = run_id or f"RUN-{uuid.uuid4().hex[:12]}"
+        # Tespit turu boyunca tek bağlantı tutulur; içteki get_db_connection() çağrıları aynı bağlantıyı alır
+        with self.pool.connection():
+            return self._run_detection(run_id)
+    
+    def _run_detection(self, run_id: str) -> Dict:
         settings = self.get_current_settings()
-        new_anomalies = []
+        threshold_anomalies = []
         
-        print(f"🔍 Anomali tespiti şu eşiklerle çalışıyor:")
+        print(f"🔍 Anomali tespiti ({run_id}) şu eşiklerle çalışıyor:")
         print(f"   İptal Oranı: {settings['cancelRateThreshold']}%")
         print(f"   Geç Kargo: {settings['lateShippingThreshold']} saat")
         print(f"   Stok Tükendi: {settings['stockOutThreshold']} adet")
         
-        # Önce tüm eski eşik tabanlı anomalileri temizle ki taze veri olsun
-        self.cleanup_threshold_based_anomalies()
+        # Tüm tabloyu taramak yerine sadece son turdan beri değişen siparişler özete katlanır
+        applied_changes = self.refresh_aggregates()
+        print(f"📥 Tespit özetine {applied_changes} sipariş değişikliği katlandı")
         
         # 1. İptal oranını kontrol et
         current_cancel_rate = self.calculate_cancel_rate()
         print(f"📊 Mevcut iptal oranı: {current_cancel_rate:.1f}%")
         
         if current_cancel_rate > settings['cancelRateThreshold']:
-            anomaly = self.create_cancel_rate_anomaly(current_cancel_rate, settings['cancelRateThreshold'])
-            new_anomalies.append(anomaly)
-            self.save_anomaly(anomaly)
-            print(f"⚠️ İptal oranı anomalisi oluşturuldu: {current_cancel_rate:.1f}% > {settings['cancelRateThreshold']}%")
+            threshold_anomalies.append(self.create_cancel_rate_anomaly(current_cancel_rate, settings['cancelRateThreshold']))
+            print(f"⚠️ İptal oranı anomalisi: {current_cancel_rate:.1f}% > {settings['cancelRateThreshold']}%")
         else:
             print(f"✅ İptal oranı OK: {current_cancel_rate:.1f}% <= {settings['cancelRateThreshold']}%")
         
         # 2. Geç kargo kontrolü
-        late_orders = self.get_late_shipping_orders(settings['lateShippingThreshold'])
-        print(f"🚚 Geç kargo siparişleri: {len(late_orders)}")
-        
-        if len(late_orders) > 0:
-            anomaly = self.create_late_shipping_anomaly(len(late_orders), settings['lateShippingThreshold'])
-            new_anomalies.append(anomaly)
-            self.save_anomaly(anomaly)
-            print(f"⚠️ Geç kargo anomalisi oluşturuldu: {len(late_orders)} sipariş > {settings['lateShippingThreshold']}h")
+        late_orders_count = self.count_late_shipping_orders(settings['lateShippingThreshold'])
+        print(f"🚚 Geç kargo siparişleri: {late_orders_count}")
+        
+        if late_orders_count > 0:
+            threshold_anomalies.append(self.create_late_shipping_anomaly(late_orders_count, settings['lateShippingThreshold']))
+            print(f"⚠️ Geç kargo anomalisi: {late_orders_count} sipariş > {settings['lateShippingThreshold']}h")
         else:
             print(f"✅ Kargo süreleri OK: {settings['lateShippingThreshold']}h üzerinde sipariş yok")
         
@@ -323,20 +532,42 @@ class AnomalyDetector:
         print(f"📦 Düşük stoklu ürünler: {len(low_stock_products)}")
         
         if low_stock_products:
-            anomaly = self.create_stock_out_anomaly(low_stock_products, settings['stockOutThreshold'])
-            new_anomalies.append(anomaly)
-            self.save_anomaly(anomaly)
-            print(f"⚠️ Stok tükendi anomalisi oluşturuldu: {len(low_stock_products)} ürün < {settings['stockOutThreshold']} adet")
+            threshold_anomalies.append(self.create_stock_out_anomaly(low_stock_products, settings['stockOutThreshold']))
+            print(f"⚠️ Stok tükendi anomalisi: {len(low_stock_products)} ürün minimum stokta veya "
+                  f"< {settings['stockOutThreshold']} adet")
         else:
-            print(f"✅ Stok seviyeleri OK: Tüm ürünler >= {settings['stockOutThreshold']} adet")
+            print(f"✅ Stok seviyeleri OK: Tüm ürünler minimum stok ve {settings['stockOutThreshold']} adet üzerinde")
         
-        print(f"🎯 Tespit tamamlandı. {len(new_anomalies)} yeni anomali oluşturuldu.")
-        return new_anomalies
-    
-    def trigger_detection_on_settings_change(self):
-        """Ayarlar güncellendiğinde anomali tespitini tetikle"""
-        print("🔄 Ayarlar değişti - anomali tespiti tetikleniyor...")
-        return self.detect_and_create_anomalies()
+        # 4. Ürün ve müşteri bazlı iptal oranı, geç kargo ve sipariş artışı
+        grouped_anomalies = self.detect_grouped_anomalies(settings)
+        print(f"🧩 Ürün/müşteri bazlı anomali adayı: {len(grouped_anomalies)}")
+        
+        # 5. İstatistiksel modeller ve tüm sonuçların kaydı tek işlemde: model durumları ile anomaliler
+        # birlikte yazılır, tur yarıda kalırsa ikisi birlikte geri alınır
+        conn = self.get_db_connection()
+        try:
+            repository = AnomalyRepository(conn, run_id)
+            active_anomalies = repository.sync('threshold', threshold_anomalies,
+                                               ANOMALY_COMPARE_COLUMNS, ANOMALY_UPDATE_COLUMNS)
+            active_anomalies.extend(repository.sync('group', grouped_anomalies,
+                                                    GROUP_COMPARE_COLUMNS, GROUP_UPDATE_COLUMNS))
+            # Saatlik hacim/iptal oranı (EWMA + mevsimsel taban) ve ürün bazında sipariş tutarı
+            events = [self.create_statistical_anomaly(event) for event in run_statistical_detectors(conn.cursor())]
+            active_anomalies.extend(repository.append('statistical', events, STATISTICAL_EVENT_LIMIT))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        summary = repository.summary()
+        for source, counts in summary['sources'].items():
+            print(f"💾 {source}: {counts['inserted']} yeni, {counts['updated']} güncellendi, "
+                  f"{counts['unchanged']} değişmedi, {counts['deleted']} kaldırıldı")
+        print(f"🎯 Tespit tamamlandı. {len(active_anomalies)} aktif anomali.")
+        return dict(summary, new_anomalies_count=summary['total']['inserted'],
+                    active_anomalies_count=len(active_anomalies), anomalies=active_anomalies)
 
 # Harici kullanım için kolaylık fonksiyonu
 def run_anomaly_detection():
@@ -344,10 +575,15 @@ def run_anomaly_detection():
     detector = AnomalyDetector()
     return detector.detect_and_create_anomalies()
 
-def trigger_detection_after_settings_update():
-    """Ayar güncellemesinden sonra tespiti tetikle"""
+def run_detection_job(run_id: str) -> Dict:
+    """Zamanlayıcının işi için tespit turu; sonuç iş kimliğiyle etiketlenir ve yazma sayılarını içerir.
+
+    Zamanlayıcı son MAX_JOB_HISTORY işin sonucunu tuttuğundan anomali listesi sonuca konmaz;
+    istemciler anomalileri /anomalies'ten okur.
+    """
     detector = AnomalyDetector()
-    return detector.trigger_detection_on_settings_change()
+    result = detector.run(run_id)
+    return {key: value for key, value in result.items() if key != 'anomalies'}
 
 if __name__ == "__main__":
     # Anomali tespit sistemini test et
@@ -0,0 +1,177 @@
+"""
+Anomali Deposu
+Bir tespit turunun tüm sonuçlarını tek işlemde, executemany ile yazar. Dedektörün ürettiği
+kayıtlar açıklama metniyle değil source (üreten kaynak) ve run_id (son yazan tur) sütunlarıyla
+tanınır; seed veya elle eklenen anomalilerde source NULL kalır ve depo onlara dokunmaz.
+"""
+import json
+from typing import Dict, List, Sequence
+
+# Dedektör kaynakları: genel eşik kontrolleri, ürün/müşteri bazlı kontroller, istatistiksel modeller
+ANOMALY_SOURCES = ('threshold', 'group', 'statistical')
+
+ANOMALY_COLUMNS = ('id', 'type', 'severity', 'description', 'date', 'orderId', 'suggestions',
+                   'cancel_rate_threshold', 'late_shipping_threshold', 'stock_out_threshold',
+                   'scope', 'subject', 'source', 'run_id')
+
+# Önceki sürümlerin eşik anomalilerini açıklamalarından tanıyan koşul; sadece migrasyondaki
+# bir kerelik source doldurma işleminde kullanılır (eski İngilizce metinler dahil)
+LEGACY_THRESHOLD_DESCRIPTION_SQL = """
+    description LIKE '%exceeded threshold%' OR
+    description LIKE '%eşik değerini (%) aştı%' OR
+    description LIKE '%shipping threshold%' OR
+    description LIKE '%kargo eşik değerini aştı%' OR
+    description LIKE '%below % units%' OR
+    description LIKE '%adet altında%' OR
+    description LIKE '%kritik seviyede düşük%'
+"""
+
+
+def add_source_columns(cursor):
+    """anomalies tablosuna source/run_id sütunlarını ekle ve mevcut dedektör kayıtlarını etiketle"""
+    cursor.execute("PRAGMA table_info(anomalies)")
+    existing_columns = [col[1] for col in cursor.fetchall()]
+    for column_name in ('source', 'run_id'):
+        if column_name not in existing_columns:
+            cursor.execute(f"ALTER TABLE anomalies ADD COLUMN {column_name} TEXT")
+
+    cursor.execute("UPDATE anomalies SET source = 'group' WHERE source IS NULL AND scope IN ('product', 'customer')")
+    cursor.execute("UPDATE anomalies SET source = 'statistical' WHERE source IS NULL AND scope IN ('hour', 'order')")
+    cursor.execute(f"""
+        UPDATE anomalies SET source = 'threshold'
+        WHERE source IS NULL AND subject IS NULL
+        AND type IN ('anomaly.highCancelRate', 'anomaly.lateShipping', 'anomaly.stockOut')
+        AND ({LEGACY_THRESHOLD_DESCRIPTION_SQL})
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_source ON anomalies(source, type, date)")
+
+
+class WriteCounts:
+    """Bir kaynağın tur içindeki yazma sayıları (veritabanının bildirdiği etkilenen satırlar)"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'deleted': self.deleted,
+        }
+
+
+def _key(anomaly: Dict):
+    return anomaly['type'], anomaly.get('scope'), anomaly.get('subject')
+
+
+class AnomalyRepository:
+    """Tek bağlantı üzerinde bir turun anomali yazmalarını toplar; commit çağırana bırakılır"""
+
+    def __init__(self, conn, run_id: str):
+        self.conn = conn
+        self.run_id = run_id
+        self.counts: Dict[str, WriteCounts] = {}
+
+    def _counts(self, source: str) -> WriteCounts:
+        return self.counts.setdefault(source, WriteCounts())
+
+    def _row(self, anomaly: Dict, source: str) -> List:
+        values = dict(anomaly, source=source, run_id=self.run_id)
+        return [values.get(column) for column in ANOMALY_COLUMNS]
+
+    def _insert(self, source: str, anomalies: List[Dict], ignore_existing: bool = False) -> int:
+        if not anomalies:
+            return 0
+        verb = "INSERT OR IGNORE" if ignore_existing else "INSERT"
+        cursor = self.conn.executemany(f"""
+            {verb} INTO anomalies ({', '.join(ANOMALY_COLUMNS)})
+            VALUES ({', '.join('?' for _ in ANOMALY_COLUMNS)})
+        """, [self._row(anomaly, source) for anomaly in anomalies])
+        return cursor.rowcount
+
+    def sync(self, source: str, anomalies: List[Dict], compare_columns: Sequence[str],
+             update_columns: Sequence[str]) -> List[Dict]:
+        """Kaynağın kayıtlarını bu turun sonucuyla eşitle.
+
+        (tip, kapsam, grup) anahtarıyla mevcut kayıtlar bulunur: artık tespit edilmeyenler (ve eski
+        sürümlerden kalan tekrarlar) silinir, compare_columns değişenler yerinde güncellenir, yeniler
+        eklenir. Aktif anomalileri (veritabanındaki id ile) döndürür.
+        """
+        counts = self._counts(source)
+        cursor = self.conn.execute("SELECT * FROM anomalies WHERE source = ? ORDER BY date DESC, id DESC",
+                                   (source,))
+        existing, stale_ids = {}, []
+        for row in cursor.fetchall():
+            row = dict(row)
+            if _key(row) in existing:
+                stale_ids.append(row['id'])
+            else:
+                existing[_key(row)] = row
+
+        active, inserts, updates = [], [], []
+        for anomaly in anomalies:
+            current = existing.pop(_key(anomaly), None)
+            if current is None:
+                inserts.append(anomaly)
+                active.append(anomaly)
+            elif all(current[column] == anomaly.get(column) for column in compare_columns):
+                active.append(current)
+                counts.unchanged += 1
+            else:
+                anomaly = dict(anomaly, id=current['id'])
+                updates.append(anomaly)
+                active.append(anomaly)
+        stale_ids.extend(row['id'] for row in existing.values())
+
+        if stale_ids:
+            counts.deleted += self.conn.executemany("DELETE FROM anomalies WHERE id = ?",
+                                                    [(anomaly_id,) for anomaly_id in stale_ids]).rowcount
+        if updates:
+            columns = list(update_columns) + ['run_id']
+            counts.updated += self.conn.executemany(f"""
+                UPDATE anomalies SET {', '.join(f'{column} = ?' for column in columns)}
+                WHERE id = ?
+            """, [[dict(anomaly, run_id=self.run_id).get(column) for column in columns] + [anomaly['id']]
+                  for anomaly in updates]).rowcount
+        counts.inserted += self._insert(source, inserts)
+        return active
+
+    def append(self, source: str, anomalies: List[Dict], keep_per_type: int) -> List[Dict]:
+        """Olay anomalilerini ekle (aynı tip/kapsam/grup zaten varsa atlanır) ve tip başına en yeni
+        keep_per_type kaydı tut. Gerçekten eklenen anomalileri döndürür.
+        """
+        counts = self._counts(source)
+        counts.inserted += self._insert(source, anomalies, ignore_existing=True)
+        # Yeni olayların kimlikleri tur içinde üretildiğinden tabloda bulunanlar eklenmiş olanlardır
+        cursor = self.conn.execute("SELECT id FROM anomalies WHERE id IN (SELECT value FROM json_each(?))",
+                                   (json.dumps([anomaly['id'] for anomaly in anomalies]),))
+        inserted_ids = {row[0] for row in cursor.fetchall()}
+        inserted = [anomaly for anomaly in anomalies if anomaly['id'] in inserted_ids]
+        counts.unchanged += len(anomalies) - len(inserted)
+
+        counts.deleted += self.conn.execute("""
+            DELETE FROM anomalies WHERE source = ? AND id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (PARTITION BY type ORDER BY date DESC, id DESC) AS position
+                    FROM anomalies WHERE source = ?
+                ) WHERE position > ?
+            )
+        """, (source, source, keep_per_type)).rowcount
+        return inserted
+
+    def summary(self) -> Dict:
+        """Kaynak bazında ve toplam yazma sayıları"""
+        total = WriteCounts()
+        for counts in self.counts.values():
+            for name, value in counts.to_dict().items():
+                setattr(total, name, getattr(total, name) + value)
+        return {
+            'run_id': self.run_id,
+            'sources': {source: counts.to_dict() for source, counts in self.counts.items()},
+            'total': total.to_dict(),
+        }
+
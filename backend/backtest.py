@@ -0,0 +1,364 @@
+"""
+Eşik Geri Testi (Backtest)
+Geçmiş siparişleri AnomalyDetector'ın eşiğe bağlı kurallarıyla yeniden oynatır ve bir
+cancelRateThreshold × lateShippingThreshold ızgarasındaki her kombinasyonun gün başına kaç
+anomali üreteceğini hesaplar. Ayar ekranında eşik değiştirmeden önce etkisini görmek içindir.
+
+Oynatılan kurallar (anomaly_detector.py ile aynı pencere ve alt sınırlar):
+- anomaly.highCancelRate: genel ve ürün/müşteri bazında son 24 saatlik iptal oranı > eşik
+- anomaly.lateShipping: genel (> 0 sipariş) ve ürün/müşteri bazında (alt sınır + ortalamanın katı)
+  eşikten eski bekleyen/kargodaki siparişler
+
+Tespit step_hours aralıklarla çalıştırılmış gibi her an için tespitin göreceği gün aralığı bulunur;
+bir anahtarın (tip, kapsam, grup) bir önceki anda aktif değilken aktif olması deponun ekleyeceği
+yeni bir anomalidir ve o güne sayılır. Sipariş tarihleri gün hassasiyetinde olduğundan her an o
+günün tüm siparişlerini görür; durumlar geçmişteki değil bugünkü durumlardır. Stok tükenmesi envanter
+geçmişi tutulmadığından ve sipariş artışı eşiğe bağlı olmadığından oynatılmaz.
+
+Siparişler bir kez sütun dizilerine yüklenir ve paylaşılan belleğe (multiprocessing.shared_memory)
+konur; süreç havuzundaki çalışanlar kopyalamadan bağlanır ve tarih aralığının bir parçasını
+ızgaranın tüm eşikleri için değerlendirir. İptal ve geç kargo kuralları birbirinden bağımsız
+olduğundan her kombinasyonun sonucu eşik başına sonuçların birleşimidir.
+
+Kullanım (backend dizininden):
+    python backtest.py --cancel 10,15,20,25 --late 24,48,72
+    python backtest.py --cancel 5,10,15,20,25,30,35,40,45,50 --late 12,24,36,48,60,72,96,120,144,168 --days 90
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context, shared_memory
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from anomaly_detector import (GROUP_MIN_CANCELLED, GROUP_MIN_LATE_ORDERS, GROUP_MIN_ORDERS, LATE_OUTLIER_FACTOR)
+from db_pool import DB_PATH
+from order_store import KNOWN_VALUES
+from partitions import each_order_table
+from window_engine import LATE_STATUSES, STATUS_CODES
+
+SNAPSHOT_DTYPE = np.dtype([('day', 'i4'), ('status', 'i1'), ('product', 'i4'), ('customer', 'i4')])
+
+DAY_SECONDS = 24 * 3600
+
+# Tespitin iptal oranına baktığı pencere (AnomalyDetector.calculate_cancel_rate varsayılanı)
+CANCEL_WINDOW_HOURS = 24
+
+DEFAULT_STEP_HOURS = 1
+
+# Izgara ve çalışan sınırları; API isteği sunucuyu kilitlememeli
+MAX_GRID_POINTS = 400
+MAX_WORKERS = 8
+
+# Her çalışana düşen tarih aralığı parçası sayısı (yük dengesi için birden fazla)
+CHUNKS_PER_WORKER = 4
+
+CANCELLED = STATUS_CODES['cancelled']
+LATE_CODES = [STATUS_CODES[status] for status in LATE_STATUSES]
+
+# Genel (kapsamsız) anomalinin anahtarı; gruplar ürün kodu veya ürün sayısı + müşteri kodudur
+GLOBAL_KEY = -1
+
+
+class BacktestSnapshot:
+    """Gün sırasına dizilmiş siparişler (gün indeksi, durum, ürün ve müşteri kodu)"""
+
+    def __init__(self, columns: np.ndarray, products: int, customers: int, loaded_at: float):
+        self.columns = columns
+        self.products = products
+        self.customers = customers
+        self.loaded_at = loaded_at
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+
+def load_backtest_snapshot(conn) -> BacktestSnapshot:
+    """Siparişleri (mühürlenmiş aylar dahil) gün sırasıyla sütun dizilerine yükle (gün = ts epoch
+    saniyesinin UTC günü). Ürün ve müşteri kodu sözlük tablosundaki anahtarın bir eksiğidir; ad
+    birleştirmesi yapılmadan doğrudan order_rows okunur."""
+    status_case = " ".join(f"WHEN {code} THEN {STATUS_CODES[status]}"
+                           for code, status in enumerate(KNOWN_VALUES['status'], start=1))
+    cursor = conn.cursor()
+    # Havuz bağlantıları sqlite3.Row döndürür; fromiter düz demet bekler
+    cursor.row_factory = None
+    parts = []
+    for source_cursor, table, shift_days in each_order_table(cursor):
+        source_cursor.execute(f"""
+            SELECT (r.ts + {shift_days * DAY_SECONDS}) / {DAY_SECONDS},
+                   CASE r.status_id {status_case} ELSE {len(STATUS_CODES)} END,
+                   r.product_id - 1, r.customer_id - 1
+            FROM {table} r
+            WHERE r.ts IS NOT NULL
+        """)
+        parts.append(np.fromiter(source_cursor, dtype=SNAPSHOT_DTYPE))
+    columns = np.concatenate(parts)
+    columns = columns[np.argsort(columns['day'], kind='stable')]
+    products = int(columns['product'].max()) + 1 if len(columns) else 0
+    customers = int(columns['customer'].max()) + 1 if len(columns) else 0
+    return BacktestSnapshot(columns, products, customers, time.time())
+
+
+def window_start_day(tick: int, hours: int) -> int:
+    """AnomalyDetector.window_start_date'in gün indeksi karşılığı: kesim gece yarısı değilse ertesi gün"""
+    return -((hours * 3600 - tick) // DAY_SECONDS)
+
+
+def window_end_day(tick: int, hours: int) -> int:
+    """AnomalyDetector.window_end_date'in gün indeksi karşılığı"""
+    return (tick - hours * 3600) // DAY_SECONDS
+
+
+class _Replay:
+    """Bir çalışanın anlık görüntü üzerindeki değerlendirmesi; pencere ve geç kargo sonuçlarını önbelleğe alır"""
+
+    def __init__(self, columns: np.ndarray, products: int, customers: int):
+        self.columns = columns
+        self.products = products
+        self.groups = products + customers
+        self.days = columns['day']
+        # Ürün ve müşteri tek grup kod uzayında: müşteri kodu ürün sayısı kadar kaydırılır
+        self.group_codes = [columns['product'].astype(np.int64), columns['customer'].astype(np.int64) + products]
+        late = np.isin(columns['status'], LATE_CODES)
+        self.late_days = self.days[late]
+        self.late_groups = [codes[late] for codes in self.group_codes]
+        self.min_orders = np.array([GROUP_MIN_ORDERS['product']] * products + [GROUP_MIN_ORDERS['customer']] * customers)
+        self.min_cancelled = np.array([GROUP_MIN_CANCELLED['product']] * products
+                                      + [GROUP_MIN_CANCELLED['customer']] * customers)
+        self.min_late = np.array([GROUP_MIN_LATE_ORDERS['product']] * products
+                                 + [GROUP_MIN_LATE_ORDERS['customer']] * customers)
+        self._windows: Dict = {}
+        self._late: Dict[int, frozenset] = {}
+        self._late_counts = np.zeros(self.groups, dtype=np.int64)
+        self._late_through: Optional[int] = None
+
+    def cancel_window(self, first_day: int, last_day: int):
+        """[first_day, last_day] günlerindeki genel ve grup iptal oranları: (anahtarlar, oranlar)"""
+        key = (first_day, last_day)
+        if key not in self._windows:
+            lo, hi = np.searchsorted(self.days, [first_day, last_day + 1])
+            status = self.columns['status'][lo:hi]
+            cancelled = status == CANCELLED
+            total = hi - lo
+            keys, rates = [GLOBAL_KEY], [cancelled.sum() / total * 100 if total else 0.0]
+            recent = np.zeros(self.groups, dtype=np.int64)
+            cancels = np.zeros(self.groups, dtype=np.int64)
+            for codes in self.group_codes:
+                recent += np.bincount(codes[lo:hi], minlength=self.groups)
+                cancels += np.bincount(codes[lo:hi][cancelled], minlength=self.groups)
+            candidates = np.flatnonzero((recent >= self.min_orders) & (cancels >= self.min_cancelled))
+            keys.extend(candidates.tolist())
+            rates.extend((cancels[candidates] / recent[candidates] * 100).tolist())
+            self._windows[key] = (np.array(keys), np.array(rates, dtype=np.float64))
+        return self._windows[key]
+
+    def late_keys(self, end_day: int) -> frozenset:
+        """end_day ve öncesindeki bekleyen/kargodaki siparişlerden geç kargo anahtarları.
+
+        Gün sayıları artan end_day'ler için biriktirilir; geriye gidilirse baştan hesaplanır.
+        """
+        if end_day in self._late:
+            return self._late[end_day]
+        if self._late_through is None or end_day < self._late_through:
+            self._late_counts[:] = 0
+            lo = 0
+        else:
+            lo = np.searchsorted(self.late_days, self._late_through + 1)
+        hi = np.searchsorted(self.late_days, end_day + 1)
+        for codes in self.late_groups:
+            self._late_counts += np.bincount(codes[lo:hi], minlength=self.groups)
+        self._late_through = end_day
+
+        counts = self._late_counts
+        keys = set()
+        if hi > 0:
+            keys.add(GLOBAL_KEY)
+        # Ortalama, kapsam başına geciken siparişi olan gruplar üzerinden alınır (SQL'deki AVG OVER ())
+        for scope in (slice(0, self.products), slice(self.products, self.groups)):
+            scoped = counts[scope]
+            late_groups = scoped[scoped > 0]
+            if not len(late_groups):
+                continue
+            flagged = (scoped >= self.min_late[scope]) & (scoped > late_groups.mean() * LATE_OUTLIER_FACTOR)
+            keys.update((np.flatnonzero(flagged) + scope.start).tolist())
+        self._late[end_day] = frozenset(keys)
+        return self._late[end_day]
+
+    def run(self, first_day: int, last_day: int, cancel_thresholds: Sequence[float],
+            late_thresholds: Sequence[int], step_seconds: int):
+        """Günler [first_day, last_day] için eşik başına gün gün yeni anomali sayıları"""
+        ticks = np.arange(first_day * DAY_SECONDS, (last_day + 1) * DAY_SECONDS, step_seconds).tolist()
+        days = last_day - first_day + 1
+        cancel_new = np.zeros((days, len(cancel_thresholds)), dtype=np.int64)
+        late_new = np.zeros((days, len(late_thresholds)), dtype=np.int64)
+
+        # Parçanın ilk anındaki yeni anomaliler için önceki anın durumu da hesaplanır
+        previous_tick = first_day * DAY_SECONDS - step_seconds
+        # Geç kargo sayıları artan gün sırasıyla biriktirilir; eşikler arasında gidip gelmemek için
+        # parçanın ihtiyaç duyduğu tüm günler önceden hesaplanır
+        for end in sorted({window_end_day(tick, hours) for tick in [previous_tick] + ticks for hours in late_thresholds}):
+            self.late_keys(end)
+        previous_window = (window_start_day(previous_tick, CANCEL_WINDOW_HOURS), previous_tick // DAY_SECONDS)
+        keys, rates = self.cancel_window(*previous_window)
+        cancel_active = [frozenset(keys[rates > threshold].tolist()) for threshold in cancel_thresholds]
+        late_ends = [window_end_day(previous_tick, hours) for hours in late_thresholds]
+        late_active = [self.late_keys(end) for end in late_ends]
+
+        for tick in ticks:
+            day = tick // DAY_SECONDS
+            row = day - first_day
+            window = (window_start_day(tick, CANCEL_WINDOW_HOURS), day)
+            # Pencere değişmediyse aktif anahtarlar da değişmez
+            if window != previous_window:
+                keys, rates = self.cancel_window(*window)
+                for index, threshold in enumerate(cancel_thresholds):
+                    active = frozenset(keys[rates > threshold].tolist())
+                    cancel_new[row, index] += len(active - cancel_active[index])
+                    cancel_active[index] = active
+                previous_window = window
+            for index, hours in enumerate(late_thresholds):
+                end = window_end_day(tick, hours)
+                if end != late_ends[index]:
+                    active = self.late_keys(end)
+                    late_new[row, index] += len(active - late_active[index])
+                    late_active[index], late_ends[index] = active, end
+        return first_day, cancel_new, late_new
+
+
+# Çalışan süreçlerin paylaşılan bellekteki anlık görüntüsü (initializer ile bağlanır)
+_worker_state: Dict = {}
+
+
+def _attach_snapshot(name: str, length: int, products: int, customers: int):
+    memory = shared_memory.SharedMemory(name=name)
+    columns = np.ndarray((length,), dtype=SNAPSHOT_DTYPE, buffer=memory.buf)
+    _worker_state['memory'] = memory
+    _worker_state['replay'] = _Replay(columns, products, customers)
+
+
+def _run_chunk(first_day: int, last_day: int, cancel_thresholds, late_thresholds, step_seconds: int):
+    return _worker_state['replay'].run(first_day, last_day, cancel_thresholds, late_thresholds, step_seconds)
+
+
+def _day_chunks(first_day: int, last_day: int, count: int) -> List[tuple]:
+    bounds = np.linspace(first_day, last_day + 1, min(count, last_day - first_day + 1) + 1).astype(int)
+    return [(int(start), int(end) - 1) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def run_backtest(snapshot: BacktestSnapshot, cancel_thresholds: Sequence[float], late_thresholds: Sequence[int],
+                 days: Optional[int] = None, step_hours: int = DEFAULT_STEP_HOURS, workers: Optional[int] = None,
+                 now: Optional[int] = None) -> Dict:
+    """Izgaradaki her (iptal oranı, geç kargo) kombinasyonu için gün başına yeni anomali sayıları.
+
+    days: sadece son bu kadar günü oynat (None: tüm geçmiş). workers: süreç sayısı (1: aynı süreçte).
+    """
+    started = time.perf_counter()
+    cancel_thresholds = list(cancel_thresholds)
+    late_thresholds = list(late_thresholds)
+    if not len(snapshot):
+        return {'days': [], 'combinations': [], 'orders': 0, 'workers': 0, 'duration_ms': 0.0}
+
+    now = int(time.time()) if now is None else int(now)
+    last_day = max(int(snapshot.columns['day'][-1]), now // DAY_SECONDS)
+    first_day = int(snapshot.columns['day'][0])
+    if days is not None:
+        first_day = max(first_day, last_day - days + 1)
+    step_seconds = step_hours * 3600
+    workers = max(1, min(workers or os.cpu_count() or 1, MAX_WORKERS, last_day - first_day + 1))
+
+    cancel_new = np.zeros((last_day - first_day + 1, len(cancel_thresholds)), dtype=np.int64)
+    late_new = np.zeros((last_day - first_day + 1, len(late_thresholds)), dtype=np.int64)
+
+    def collect(result):
+        chunk_first, chunk_cancel, chunk_late = result
+        offset = chunk_first - first_day
+        cancel_new[offset:offset + len(chunk_cancel)] = chunk_cancel
+        late_new[offset:offset + len(chunk_late)] = chunk_late
+
+    if workers == 1:
+        collect(_Replay(snapshot.columns, snapshot.products, snapshot.customers)
+                .run(first_day, last_day, cancel_thresholds, late_thresholds, step_seconds))
+    else:
+        memory = shared_memory.SharedMemory(create=True, size=max(snapshot.columns.nbytes, 1))
+        try:
+            np.ndarray(snapshot.columns.shape, dtype=SNAPSHOT_DTYPE, buffer=memory.buf)[:] = snapshot.columns
+            # spawn: sunucu thread'leri ve açık SQLite bağlantıları çalışanlara kopyalanmaz
+            with ProcessPoolExecutor(workers, mp_context=get_context('spawn'), initializer=_attach_snapshot,
+                                     initargs=(memory.name, len(snapshot), snapshot.products,
+                                               snapshot.customers)) as pool:
+                futures = [pool.submit(_run_chunk, start, end, cancel_thresholds, late_thresholds, step_seconds)
+                           for start, end in _day_chunks(first_day, last_day, workers * CHUNKS_PER_WORKER)]
+                for future in futures:
+                    collect(future.result())
+        finally:
+            memory.close()
+            memory.unlink()
+
+    dates = [datetime.fromtimestamp(day * DAY_SECONDS, timezone.utc).strftime('%Y-%m-%d')
+             for day in range(first_day, last_day + 1)]
+    combinations = []
+    for cancel_index, cancel_threshold in enumerate(cancel_thresholds):
+        for late_index, late_threshold in enumerate(late_thresholds):
+            cancel_daily = cancel_new[:, cancel_index].tolist()
+            late_daily = late_new[:, late_index].tolist()
+            totals = [c + l for c, l in zip(cancel_daily, late_daily)]
+            combinations.append({
+                'cancelRateThreshold': cancel_threshold,
+                'lateShippingThreshold': late_threshold,
+                'total': sum(totals),
+                'peak_day': dates[int(np.argmax(totals))] if any(totals) else None,
+                'daily': {
+                    'anomaly.highCancelRate': cancel_daily,
+                    'anomaly.lateShipping': late_daily,
+                    'total': totals,
+                },
+            })
+    return {
+        'days': dates,
+        'combinations': combinations,
+        'orders': len(snapshot),
+        'step_hours': step_hours,
+        'workers': workers,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def parse_number_list(value: str, cast=float) -> List:
+    return list(dict.fromkeys(cast(part) for part in value.split(',') if part.strip()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Anomali eşiklerini geçmiş siparişler üzerinde geri test et")
+    parser.add_argument("--cancel", default="10,15,20,25,30", help="İptal oranı eşikleri (%%)")
+    parser.add_argument("--late", default="24,48,72", help="Geç kargo eşikleri (saat)")
+    parser.add_argument("--days", type=int, help="Sadece son N günü oynat")
+    parser.add_argument("--step-hours", type=int, default=DEFAULT_STEP_HOURS)
+    parser.add_argument("--workers", type=int, help="Süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument("--json", action="store_true", help="Sonucu JSON olarak yazdır")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH)
+    load_started = time.perf_counter()
+    snapshot = load_backtest_snapshot(conn)
+    conn.close()
+    load_ms = (time.perf_counter() - load_started) * 1000
+
+    result = run_backtest(snapshot, parse_number_list(args.cancel), parse_number_list(args.late, int),
+                          days=args.days, step_hours=args.step_hours, workers=args.workers)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+        sys.exit(0)
+
+    print(f"📥 {result['orders']:,} sipariş yüklendi ({load_ms:.0f} ms)")
+    print(f"🔁 {len(result['combinations'])} kombinasyon × {len(result['days'])} gün, "
+          f"{result['workers']} süreç, {result['duration_ms']:.0f} ms")
+    for combination in sorted(result['combinations'], key=lambda c: c['total']):
+        daily_average = combination['total'] / max(len(result['days']), 1)
+        print(f"   iptal > {combination['cancelRateThreshold']:g}%, geç kargo {combination['lateShippingThreshold']} saat: "
+              f"{combination['total']} anomali ({daily_average:.1f}/gün, en yoğun gün {combination['peak_day']})")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Eşik Geri Testi Benchmark'ı
+Geçici bir veritabanına sentetik siparişler yazar, anlık görüntüyü bir kez yükler ve
+10 iptal oranı × 10 geç kargo eşiğinden oluşan 100 noktalık ızgarayı tek süreçte ve süreç
+havuzuyla oynatır. İki yolun gün gün aynı sonucu verdiği de kontrol edilir.
+
+Kullanım (backend dizininden):
+    python benchmarks/bench_backtest.py
+    python benchmarks/bench_backtest.py --orders 200000 --days 90 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from backtest import load_backtest_snapshot, run_backtest
+from bench_window_engine import iso
+from bulk_ingest import INSERT_ORDER_SQL
+from database import create_schema
+from db_pool import get_pool
+
+PRODUCTS = [f"Ürün {i:03d}" for i in range(200)]
+CUSTOMERS = [f"Müşteri {i:05d}" for i in range(20000)]
+# Gerçekçi bir dağılım: çoğu sipariş teslim edilmiş, az bir kısmı iptal
+STATUSES = ["pending", "shipped", "delivered", "cancelled"]
+STATUS_WEIGHTS = [5, 10, 75, 10]
+INSERT_BATCH = 100000
+
+CANCEL_GRID = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50]
+LATE_GRID = [12, 24, 36, 48, 60, 72, 96, 120, 144, 168]
+
+
+def build_database(db_path: str, count: int, now: int, days: int):
+    """Son `days` güne yayılmış count sipariş yaz (satır başı tetikleyiciler bulk_load ile atlanır)"""
+    conn = get_pool(db_path).acquire()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_schema(conn)
+        for start in range(0, count, INSERT_BATCH):
+            batch = min(start + INSERT_BATCH, count) - start
+            statuses = random.choices(STATUSES, STATUS_WEIGHTS, k=batch)
+            rows = [
+                (f"ORD-{start + i:09d}", iso(now - random.randint(0, days * 86400)), random.choice(CUSTOMERS),
+                 random.choice(PRODUCTS), round(random.uniform(100, 60000), 2), statuses[i], None, None)
+                for i in range(batch)
+            ]
+            conn.execute("INSERT INTO bulk_load(active) VALUES (1)")
+            conn.executemany(INSERT_ORDER_SQL, rows)
+            conn.execute("DELETE FROM bulk_load")
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eşik geri testi benchmark'ı")
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365, help="Siparişlerin yayılacağı gün sayısı")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    now = int(time.time())
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        build_database(db_path, args.orders, now, args.days)
+        print(f"{args.orders} sipariş yazıldı ({time.perf_counter() - started:.1f} s)")
+
+        conn = get_pool(db_path).acquire()
+        try:
+            started = time.perf_counter()
+            snapshot = load_backtest_snapshot(conn)
+            load_seconds = time.perf_counter() - started
+        finally:
+            conn.close()
+        get_pool(db_path).close_all()
+
+        grid = len(CANCEL_GRID) * len(LATE_GRID)
+        print(f"Anlık görüntü yükleme:          {load_seconds * 1000:>9.1f} ms")
+        results = {}
+        for workers in dict.fromkeys([1, args.workers]):
+            started = time.perf_counter()
+            results[workers] = run_backtest(snapshot, CANCEL_GRID, LATE_GRID, workers=workers, now=now)
+            elapsed = time.perf_counter() - started
+            print(f"{grid} nokta, {results[workers]['workers']} süreç:          {elapsed * 1000:>9.1f} ms "
+                  f"({len(results[workers]['days'])} gün)")
+
+        first, last = results[1], results[args.workers]
+        same = [c['daily'] for c in first['combinations']] == [c['daily'] for c in last['combinations']]
+        print("✅ Süreç havuzu sonuçları tek süreçle aynı" if same else "❌ Süreç havuzu sonuçları farklı")
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
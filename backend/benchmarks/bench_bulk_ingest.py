@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Toplu Yükleme Benchmark'ı
+Geçici ve boş bir veritabanına POST /orders/bulk'un kullandığı yolla (NDJSON ayrıştırma,
+parti doğrulama, executemany + tetikleyiciler) sentetik siparişler yazar ve saniyedeki
+sipariş sayısını ölçer. Hedef: dizüstü bilgisayarda ~50k sipariş/s.
+
+Kullanım (backend dizininden):
+    python benchmarks/bench_bulk_ingest.py
+    python benchmarks/bench_bulk_ingest.py --orders 200000 --batch-size 5000 10000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bulk_ingest import ingest_orders, parse_bulk_body
+from counters import check_counters
+from database import create_schema
+from db_pool import get_pool
+from detector_aggregates import check_detector_aggregates
+from main import Order
+from rollups import check_rollups
+
+TARGET_ORDERS_PER_SECOND = 50000
+
+CUSTOMERS = ["Ahmet Yılmaz", "Zeynep Kaya", "Mehmet Özkan", "Fatma Demir", "Ali Şahin", "Işıl Çınar"]
+PRODUCTS = ["iPhone 15 Pro", "Samsung Galaxy S24", "MacBook Air M3", "AirPods Pro", "PlayStation 5"]
+STATUSES = ["pending", "shipped", "delivered", "cancelled"]
+
+
+def make_payload(count: int, prefix: str) -> bytes:
+    """count adet siparişi NDJSON gövdesi olarak üret"""
+    now = datetime.now()
+    lines = []
+    for i in range(count):
+        date = now - timedelta(minutes=random.randint(0, 60 * 24 * 90))
+        lines.append(json.dumps({
+            "id": f"{prefix}-{i:08d}",
+            "date": date.strftime('%Y-%m-%dT%H:%M:%S'),
+            "customer": random.choice(CUSTOMERS),
+            "product": random.choice(PRODUCTS),
+            "amount": round(random.uniform(100, 60000), 2),
+            "status": random.choice(STATUSES),
+        }, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def run(db_path: str, payload: bytes, batch_size: int):
+    conn = get_pool(db_path).acquire()
+    try:
+        started = time.perf_counter()
+        records, parse_errors = parse_bulk_body(payload, "application/x-ndjson")
+        parsed = time.perf_counter()
+        result = ingest_orders(conn, records, Order, parse_errors, batch_size=batch_size)
+        finished = time.perf_counter()
+    finally:
+        conn.close()
+    return result, parsed - started, finished - parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Toplu sipariş yükleme benchmark'ı")
+    parser.add_argument("--orders", type=int, default=100000, help="Her turda yazılacak sipariş sayısı")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1000, 5000, 20000])
+    args = parser.parse_args()
+
+    print(f"{'parti':>8} {'sipariş':>10} {'ayrıştırma s':>13} {'yazma s':>9} {'sipariş/s':>11} {'hedef':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        conn = get_pool(db_path).acquire()
+        create_schema(conn)
+        conn.close()
+
+        for round_no, batch_size in enumerate(args.batch_size):
+            payload = make_payload(args.orders, f"BENCH{round_no}")
+            result, parse_seconds, ingest_seconds = run(db_path, payload, batch_size)
+            rate = result["inserted"] / (parse_seconds + ingest_seconds)
+            mark = "✅" if rate >= TARGET_ORDERS_PER_SECOND else "❌"
+            print(f"{batch_size:>8} {result['inserted']:>10} {parse_seconds:>13.2f} {ingest_seconds:>9.2f} "
+                  f"{rate:>11.0f} {mark:>6}")
+
+        # Tetikleyicilerle güncellenen sayaçlar, özetler ve tespit günlüğü tam yeniden hesaplamayla aynı olmalı
+        conn = get_pool(db_path).acquire()
+        try:
+            cursor = conn.cursor()
+            differences = check_counters(cursor) + check_rollups(cursor) + check_detector_aggregates(cursor)
+        finally:
+            conn.close()
+        print("✅ Sayaçlar, saatlik özetler ve tespit özetleri tutarlı" if not differences else f"❌ {len(differences)} tutarsızlık")
+        get_pool(db_path).close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Eşzamanlılık Benchmark'ı
+API'yi gerçek bir uvicorn sunucusunda başlatır ve artan eşzamanlı istemci sayısıyla
+saniyedeki istek sayısını (req/s) ve gecikme yüzdeliklerini ölçer.
+
+Kullanım (backend dizininden):
+    python benchmarks/bench_concurrency.py
+    python benchmarks/bench_concurrency.py --clients 1 2 4 8 16 --requests 400 --path "/orders?search=iph"
+"""
+import argparse
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import uvicorn
+
+DEFAULT_PATHS = ["/orders?search=iph", "/dashboard/stats", "/anomalies", "/settings"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> uvicorn.Server:
+    """Sunucuyu arka plan thread'inde başlat ve hazır olana kadar bekle"""
+    from main import app
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def fetch(url: str) -> float:
+    started = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def run_level(base_url: str, paths, clients: int, total_requests: int):
+    urls = [base_url + paths[i % len(paths)] for i in range(total_requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(fetch, urls))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "clients": clients,
+        "rps": total_requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API eşzamanlılık benchmark'ı")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=400, help="Her seviyede gönderilecek istek sayısı")
+    parser.add_argument("--path", action="append", dest="paths", help="Test edilecek yol (birden fazla verilebilir)")
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    port = free_port()
+    server = start_server(port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    # Isınma: bağlantı havuzu ve sayfa önbelleği dolsun
+    run_level(base_url, paths, 4, 40)
+
+    print(f"Yollar: {', '.join(paths)}")
+    print(f"{'istemci':>8} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'ölçek':>8}")
+    baseline = None
+    for clients in args.clients:
+        result = run_level(base_url, paths, clients, args.requests)
+        baseline = baseline or result["rps"]
+        print(f"{result['clients']:>8} {result['rps']:>10.1f} {result['p50']:>10.2f} "
+              f"{result['p99']:>10.2f} {result['rps'] / baseline:>7.2f}x")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Grup Bazlı Tespit Benchmark'ı
+Geniş katalog ve müşteri tabanına sahip geçici bir veritabanında ürün/müşteri bazlı tespitin
+(gruplu özet sorguları + sipariş atfı + toplu eşitleme) süresini ölçer. Hedef: 1 saniyenin altı.
+
+Kullanım (backend dizininden):
+    python benchmarks/bench_grouped_detection.py
+    python benchmarks/bench_grouped_detection.py --orders 200000 --products 2000 --customers 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from anomaly_detector import GROUP_COMPARE_COLUMNS, GROUP_UPDATE_COLUMNS, AnomalyDetector
+from anomaly_repository import AnomalyRepository
+from bulk_ingest import INSERT_ORDER_SQL
+from database import create_schema
+from db_pool import get_pool
+from detector_aggregates import rebuild_detector_aggregates
+
+TARGET_SECONDS = 1.0
+RECENT_STATUSES = ["pending"] * 7 + ["shipped"] * 6 + ["delivered"] * 5 + ["cancelled"] * 2
+# Eski siparişlerin çoğu teslim edilmiştir; az bir kısmı geç kargo olarak bekler
+OLD_STATUSES = ["delivered"] * 16 + ["cancelled"] * 3 + ["shipped"]
+INSERT_BATCH = 100000
+
+
+def build_database(db_path: str, args):
+    """Sentetik siparişleri tetikleyicisiz yaz, ardından tespit özetlerini bir kez hesapla"""
+    now = datetime.now()
+    conn = get_pool(db_path).acquire()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_schema(conn)
+        for start in range(0, args.orders, INSERT_BATCH):
+            rows = []
+            for i in range(start, min(start + INSERT_BATCH, args.orders)):
+                age_minutes = random.randint(0, args.days * 24 * 60)
+                status = random.choice(RECENT_STATUSES if age_minutes < 2 * 24 * 60 else OLD_STATUSES)
+                rows.append((f"ORD-{i:09d}", (now - timedelta(minutes=age_minutes)).strftime('%Y-%m-%d'),
+                             f"Müşteri {random.randrange(args.customers):06d}", f"Ürün {random.randrange(args.products):05d}",
+                             round(random.uniform(100, 60000), 2), status, None, None))
+            conn.execute("INSERT INTO bulk_load(active) VALUES (1)")
+            conn.executemany(INSERT_ORDER_SQL, rows)
+            conn.execute("DELETE FROM bulk_load")
+            conn.commit()
+        rebuild_detector_aggregates(conn.cursor())
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ürün/müşteri bazlı tespit benchmark'ı")
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=30, help="Siparişlerin yayılacağı gün sayısı")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        build_database(db_path, args)
+        print(f"{args.orders} sipariş, {args.products} ürün, {args.customers} müşteri yazıldı "
+              f"({time.perf_counter() - started:.1f} s)")
+
+        detector = AnomalyDetector(db_path)
+        settings = detector.get_current_settings()
+        print(f"{'tur':>6} {'aday':>7} {'tespit s':>9} {'eşitleme s':>11} {'toplam s':>9} {'hedef':>6}")
+        for round_name in ("ilk", "tekrar"):
+            started = time.perf_counter()
+            anomalies = detector.detect_grouped_anomalies(settings)
+            detected = time.perf_counter()
+            conn = detector.get_db_connection()
+            try:
+                AnomalyRepository(conn, f"BENCH-{round_name}").sync(
+                    'group', anomalies, GROUP_COMPARE_COLUMNS, GROUP_UPDATE_COLUMNS)
+                conn.commit()
+            finally:
+                conn.close()
+            finished = time.perf_counter()
+            total = finished - started
+            mark = "✅" if total < TARGET_SECONDS else "❌"
+            print(f"{round_name:>6} {len(anomalies):>7} {detected - started:>9.3f} {finished - detected:>11.3f} "
+                  f"{total:>9.3f} {mark:>5}")
+        get_pool(db_path).close_all()
+
+
+if __name__ == "__main__":
+    main()
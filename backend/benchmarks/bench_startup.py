@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Açılış Süresi Benchmark'ı
+Geçici bir dizine backend kodunu ve sentetik siparişlerle doldurulmuş bir veritabanı koyar,
+son güncellemeyi dün olarak işaretler ve API'yi ayrı bir süreçte soğuk başlatır:
+- açılış: startup olayı bitip ilk isteğin yanıtlanmasına kadar geçen süre (satır sayısından bağımsız olmalı)
+- tarih kaydırması: arka planda çalışan küme tabanlı kaydırmanın süresi
+İkinci açılışta tarihler günceldir ve kaydırma yapılmaz. Son olarak sunucu `python run.py` ile gerçek
+bir süreç olarak başlatılır; süreç başlangıcından ilk /health ve ilk veri yanıtlarına kadar geçen süre
+ölçülür (hedef: /health 200 ms içinde). --legacy ile eski satır başı UPDATE
+döngüsü de aynı veritabanının bir kopyasında ölçülür (1M siparişte dakikalar sürer).
+
+Kullanım (backend dizininden):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --orders 200000 --legacy
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import socket
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bulk_ingest import ingest_orders
+from counters import check_counters
+from database import create_schema
+from db_pool import get_pool
+from detector_aggregates import check_detector_aggregates
+from main import Order
+from rollups import check_rollups
+
+CUSTOMERS = [f"Müşteri {i:04d}" for i in range(5000)]
+PRODUCTS = [f"Ürün {i:03d}" for i in range(200)]
+STATUSES = ["pending", "shipped", "delivered", "cancelled"]
+ANOMALY_TYPES = ["anomaly.highCancelRate", "anomaly.lateShipping", "anomaly.priceAnomaly"]
+
+# Açılışı ölçen ayrı süreç: import, startup olayı ve ilk istek; ardından arka plandaki kaydırmayı bekler
+STARTUP_PROBE = r"""
+import json, sqlite3, sys, time
+from datetime import datetime
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+import main
+imported = time.perf_counter()
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    client.get('/dashboard/stats')
+    first_response = time.perf_counter()
+    today = datetime.now().strftime('%Y-%m-%d')
+    conn = sqlite3.connect('ecommerce.db')
+    while conn.execute("SELECT last_update_date FROM system_info").fetchone()[0] != today:
+        time.sleep(0.01)
+    refreshed = time.perf_counter()
+    conn.close()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'startup_ms': (ready - imported) * 1000,
+                  'first_response_ms': (first_response - imported) * 1000,
+                  'refresh_ms': (refreshed - ready) * 1000}))
+"""
+
+
+def build_database(db_path: str, count: int, days: int):
+    """count siparişi toplu yükleme yoluyla, birkaç bin anomali ve bildirimi doğrudan yaz"""
+    conn = get_pool(db_path).acquire()
+    try:
+        create_schema(conn)
+        now = datetime.now()
+        records = [
+            (i, {"id": f"ORD-{i:09d}", "date": (now - timedelta(days=random.randint(0, days))).strftime('%Y-%m-%d'),
+                 "customer": random.choice(CUSTOMERS), "product": random.choice(PRODUCTS),
+                 "amount": round(random.uniform(100, 60000), 2), "status": random.choice(STATUSES)})
+            for i in range(count)
+        ]
+        result = ingest_orders(conn, records, Order)
+        conn.executemany(
+            "INSERT INTO anomalies(id, type, severity, description, date, suggestions) VALUES (?, ?, ?, ?, ?, '[]')",
+            [(f"ANO-BENCH-{i}", random.choice(ANOMALY_TYPES), "medium", "benchmark",
+              (now - timedelta(hours=random.randint(0, days * 24))).strftime('%Y-%m-%dT%H:%M:%SZ'))
+             for i in range(5000)])
+        conn.executemany(
+            "INSERT INTO notifications(id, title, message, type, date, read) VALUES (?, 't', 'm', 'info', ?, 0)",
+            [(f"NOT-BENCH-{i}", (now - timedelta(hours=random.randint(0, days * 24))).strftime('%Y-%m-%dT%H:%M:%SZ'))
+             for i in range(5000)])
+        # Son güncelleme dün: ilk açılış verileri bir gün kaydırmalı
+        yesterday = (now - timedelta(days=1)).strftime('%Y-%m-%d')
+        conn.execute("DELETE FROM system_info")
+        conn.execute("INSERT INTO system_info(last_update_date, created_at) VALUES (?, ?)",
+                     (yesterday, now.strftime('%Y-%m-%dT%H:%M:%SZ')))
+        conn.commit()
+    finally:
+        conn.close()
+    get_pool(db_path).close_all()
+    return result['inserted']
+
+
+def legacy_update_dates(cursor):
+    """Önceki sürümün yaklaşımı: her sipariş, anomali ve bildirim için ayrı UPDATE"""
+    base_date = datetime.now()
+    for table, date_format in (('orders', '%Y-%m-%d'), ('anomalies', '%Y-%m-%dT%H:%M:%SZ'),
+                               ('notifications', '%Y-%m-%dT%H:%M:%SZ')):
+        for (row_id,) in cursor.execute(f"SELECT id FROM {table}").fetchall():
+            new_date = (base_date - timedelta(days=random.randint(0, 6), hours=random.randint(0, 23))).strftime(date_format)
+            cursor.execute(f"UPDATE {table} SET date = ? WHERE id = ?", (new_date, row_id))
+
+
+def cold_start(workdir: str) -> dict:
+    output = subprocess.run([sys.executable, "-c", STARTUP_PROBE], cwd=workdir, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str, timeout: float = 30.0) -> bytes:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+def serve_start(workdir: str, timeout: float = 60.0) -> dict:
+    """run.py'yi ayrı süreçte başlat; süreç başlangıcından ilk /health ve ilk veri yanıtlarına kadar geçen süre"""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "run.py", "--host", "127.0.0.1", "--port", str(port)], cwd=workdir,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                _get(f"{base}/health", timeout=1.0)
+                break
+            except OSError:
+                if process.poll() is not None or time.perf_counter() - started > timeout:
+                    raise RuntimeError("Sunucu başlatılamadı")
+                time.sleep(0.005)
+        health = time.perf_counter()
+        _get(f"{base}/dashboard/stats")
+        stats = time.perf_counter()
+        _get(f"{base}/orders?limit=200")
+        orders = time.perf_counter()
+    finally:
+        process.terminate()
+        process.wait(30)
+    return {'health_ms': (health - started) * 1000, 'first_stats_ms': (stats - health) * 1000,
+            'first_orders_ms': (orders - stats) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Açılış süresi benchmark'ı")
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=30, help="Siparişlerin yayılacağı gün sayısı")
+    parser.add_argument("--legacy", action="store_true", help="Eski satır başı güncellemeyi de ölç")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in glob.glob(os.path.join(BACKEND_DIR, "*.py")):
+            shutil.copy(path, tmp)
+        db_path = os.path.join(tmp, "ecommerce.db")
+        started = time.perf_counter()
+        inserted = build_database(db_path, args.orders, args.days)
+        print(f"{inserted} sipariş yazıldı ({time.perf_counter() - started:.1f} s)")
+
+        if args.legacy:
+            legacy_path = os.path.join(tmp, "legacy.db")
+            with sqlite3.connect(db_path) as source, sqlite3.connect(legacy_path) as target:
+                source.backup(target)
+            conn = sqlite3.connect(legacy_path)
+            started = time.perf_counter()
+            legacy_update_dates(conn.cursor())
+            conn.commit()
+            conn.close()
+            print(f"Eski yaklaşım (satır başı UPDATE):  {(time.perf_counter() - started) * 1000:>10.1f} ms")
+
+        first = cold_start(tmp)
+        second = cold_start(tmp)
+        print(f"İlk açılış (startup olayı):         {first['startup_ms']:>10.1f} ms")
+        print(f"İlk açılış (ilk yanıt):             {first['first_response_ms']:>10.1f} ms")
+        print(f"Arka planda tarih kaydırması:       {first['refresh_ms']:>10.1f} ms")
+        print(f"İkinci açılış (startup olayı):      {second['startup_ms']:>10.1f} ms")
+        print(f"Modül yükleme (import main):        {first['import_ms']:>10.1f} ms")
+
+        served = serve_start(tmp)
+        print(f"run.py süreç başlangıcı → /health:  {served['health_ms']:>10.1f} ms")
+        print(f"İlk /dashboard/stats yanıtı:        {served['first_stats_ms']:>10.1f} ms")
+        print(f"İlk /orders yanıtı:                 {served['first_orders_ms']:>10.1f} ms")
+
+        # Kaydırma özetleri tetikleyicisiz güncellediğinden tam yeniden hesaplamayla aynı olmalı
+        conn = get_pool(db_path).acquire()
+        try:
+            cursor = conn.cursor()
+            differences = check_counters(cursor) + check_rollups(cursor) + check_detector_aggregates(cursor)
+        finally:
+            conn.close()
+        get_pool(db_path).close_all()
+        print("✅ Sayaçlar, saatlik özetler ve tespit özetleri tutarlı" if not differences
+              else f"❌ {len(differences)} tutarsızlık")
+        if differences:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
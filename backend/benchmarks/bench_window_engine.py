@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Çok Pencereli Motor Benchmark'ı
+Geçici bir veritabanına sentetik siparişler yazar; aynı pencere ve eşikleri (1s/6s/24s/7g,
+geç kargo 24/48/72s) pencere başına ayrı SQL sorgularıyla ve window_engine ile hesaplayıp
+süreleri karşılaştırır. Sonuçların birebir aynı olduğu da kontrol edilir.
+
+Kullanım (backend dizininden):
+    python benchmarks/bench_window_engine.py
+    python benchmarks/bench_window_engine.py --orders 200000 --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bulk_ingest import INSERT_ORDER_SQL
+from database import create_schema
+from db_pool import get_pool
+from window_engine import (DEFAULT_LATE_THRESHOLDS_HOURS, DEFAULT_WINDOWS_HOURS, LATE_STATUSES,
+                           evaluate_windows, load_snapshot)
+
+PRODUCTS = [f"Ürün {i:03d}" for i in range(200)]
+STATUSES = ["pending", "shipped", "delivered", "cancelled"]
+INSERT_BATCH = 100000
+
+
+def iso(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def build_database(db_path: str, count: int, now: int, days: int):
+    """Son `days` güne yayılmış count sipariş yaz (satır başı tetikleyiciler bulk_load ile atlanır)"""
+    conn = get_pool(db_path).acquire()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_schema(conn)
+        for start in range(0, count, INSERT_BATCH):
+            rows = [
+                (f"ORD-{i:09d}", iso(now - random.randint(0, days * 86400)), "Müşteri",
+                 random.choice(PRODUCTS), round(random.uniform(100, 60000), 2), random.choice(STATUSES), None, None)
+                for i in range(start, min(start + INSERT_BATCH, count))
+            ]
+            conn.execute("INSERT INTO bulk_load(active) VALUES (1)")
+            conn.executemany(INSERT_ORDER_SQL, rows)
+            conn.execute("DELETE FROM bulk_load")
+            conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def sql_path(conn, now: int):
+    """Pencere/eşik başına ayrı sorgularla aynı ölçümler (mevcut yaklaşım)"""
+    windows = {}
+    for hours in DEFAULT_WINDOWS_HOURS:
+        cutoff = iso(now - hours * 3600)
+        total, cancelled = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'cancelled'), 0) FROM orders WHERE ts > unixepoch(?)", (cutoff,)
+        ).fetchone()
+        demand = dict(conn.execute(
+            "SELECT product, COUNT(*) FROM orders WHERE ts > unixepoch(?) GROUP BY product", (cutoff,)
+        ).fetchall())
+        windows[hours] = (total, cancelled, demand)
+    late = {}
+    placeholders = ', '.join('?' for _ in LATE_STATUSES)
+    for hours in DEFAULT_LATE_THRESHOLDS_HOURS:
+        late[hours] = conn.execute(
+            f"SELECT COUNT(*) FROM orders WHERE status IN ({placeholders}) AND ts <= unixepoch(?)",
+            (*LATE_STATUSES, iso(now - hours * 3600))
+        ).fetchone()[0]
+    return windows, late
+
+
+def engine_results(metrics):
+    windows = {}
+    for index, hours in enumerate(metrics.windows_hours):
+        counts = metrics.status_counts[index]
+        demand = {metrics.products[code]: int(value)
+                  for code, value in enumerate(metrics.product_counts[index]) if value}
+        windows[hours] = (int(counts.sum()), int(counts[3]), demand)
+    late = {hours: int(count) for hours, count in zip(metrics.late_thresholds_hours, metrics.late_counts)}
+    return windows, late
+
+
+def best_of(repeat: int, func):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Çok pencereli tespit motoru benchmark'ı")
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=30, help="Siparişlerin yayılacağı gün sayısı")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    now = int(time.time())
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        build_database(db_path, args.orders, now, args.days)
+        print(f"{args.orders} sipariş yazıldı ({time.perf_counter() - started:.1f} s)")
+
+        conn = get_pool(db_path).acquire()
+        try:
+            sql_seconds, sql_result = best_of(args.repeat, lambda: sql_path(conn, now))
+            load_seconds, snapshot = best_of(args.repeat, lambda: load_snapshot(conn))
+        finally:
+            conn.close()
+        compute_seconds, metrics = best_of(args.repeat, lambda: evaluate_windows(snapshot, now=now))
+
+        queries = 2 * len(DEFAULT_WINDOWS_HOURS) + len(DEFAULT_LATE_THRESHOLDS_HOURS)
+        print(f"SQL ({queries} sorgu):            {sql_seconds * 1000:>9.1f} ms")
+        print(f"Motor: anlık görüntü yükleme:   {load_seconds * 1000:>9.1f} ms")
+        print(f"Motor: tüm pencereler (NumPy):  {compute_seconds * 1000:>9.1f} ms")
+        print(f"Motor toplam:                   {(load_seconds + compute_seconds) * 1000:>9.1f} ms "
+              f"({sql_seconds / (load_seconds + compute_seconds):.1f}x)")
+        print(f"Yüklü görüntü üzerinden:        {sql_seconds / compute_seconds:.0f}x")
+
+        same = engine_results(metrics) == sql_result
+        print("✅ Sonuçlar SQL ile aynı" if same else "❌ Sonuçlar SQL ile farklı")
+        get_pool(db_path).close_all()
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
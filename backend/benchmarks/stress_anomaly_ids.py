@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Anomali Kimliği Çakışma Stres Testi
+Birden çok süreçte (her birinde birden çok thread) aynı anda milyonlarca kimlik üretir ve
+hepsini birleştirip çakışma olmadığını doğrular. Süreçler hem fork (üretici ebeveynde
+kullanılmışken kopyalanır) hem spawn ile başlatılır; her thread'in kimlikleri kesin artan olmalıdır. Sınırlı bir sürümü
+tests/test_id_generator.py'de pytest ile çalışır.
+
+Kullanım (backend dizininden):
+    python benchmarks/stress_anomaly_ids.py
+    python benchmarks/stress_anomaly_ids.py --processes 16 --ids 1000000 --threads 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from id_generator import ENCODED_LENGTH, anomaly_ids
+
+# Toplu ve tekli üretimi karıştırır: çoğu tur next_ids(BATCH), bazıları next_id()
+BATCH = 500
+ID_LENGTH = len(anomaly_ids.prefix) + 1 + ENCODED_LENGTH
+
+
+def generate(path: str, count: int, threads: int):
+    """count kimliği threads thread'e bölerek üret; her thread kendi dosyasına yazar"""
+    def worker(index: int, share: int):
+        ids = []
+        rounds = 0
+        while len(ids) < share:
+            if rounds % 10 == 0:
+                ids.append(anomaly_ids.next_id())
+            else:
+                ids.extend(anomaly_ids.next_ids(min(BATCH, share - len(ids))))
+            rounds += 1
+        with open(f"{path}.{index}", "w") as output:
+            output.write("\n".join(ids) + "\n")
+
+    shares = [count // threads + (1 if i < count % threads else 0) for i in range(threads)]
+    workers = [threading.Thread(target=worker, args=(i, share)) for i, share in enumerate(shares)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+
+def load(path: str) -> np.ndarray:
+    records = np.fromfile(path, dtype=f"S{ID_LENGTH + 1}")
+    return records.astype(f"S{ID_LENGTH}")  # sondaki satır sonu atılır
+
+
+def run(method: str, processes: int, count: int, threads: int, tmp: str):
+    context = multiprocessing.get_context(method)
+    paths = [os.path.join(tmp, f"{method}-{i}") for i in range(processes)]
+    started = time.perf_counter()
+    workers = [context.Process(target=generate, args=(path, count, threads)) for path in paths]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"Süreç başarısız oldu (çıkış kodu {process.exitcode})")
+    elapsed = time.perf_counter() - started
+
+    chunks, unordered = [], 0
+    for path in paths:
+        for index in range(threads):
+            ids = load(f"{path}.{index}")
+            unordered += int(np.count_nonzero(ids[1:] <= ids[:-1]))
+            chunks.append(ids)
+    all_ids = np.concatenate(chunks)
+    duplicates = len(all_ids) - len(np.unique(all_ids))
+    return len(all_ids), duplicates, unordered, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anomali kimliği çakışma stres testi")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=2, help="Süreç başına thread")
+    parser.add_argument("--ids", type=int, default=500000, help="Süreç başına kimlik")
+    args = parser.parse_args()
+
+    # fork ile başlayan çocuklar bu durumu (pid, sıra, önbellek) devralır
+    anomaly_ids.next_ids(1000)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for method in ("fork", "spawn"):
+            if method not in multiprocessing.get_all_start_methods():
+                continue
+            total, duplicates, unordered, elapsed = run(method, args.processes, args.ids, args.threads, tmp)
+            ok = duplicates == 0 and unordered == 0
+            failed = failed or not ok
+            print(f"{'✅' if ok else '❌'} {method:>5}: {args.processes} süreç × {args.threads} thread, "
+                  f"{total:,} kimlik, {duplicates} çakışma, {unordered} sıra dışı "
+                  f"({elapsed:.1f} s, {total / elapsed:,.0f} kimlik/s)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Toplu Sipariş Yükleme
+NDJSON veya JSON dizisi olarak gelen siparişleri BULK_BATCH_SIZE'lık partiler halinde doğrular
+ve her partiyi tek işlemde executemany ile yazar. Satır başı INSERT tetikleyicileri bulk_load
+işaretiyle atlanır; FTS indeksi, sayaçlar, saatlik özetler ve tespit değişiklik günlüğü aynı
+işlem içinde parti başına tek sorguyla güncellenir.
+"""
+import json
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from counters import add_inserted_orders
+from detector_aggregates import add_inserted_orders_to_change_log
+from migrations import add_inserted_orders_to_fts
+from rollups import add_inserted_rows
+
+BULK_BATCH_SIZE = 5000
+# Yanıtta döndürülen satır hatası sayısının üst sınırı; toplam sayı her zaman 'failed' alanındadır
+MAX_REPORTED_ERRORS = 1000
+
+ORDER_INSERT_COLUMNS = ('id', 'date', 'customer', 'product', 'amount', 'status', 'anomaly', 'severity')
+
+INSERT_ORDER_SQL = (f"INSERT INTO orders ({', '.join(ORDER_INSERT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in ORDER_INSERT_COLUMNS)})")
+
+
+def parse_bulk_body(body: bytes, content_type: str) -> Tuple[List[Tuple[int, Any]], List[Dict]]:
+    """İstek gövdesini (satır no, nesne) listesine çevir.
+
+    Content-Type NDJSON ise ya da gövde '[' ile başlamıyorsa her satır ayrı bir JSON nesnesidir;
+    çözülemeyen satırlar satır hatası olarak döner. JSON dizisi çözülemezse ValueError fırlatılır.
+    """
+    text = body.decode('utf-8-sig')
+    is_ndjson = 'ndjson' in content_type or 'jsonl' in content_type or not text.lstrip().startswith('[')
+
+    if not is_ndjson:
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError("Gövde bir JSON dizisi olmalı")
+        return list(enumerate(items)), []
+
+    records, errors = [], []
+    for index, line in enumerate(text.splitlines()):
+        if not line.strip():
+            continue
+        try:
+            records.append((index, json.loads(line)))
+        except json.JSONDecodeError as e:
+            errors.append({'index': index, 'id': None, 'error': f"Geçersiz JSON: {e.msg}"})
+    return records, errors
+
+
+def _record_id(item: Any) -> Optional[str]:
+    return item.get('id') if isinstance(item, dict) else None
+
+
+def _validate_batch(adapter: TypeAdapter, batch: List[Tuple[int, Any]]):
+    """Partiyi tek seferde doğrula; hatalı satırları ayıklayıp geri kalanı yeniden doğrula"""
+    items = [item for _, item in batch]
+    try:
+        return list(zip((index for index, _ in batch), adapter.validate_python(items))), []
+    except ValidationError as e:
+        messages: Dict[int, List[str]] = {}
+        for error in e.errors(include_url=False):
+            position = error['loc'][0]
+            field = '.'.join(str(part) for part in error['loc'][1:]) or 'satır'
+            messages.setdefault(position, []).append(f"{field}: {error['msg']}")
+
+    errors = [{'index': batch[position][0], 'id': _record_id(batch[position][1]), 'error': '; '.join(text)}
+              for position, text in sorted(messages.items())]
+    valid = [entry for position, entry in enumerate(batch) if position not in messages]
+    if not valid:
+        return [], errors
+    return list(zip((index for index, _ in valid), adapter.validate_python([item for _, item in valid]))), errors
+
+
+def _existing_ids(conn, ids: List[str]) -> set:
+    # json_each ile tek parametre; SQLite'ın değişken sayısı sınırına takılmaz. Mühürlenmiş aylardaki
+    # numaralar sealed_order_ids'tedir
+    cursor = conn.execute("""
+        SELECT id FROM orders WHERE id IN (SELECT value FROM json_each(:ids))
+        UNION ALL SELECT id FROM sealed_order_ids WHERE id IN (SELECT value FROM json_each(:ids))
+    """, {'ids': json.dumps(ids)})
+    return {row[0] for row in cursor.fetchall()}
+
+
+def add_inserted_orders_to_aggregates(cursor, after_rowid: int):
+    """bulk_load altında tetikleyicisiz eklenmiş (rowid > after_rowid) siparişleri FTS indeksine,
+    sayaçlara, saatlik özetlere ve tespit değişiklik günlüğüne parti başına tek sorguyla ekle"""
+    add_inserted_orders_to_fts(cursor, after_rowid)
+    add_inserted_orders(cursor, after_rowid)
+    add_inserted_rows(cursor, 'orders', after_rowid)
+    add_inserted_orders_to_change_log(cursor, after_rowid)
+
+
+def _insert_batch(conn, rows: List[Tuple[int, Tuple]]) -> List[Dict]:
+    """Partiyi tek işlemde yaz; FTS, sayaç ve özet güncellemeleri satır başı yerine parti başına yapılır.
+
+    Araya başka bir yazıcı girip çakışma olursa parti satır satır yazılarak hatalı satırlar bulunur.
+    """
+    try:
+        _write_rows(conn, rows, per_row=False)
+        return []
+    except sqlite3.IntegrityError:
+        conn.rollback()
+    return _write_rows(conn, rows, per_row=True)
+
+
+def _write_rows(conn, rows: List[Tuple[int, Tuple]], per_row: bool) -> List[Dict]:
+    cursor = conn.cursor()
+    errors = []
+    cursor.execute("INSERT INTO bulk_load(active) VALUES (1)")
+    # rowid'ler artan verildiğinden bu partide eklenen satırlar rowid > after_rowid olanlardır
+    after_rowid = cursor.execute("SELECT COALESCE(MAX(rowid), 0) FROM orders").fetchone()[0]
+    if per_row:
+        for index, values in rows:
+            try:
+                cursor.execute(INSERT_ORDER_SQL, values)
+            except sqlite3.IntegrityError as e:
+                errors.append({'index': index, 'id': values[0], 'error': str(e)})
+    else:
+        cursor.executemany(INSERT_ORDER_SQL, [values for _, values in rows])
+    add_inserted_orders_to_aggregates(cursor, after_rowid)
+    cursor.execute("DELETE FROM bulk_load")
+    conn.commit()
+    return errors
+
+
+def ingest_orders(conn, records: List[Tuple[int, Any]], model: Type[BaseModel],
+                  parse_errors: List[Dict] = (), batch_size: int = BULK_BATCH_SIZE) -> Dict:
+    """Kayıtları partiler halinde doğrula ve yaz; eklenen/başarısız sayıları ve satır hatalarını döndür"""
+    adapter = TypeAdapter(List[model])
+    seen_ids = set()
+    errors: List[Dict] = list(parse_errors)
+    inserted = 0
+
+    for start in range(0, len(records), batch_size):
+        valid, batch_errors = _validate_batch(adapter, records[start:start + batch_size])
+        errors.extend(batch_errors)
+
+        existing = _existing_ids(conn, [order.id for _, order in valid])
+        rows = []
+        for index, order in valid:
+            if order.id in seen_ids:
+                errors.append({'index': index, 'id': order.id, 'error': "Aynı id istekte birden fazla kez var"})
+                continue
+            seen_ids.add(order.id)
+            if order.id in existing:
+                errors.append({'index': index, 'id': order.id, 'error': "Bu id ile bir sipariş zaten var"})
+                continue
+            rows.append((index, tuple(getattr(order, column) for column in ORDER_INSERT_COLUMNS)))
+
+        if rows:
+            insert_errors = _insert_batch(conn, rows)
+            errors.extend(insert_errors)
+            inserted += len(rows) - len(insert_errors)
+
+    errors.sort(key=lambda error: error['index'])
+    return {
+        'received': len(records) + len(parse_errors),
+        'inserted': inserted,
+        'failed': len(errors),
+        'errors': errors[:MAX_REPORTED_ERRORS],
+    }
@@ -0,0 +1,203 @@
+"""
+Dashboard Sayaçları
+orders ve anomalies tablolarındaki tetikleyicilerle aynı işlem içinde güncellenen sayaç tablosu.
+/dashboard/stats ve /dashboard/anomaly-types her istekte tabloları saymak yerine buradan okur.
+
+Sayaç adları:
+    orders.total, orders.status.<durum>, orders.anomaly.<tip>, orders.late_shipments
+    anomalies.total, anomalies.type.<tip>
+
+Tutarlılık kontrolü / yeniden oluşturma (backend dizininden):
+    python counters.py            # farkları raporla
+    python counters.py --rebuild  # sayaçları sıfırdan hesapla
+"""
+import sqlite3
+import sys
+from typing import Dict, List
+
+from db_pool import DB_PATH
+from order_store import TriggerTarget, order_trigger_target
+from partitions import each_order_source
+
+# Geç kargo sayacının koşulu; /dashboard/stats'ın eski sorgusuyla aynı (sütunlar RowColumns ile çözülür)
+LATE_SHIPMENT_CONDITION = "{status} = 'shipped' AND {anomaly} LIKE '%lateShipping%'"
+
+# Tablo taramalarında orders görünümünün sütunları
+ORDERS_COLUMNS = TriggerTarget('orders').columns('orders')
+
+
+def _increment(name_expr: str, condition: str = None) -> str:
+    where = f" WHERE {condition}" if condition else " WHERE 1"
+    return (f"INSERT INTO counters(name, value) SELECT {name_expr}, 1{where} "
+            f"ON CONFLICT(name) DO UPDATE SET value = value + 1;")
+
+
+def _decrement(name_expr: str, condition: str = None) -> str:
+    extra = f" AND {condition}" if condition else ""
+    return f"UPDATE counters SET value = value - 1 WHERE name = {name_expr}{extra};"
+
+
+def _order_changes(columns: Dict[str, str], change) -> str:
+    return "\n".join([
+        change(f"'orders.status.' || {columns['status']}"),
+        change(f"'orders.anomaly.' || {columns['anomaly']}", f"{columns['anomaly']} IS NOT NULL"),
+        change("'orders.late_shipments'", LATE_SHIPMENT_CONDITION.format_map(columns)),
+    ])
+
+
+def _anomaly_changes(row: str, change) -> str:
+    return change(f"'anomalies.type.' || {row}.type")
+
+
+def create_counters(cursor):
+    """Sayaç tablosunu ve tetikleyicilerini oluştur, ardından sayaçları doldur"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    create_orders_insert_trigger(cursor)
+    create_orders_change_triggers(cursor)
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_anomalies_ai AFTER INSERT ON anomalies BEGIN
+            {_increment("'anomalies.total'")}
+            {_anomaly_changes('new', _increment)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_anomalies_ad AFTER DELETE ON anomalies BEGIN
+            {_decrement("'anomalies.total'")}
+            {_anomaly_changes('old', _decrement)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_anomalies_au AFTER UPDATE OF type ON anomalies BEGIN
+            {_anomaly_changes('old', _decrement)}
+            {_anomaly_changes('new', _increment)}
+        END
+    """)
+
+    rebuild_counters(cursor)
+
+
+def create_orders_insert_trigger(cursor, when: str = None):
+    """orders INSERT sayaç tetikleyicisini oluştur; when verilirse sadece koşul sağlanınca çalışır"""
+    target = order_trigger_target(cursor)
+    guard = f" WHEN {when}" if when else ""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_orders_ai AFTER INSERT ON {target.table}{guard} BEGIN
+            {_increment("'orders.total'")}
+            {_order_changes(target.columns('new'), _increment)}
+        END
+    """)
+
+
+def create_orders_change_triggers(cursor, delete_when: str = None):
+    """orders DELETE ve durum/anomali UPDATE sayaç tetikleyicilerini oluştur; delete_when verilirse
+    DELETE tetikleyicisi sadece koşul sağlanınca çalışır"""
+    target = order_trigger_target(cursor)
+    guard = f" WHEN {delete_when}" if delete_when else ""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_orders_ad AFTER DELETE ON {target.table}{guard} BEGIN
+            {_decrement("'orders.total'")}
+            {_order_changes(target.columns('old'), _decrement)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_orders_au AFTER UPDATE OF {target.watched(['status', 'anomaly'])}
+        ON {target.table} BEGIN
+            {_order_changes(target.columns('old'), _decrement)}
+            {_order_changes(target.columns('new'), _increment)}
+        END
+    """)
+
+
+def add_inserted_orders(cursor, after_rowid: int):
+    """Tetikleyicisiz eklenmiş (rowid > after_rowid) siparişleri sayaçlara tek sorguyla ekle"""
+    cursor.execute(f"""
+        INSERT INTO counters(name, value)
+        SELECT name, COUNT(*) FROM (
+            SELECT 'orders.total' AS name FROM orders WHERE rowid > :after
+            UNION ALL SELECT 'orders.status.' || status FROM orders WHERE rowid > :after
+            UNION ALL SELECT 'orders.anomaly.' || anomaly FROM orders WHERE rowid > :after AND anomaly IS NOT NULL
+            UNION ALL SELECT 'orders.late_shipments' FROM orders
+                WHERE rowid > :after AND {LATE_SHIPMENT_CONDITION.format_map(ORDERS_COLUMNS)}
+        ) WHERE true GROUP BY name
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+    """, {'after': after_rowid})
+
+
+def compute_counters(cursor) -> Dict[str, int]:
+    """Sayaçların olması gereken değerlerini tabloları (ve mühürlenmiş ayları) tarayarak hesapla"""
+    expected = {'orders.total': 0, 'orders.late_shipments': 0}
+
+    for source_cursor, source in each_order_source(cursor):
+        source_cursor.execute(f"""
+            SELECT COUNT(*),
+                   COALESCE(SUM({LATE_SHIPMENT_CONDITION.format_map(ORDERS_COLUMNS)}), 0)
+            FROM {source} AS orders
+        """)
+        total, late = source_cursor.fetchone()
+        expected['orders.total'] += total
+        expected['orders.late_shipments'] += late
+
+        source_cursor.execute(f"SELECT status, COUNT(*) FROM {source} AS orders GROUP BY status")
+        for status, count in source_cursor.fetchall():
+            expected[f'orders.status.{status}'] = expected.get(f'orders.status.{status}', 0) + count
+
+        source_cursor.execute(f"SELECT anomaly, COUNT(*) FROM {source} AS orders WHERE anomaly IS NOT NULL GROUP BY anomaly")
+        for anomaly, count in source_cursor.fetchall():
+            expected[f'orders.anomaly.{anomaly}'] = expected.get(f'orders.anomaly.{anomaly}', 0) + count
+
+    cursor.execute("SELECT COUNT(*) FROM anomalies")
+    expected['anomalies.total'] = cursor.fetchone()[0]
+
+    cursor.execute("SELECT type, COUNT(*) FROM anomalies GROUP BY type")
+    for anomaly_type, count in cursor.fetchall():
+        expected[f'anomalies.type.{anomaly_type}'] = count
+
+    return expected
+
+
+def rebuild_counters(cursor):
+    """Sayaçları sıfırdan hesaplayıp tabloya yaz"""
+    expected = compute_counters(cursor)
+    cursor.execute("DELETE FROM counters")
+    cursor.executemany("INSERT INTO counters(name, value) VALUES (?, ?)", expected.items())
+
+
+def check_counters(cursor) -> List[str]:
+    """Saklanan sayaçları tablolardan hesaplananlarla karşılaştır; farkları döndür"""
+    expected = compute_counters(cursor)
+    cursor.execute("SELECT name, value FROM counters")
+    stored = {name: value for name, value in cursor.fetchall()}
+
+    differences = []
+    for name in sorted(set(expected) | set(stored)):
+        if expected.get(name, 0) != stored.get(name, 0):
+            differences.append(f"{name}: saklanan={stored.get(name, 0)} gerçek={expected.get(name, 0)}")
+    return differences
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    if "--rebuild" in sys.argv:
+        rebuild_counters(cursor)
+        conn.commit()
+        print("✅ Sayaçlar sıfırdan yeniden oluşturuldu")
+    else:
+        differences = check_counters(cursor)
+        if differences:
+            print("❌ Tutarsız sayaçlar (düzeltmek için: python counters.py --rebuild):")
+            for difference in differences:
+                print(f"   - {difference}")
+            conn.close()
+            sys.exit(1)
+        print("✅ Tüm sayaçlar tutarlı")
+
+    conn.close()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Sentetik Veri Üretici
+Yük testi için parametrik boyutta (milyonlarca sipariş) veritabanı üretir. seed_data'nın aksine
+satırlar bellekte toplanmaz; CHUNK_SIZE'lık parçalar halinde üretilip executemany ile yazılır.
+
+- Her parça kendi tohumundan (seed + parça no) üretilir; tek süreçte ya da süreç havuzunda üretilen
+  veritabanları satırı satırına aynıdır.
+- Siparişler bulk_load altında tetikleyicisiz yazılır; FTS, sayaçlar, saatlik özetler ve tespit
+  değişiklik günlüğü toplu yüklemedeki gibi parça başına tek sorguyla güncellenir. Parçalar orders
+  görünümünün INSTEAD OF tetikleyicisi yerine insert_order_rows ile küme tabanlı order_rows'a aktarılır. Hedef boş olduğundan
+  orders'ın ikincil indeksleri ve INSERT tetikleyicileri yükleme süresince kaldırılıp sonda yeniden kurulur.
+- --workers > 1 iken her çalışan kendi parça aralığını ayrı bir dosyaya (yalnızca orders tablosu,
+  günlüksüz) yazar; ana süreç dosyaları sırayla ATTACH edip INSERT ... SELECT ile birleştirir.
+- Durum dağılımı: --cancel-ratio kadarı iptal, --late-ratio kadarı teslim edilmemiş (bekleyen/kargoda;
+  lateShippingThreshold'dan eski olanlar geç kargo sayılır), kalanı teslim edilmiş.
+- Anomaliler ve bildirimler tek süreçte, tetikleyiciler açıkken yazılır; ayarlar, admin kullanıcısı
+  ve envanter seed_defaults ile eklenir.
+
+Kullanım (backend dizininden):
+    python data_generator.py --db loadtest.db --orders 1000000
+    python data_generator.py --db loadtest.db --orders 10000000 --days 365 --workers 4 --replace
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from typing import Dict, List, Tuple
+
+from bulk_ingest import ORDER_INSERT_COLUMNS, add_inserted_orders_to_aggregates
+from database import create_schema, seed_defaults
+from db_pool import get_pool
+from order_store import insert_order_rows, order_trigger_target
+
+CHUNK_SIZE = 50000
+MAX_WORKERS = 8
+
+STATUS_OPEN = ('pending', 'shipped')
+ANOMALY_TYPES = ("anomaly.highCancelRate", "anomaly.stockOut", "anomaly.lateShipping", "anomaly.priceAnomaly")
+SEVERITIES = ("low", "medium", "high")
+NOTIFICATION_TYPES = ("error", "warning", "info", "success")
+
+INSERT_ANOMALY_SQL = ("INSERT INTO anomalies (id, type, severity, description, date, orderId, suggestions) "
+                      "VALUES (?, ?, ?, ?, ?, ?, '[]')")
+INSERT_NOTIFICATION_SQL = "INSERT INTO notifications (id, title, message, type, date, read) VALUES (?, ?, ?, ?, ?, ?)"
+
+# Çalışan dosyalarında yalnızca ham sipariş satırları tutulur; indeks ve tetikleyiciler ana veritabanındadır
+PART_SCHEMA_SQL = f"CREATE TABLE orders ({', '.join(ORDER_INSERT_COLUMNS)})"
+# Tek süreçte parçalar önce bu geçici tabloya yazılır, oradan order_rows'a küme tabanlı aktarılır
+STAGING_TABLE = "temp.order_staging"
+
+
+class GeneratorSpec:
+    """Üretim parametreleri; süreç havuzuna aktarıldığından yalnızca basit alanlar içerir"""
+
+    def __init__(self, orders: int, anomalies: int, notifications: int, days: int, products: int,
+                 customers: int, cancel_ratio: float, late_ratio: float, seed: int, end_date: str = None):
+        if orders < 0 or anomalies < 0 or notifications < 0:
+            raise ValueError("Satır sayıları negatif olamaz")
+        if days < 1 or products < 1 or customers < 1:
+            raise ValueError("Gün, ürün ve müşteri sayıları en az 1 olmalıdır")
+        if not (0 <= cancel_ratio and 0 <= late_ratio and cancel_ratio + late_ratio <= 1):
+            raise ValueError("İptal ve geç kargo oranları 0-1 arasında olmalı ve toplamları 1'i geçmemelidir")
+        self.orders = orders
+        self.anomalies = anomalies
+        self.notifications = notifications
+        self.days = days
+        self.products = products
+        self.customers = customers
+        self.cancel_ratio = cancel_ratio
+        self.late_ratio = late_ratio
+        self.seed = seed
+        # Çalışanlar gece yarısını farklı saatte görse de aynı günleri üretsin diye bitiş günü sabitlenir
+        self.end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+
+    def chunks(self, total: int) -> int:
+        return (total + CHUNK_SIZE - 1) // CHUNK_SIZE
+
+
+def _chunk_random(spec: GeneratorSpec, kind: str, index: int) -> random.Random:
+    # Metin tohumu sürümden ve süreçten bağımsız olarak aynı diziyi verir
+    return random.Random(f"{spec.seed}:{kind}:{index}")
+
+
+def _day_names(spec: GeneratorSpec) -> List[str]:
+    end = datetime.strptime(spec.end_date, '%Y-%m-%d')
+    return [(end - timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(spec.days)]
+
+
+def _names(prefix: str, count: int) -> List[str]:
+    width = len(str(count - 1))
+    return [f"{prefix} {i:0{width}d}" for i in range(count)]
+
+
+def order_chunk(spec: GeneratorSpec, index: int, days: List[str], customers: List[str],
+                products: List[str]) -> List[Tuple]:
+    """index numaralı sipariş parçasının satırları (ORDER_INSERT_COLUMNS sırasıyla)"""
+    rng = _chunk_random(spec, 'orders', index)
+    start = index * CHUNK_SIZE
+    count = min(CHUNK_SIZE, spec.orders - start)
+    open_limit = spec.cancel_ratio + spec.late_ratio
+    rows = []
+    for number, day, customer, product in zip(range(start + 1, start + count + 1), rng.choices(days, k=count),
+                                              rng.choices(customers, k=count), rng.choices(products, k=count)):
+        draw = rng.random()
+        if draw < spec.cancel_ratio:
+            status = 'cancelled'
+        elif draw < open_limit:
+            status = STATUS_OPEN[draw < (spec.cancel_ratio + open_limit) / 2]
+        else:
+            status = 'delivered'
+        rows.append((f"GEN-{number:09d}", day, customer, product, rng.randint(3000, 75000), status, None, None))
+    return rows
+
+
+def _timestamps(rng: random.Random, days: List[str], count: int) -> List[str]:
+    return [f"{day}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00Z" for day in rng.choices(days, k=count)]
+
+
+def anomaly_chunk(spec: GeneratorSpec, index: int, days: List[str], products: List[str]) -> List[Tuple]:
+    rng = _chunk_random(spec, 'anomalies', index)
+    start = index * CHUNK_SIZE
+    count = min(CHUNK_SIZE, spec.anomalies - start)
+    rows = []
+    for number, date in zip(range(start + 1, start + count + 1), _timestamps(rng, days, count)):
+        anomaly_type = rng.choice(ANOMALY_TYPES)
+        order_id = f"GEN-{rng.randint(1, spec.orders):09d}" if spec.orders and rng.random() < 0.2 else None
+        rows.append((f"GEN-ANO-{number:09d}", anomaly_type, rng.choice(SEVERITIES),
+                     f"{rng.choice(products)} için sentetik {anomaly_type.split('.')[1]} anomalisi", date, order_id))
+    return rows
+
+
+def notification_chunk(spec: GeneratorSpec, index: int, days: List[str]) -> List[Tuple]:
+    rng = _chunk_random(spec, 'notifications', index)
+    start = index * CHUNK_SIZE
+    count = min(CHUNK_SIZE, spec.notifications - start)
+    return [
+        (f"GEN-NOT-{number:09d}", "Sentetik bildirim", f"Yük testi bildirimi #{number}", rng.choice(NOTIFICATION_TYPES),
+         date, int(rng.random() < 0.33))
+        for number, date in zip(range(start + 1, start + count + 1), _timestamps(rng, days, count))
+    ]
+
+
+def _insert_order_rows(conn, source: str) -> None:
+    """source tablosunun siparişlerini bulk_load altında yaz ve özetleri tek işlemde güncelle.
+
+    Satırlar orders görünümünün INSTEAD OF tetikleyicisinden geçmez; sözlükler ve order_rows parça
+    başına birkaç küme tabanlı sorguyla doldurulur.
+    """
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO bulk_load(active) VALUES (1)")
+    after_rowid = cursor.execute("SELECT COALESCE(MAX(rowid), 0) FROM orders").fetchone()[0]
+    insert_order_rows(cursor, f"SELECT rowid, * FROM {source}")
+    add_inserted_orders_to_aggregates(cursor, after_rowid)
+    cursor.execute("DELETE FROM bulk_load")
+    conn.commit()
+
+
+def _suspend_order_maintenance(conn) -> List[Tuple[str, str]]:
+    """Boş orders tablosunun ikincil indekslerini ve INSERT tetikleyicilerini kaldır; (ad, SQL) listesini döndür.
+
+    Tetikleyiciler zaten bulk_load ile atlanıyor ama koşulları satır başı yine değerlendiriliyor; indeksler
+    yükleme sonunda tek geçişte sıralanarak kurulur (satır başı rastgele B-ağacı yazımından çok daha hızlı).
+    """
+    # Sıkıştırılmış şemada indeks ve tetikleyiciler orders görünümünün değil order_rows'un üzerindedir
+    table = order_trigger_target(conn.cursor()).table
+    suspended = conn.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE tbl_name = ? AND sql IS NOT NULL
+          AND (type = 'index' OR (type = 'trigger' AND sql LIKE '%AFTER INSERT ON ' || ? || '%'))
+    """, (table, table)).fetchall()
+    for object_type, name, _ in suspended:
+        conn.execute(f"DROP {object_type.upper()} {name}")
+    conn.commit()
+    return [(name, sql) for _, name, sql in suspended]
+
+
+def _restore_order_maintenance(conn, suspended: List[Tuple[str, str]]):
+    for _, sql in suspended:
+        conn.execute(sql)
+    conn.commit()
+
+
+def _write_part(spec: GeneratorSpec, path: str, first_chunk: int, last_chunk: int) -> str:
+    """Çalışan süreç: [first_chunk, last_chunk) sipariş parçalarını ayrı bir dosyaya yaz"""
+    days, customers, products = _day_names(spec), _names("Müşteri", spec.customers), _names("Ürün", spec.products)
+    conn = sqlite3.connect(path)
+    try:
+        # Geçici dosya: birleştirme bitince silinir, günlük ve fsync gerekmez
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(PART_SCHEMA_SQL)
+        for index in range(first_chunk, last_chunk):
+            conn.executemany(f"INSERT INTO orders VALUES ({', '.join('?' for _ in ORDER_INSERT_COLUMNS)})",
+                             order_chunk(spec, index, days, customers, products))
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def _part_ranges(chunks: int, workers: int) -> List[Tuple[int, int]]:
+    step = (chunks + workers - 1) // workers
+    return [(start, min(start + step, chunks)) for start in range(0, chunks, step)]
+
+
+def _generate_orders(conn, spec: GeneratorSpec, db_path: str, workers: int, progress) -> None:
+    chunks = spec.chunks(spec.orders)
+    if workers <= 1 or chunks <= 1:
+        days, customers, products = _day_names(spec), _names("Müşteri", spec.customers), _names("Ürün", spec.products)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {STAGING_TABLE} ({', '.join(ORDER_INSERT_COLUMNS)})")
+        try:
+            for index in range(chunks):
+                conn.execute(f"DELETE FROM {STAGING_TABLE}")
+                conn.executemany(f"INSERT INTO {STAGING_TABLE} VALUES ({', '.join('?' for _ in ORDER_INSERT_COLUMNS)})",
+                                 order_chunk(spec, index, days, customers, products))
+                _insert_order_rows(conn, STAGING_TABLE)
+                progress('sipariş', min((index + 1) * CHUNK_SIZE, spec.orders), spec.orders)
+        finally:
+            conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        return
+
+    ranges = _part_ranges(chunks, workers)
+    paths = [f"{db_path}.part{number}" for number in range(len(ranges))]
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+    try:
+        # spawn: ana süreçteki açık SQLite bağlantıları çalışanlara kopyalanmaz
+        with ProcessPoolExecutor(len(ranges), mp_context=get_context('spawn')) as pool:
+            futures = [pool.submit(_write_part, spec, path, first, last) for path, (first, last) in zip(paths, ranges)]
+            # Birleştirme parça sırasıyla yapılır; böylece rowid sırası tek süreçle aynı olur
+            for future, (first, last) in zip(futures, ranges):
+                path = future.result()
+                conn.execute("ATTACH DATABASE ? AS part", (path,))
+                try:
+                    _insert_order_rows(conn, "part.orders")
+                finally:
+                    conn.execute("DETACH DATABASE part")
+                os.remove(path)
+                progress('sipariş', min(last * CHUNK_SIZE, spec.orders), spec.orders)
+    finally:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def generate_database(db_path: str, spec: GeneratorSpec, workers: int = 1, progress=None) -> Dict:
+    """db_path'te şemayı oluştur ve spec'e göre sentetik verilerle doldur; adım sürelerini döndür"""
+    progress = progress or (lambda kind, done, total: None)
+    timings = {}
+    started = time.perf_counter()
+    conn = get_pool(db_path).acquire()
+    try:
+        create_schema(conn)
+        cursor = conn.cursor()
+        if cursor.execute("SELECT EXISTS (SELECT 1 FROM orders)").fetchone()[0]:
+            raise ValueError(f"{db_path} zaten sipariş içeriyor; yeni bir dosya kullanın veya --replace verin")
+        # Üretilen veritabanı baştan üretilebilir; çökmeye karşı fsync beklemeye gerek yok
+        conn.execute("PRAGMA synchronous = OFF")
+
+        suspended = _suspend_order_maintenance(conn)
+        try:
+            _generate_orders(conn, spec, db_path, max(1, min(workers, MAX_WORKERS)), progress)
+        finally:
+            _restore_order_maintenance(conn, suspended)
+        timings['orders_seconds'] = time.perf_counter() - started
+
+        step = time.perf_counter()
+        days, products = _day_names(spec), _names("Ürün", spec.products)
+        for index in range(spec.chunks(spec.anomalies)):
+            cursor.executemany(INSERT_ANOMALY_SQL, anomaly_chunk(spec, index, days, products))
+            conn.commit()
+            progress('anomali', min((index + 1) * CHUNK_SIZE, spec.anomalies), spec.anomalies)
+        for index in range(spec.chunks(spec.notifications)):
+            cursor.executemany(INSERT_NOTIFICATION_SQL, notification_chunk(spec, index, days))
+            conn.commit()
+            progress('bildirim', min((index + 1) * CHUNK_SIZE, spec.notifications), spec.notifications)
+
+        seed_defaults(cursor)
+        # Tarihler zaten bugüne göre üretildi; açılıştaki kaydırma bitiş gününden itibaren sayar
+        cursor.execute("DELETE FROM system_info")
+        cursor.execute("INSERT INTO system_info (last_update_date, created_at) VALUES (?, ?)",
+                       (spec.end_date, datetime.now().isoformat()))
+        conn.commit()
+        timings['other_seconds'] = time.perf_counter() - step
+    finally:
+        conn.close()
+        # synchronous = OFF ayarlı bağlantı havuzda kalmasın
+        get_pool(db_path).close_all()
+    timings['total_seconds'] = time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yük testi için sentetik veritabanı üret")
+    parser.add_argument("--db", required=True, help="Hedef veritabanı dosyası")
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--anomalies", type=int, help="Varsayılan: siparişlerin %%10'u")
+    parser.add_argument("--notifications", type=int, help="Varsayılan: siparişlerin %%10'u")
+    parser.add_argument("--days", type=int, default=30, help="Siparişlerin yayılacağı gün sayısı (bugün dahil)")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--customers", type=int, default=50000)
+    parser.add_argument("--cancel-ratio", type=float, default=0.10)
+    parser.add_argument("--late-ratio", type=float, default=0.15, help="Teslim edilmemiş (bekleyen/kargoda) oranı")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help=f"Sipariş üreten süreç sayısı (en fazla {MAX_WORKERS})")
+    parser.add_argument("--replace", action="store_true", help="Hedef dosya varsa sil")
+    args = parser.parse_args()
+
+    try:
+        spec = GeneratorSpec(args.orders, args.orders // 10 if args.anomalies is None else args.anomalies,
+                             args.orders // 10 if args.notifications is None else args.notifications,
+                             args.days, args.products, args.customers, args.cancel_ratio, args.late_ratio, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.replace:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    def progress(kind: str, done: int, total: int):
+        print(f"\r  {kind}: {done}/{total}", end="\n" if done == total else "", flush=True)
+
+    print(f"🏭 {spec.orders} sipariş, {spec.anomalies} anomali, {spec.notifications} bildirim üretiliyor "
+          f"({args.workers} süreç)...")
+    try:
+        timings = generate_database(args.db, spec, args.workers, progress)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    rate = spec.orders / timings['orders_seconds'] if timings['orders_seconds'] else 0
+    print(f"✅ Siparişler {timings['orders_seconds']:.1f} s ({rate:,.0f} sipariş/s), "
+          f"diğer tablolar {timings['other_seconds']:.1f} s, toplam {timings['total_seconds']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
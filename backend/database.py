@@ -2,12 +2,23 @@ import sqlite3
 import json
 from datetime import datetime, timedelta
 import random
+from counters import rebuild_counters
+from db_pool import DB_PATH
+from detector_aggregates import rebuild_detector_aggregates
+from migrations import SCHEMA_VERSION, apply_migrations, get_schema_version
+from order_store import ORDER_ROWS_TABLE, order_trigger_target
+from partitions import drop_partitions, remove_partition_files, shift_partitions
+from rollups import rebuild_rollups
 
-def init_database():
-    """SQLite veritabanını tablolar ve örnek verilerle başlat"""
-    conn = sqlite3.connect('ecommerce.db')  # Mevcut dizin için düzeltilmiş yol
+def create_schema(conn):
+    """Tabloları oluştur ve bekleyen şema migrasyonlarını uygula (veri eklemez)"""
     cursor = conn.cursor()
-    
+
+    # auto_vacuum sadece ilk tablo oluşturulmadan önce ayarlanabilir; saklama turlarının boşalttığı
+    # sayfalar böylece PRAGMA incremental_vacuum ile dosyadan geri verilir (retention.py)
+    if cursor.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
     # Tabloları oluştur
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS orders (
@@ -37,27 +48,6 @@ def init_database():
         )
     ''')
     
-    # Mevcut anomalies tablosuna yeni sütunları ekle (eğer yoksa)
-    try:
-        # Mevcut sütunları kontrol et
-        cursor.execute("PRAGMA table_info(anomalies)")
-        existing_columns = [col[1] for col in cursor.fetchall()]
-        
-        # Yeni sütunları ekle (eğer mevcut değilse)
-        new_columns = [
-            ('cancel_rate_threshold', 'INTEGER'),
-            ('late_shipping_threshold', 'INTEGER'),
-            ('stock_out_threshold', 'INTEGER')
-        ]
-        
-        for column_name, column_type in new_columns:
-            if column_name not in existing_columns:
-                cursor.execute(f"ALTER TABLE anomalies ADD COLUMN {column_name} {column_type}")
-                print(f"✅ {column_name} sütunu anomalies tablosuna eklendi")
-        
-    except sqlite3.Error as e:
-        print(f"⚠️ Anomalies tablosu güncellenirken hata (normal olabilir): {e}")
-    
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS notifications (
             id TEXT PRIMARY KEY,
@@ -113,8 +103,22 @@ def init_database():
         )
     ''')
     
-    # Veri zaten mevcut ise temizle
+    # Bekleyen şema migrasyonlarını uygula (eksik sütunlar, indeksler)
+    apply_migrations(conn)
+
+def init_database(db_path: str = DB_PATH):
+    """SQLite veritabanını tablolar ve örnek verilerle başlat"""
+    # API'nin açtığı dosya (db_pool.DB_PATH); çalışma dizininden bağımsız
+    conn = sqlite3.connect(db_path)
+    create_schema(conn)
+    cursor = conn.cursor()
+    
+    # Veri zaten mevcut ise temizle. Mühürlenmiş ayların FTS kayıtları ve özet katkıları silme
+    # tetikleyicileriyle düşmediğinden FTS boşaltılır, özetler tohum verisinden sonra yeniden hesaplanır
+    sealed = drop_partitions(cursor)
     cursor.execute("DELETE FROM orders")
+    if sealed:
+        cursor.execute("DELETE FROM orders_fts")
     cursor.execute("DELETE FROM anomalies") 
     cursor.execute("DELETE FROM notifications")
     cursor.execute("DELETE FROM settings")
@@ -125,78 +129,122 @@ def init_database():
     check_and_update_dates(cursor)
     
     seed_data(cursor)
+    if sealed:
+        rebuild_counters(cursor)
+        rebuild_rollups(cursor)
+        rebuild_detector_aggregates(cursor)
     
     conn.commit()
     conn.close()
-    
-    # İlk anomali tespitini çalıştır
+    remove_partition_files(sealed)
+    # İlk anomali tespiti sunucu açılışında arka planda çalışır (main.py startup olayı)
+
+def ensure_database(db_path: str = DB_PATH) -> bool:
+    """Veritabanını sadece gerekiyorsa hazırla; her açılışta çağrılabilir (idempotent).
+
+    Şema sürümü (PRAGMA user_version) güncel ve system_info kaydı varsa hiçbir DDL veya veri
+    adımı çalışmaz. Eski şemaya migrasyonlar uygulanır; hiç başlatılmamış boş veritabanı örnek
+    verilerle doldurulur. Mevcut veriler silinmez. Bir şey yapıldıysa True döner.
+    """
+    conn = sqlite3.connect(db_path)
     try:
-        from anomaly_detector import run_anomaly_detection
-        print("\nİlk anomali tespiti çalıştırılıyor...")
-        anomalies = run_anomaly_detection()
-        print(f"İlk anomali tespiti {len(anomalies)} anomali ile tamamlandı")
-    except Exception as e:
-        print(f"Uyarı: İlk anomali tespiti başarısız: {str(e)}")
+        if get_schema_version(conn) >= SCHEMA_VERSION and conn.execute("SELECT 1 FROM system_info").fetchone():
+            return False
+        create_schema(conn)
+        cursor = conn.cursor()
+        if cursor.execute("SELECT 1 FROM system_info").fetchone() is None:
+            empty = cursor.execute("SELECT 1 FROM orders LIMIT 1").fetchone() is None
+            check_and_update_dates(cursor)
+            if empty:
+                seed_data(cursor)
+        conn.commit()
+        return True
+    finally:
+        conn.close()
 
 def check_and_update_dates(cursor):
-    """Tarihlerin güncellenmesi gerekip gerekmediğini kontrol et ve gerekiyorsa güncelle"""
-    today = datetime.now().strftime('%Y-%m-%d')
+    """Son güncellemeden bu yana geçen gün kadar tüm tarihleri ileri kaydır ("sanal bugün").
+
+    Veriler son güncellendiği günkü görünümünü korur: o gün bugün sayılır, siparişlerin ve
+    anomalilerin birbirine göre dağılımı değişmez. Tarihler güncel ise hiçbir şey yazmaz ve False döner.
+    """
+    now = datetime.now()
+    today = now.strftime('%Y-%m-%d')
     
     # Mevcut last_update_date'i kontrol et
     cursor.execute("SELECT last_update_date FROM system_info ORDER BY id DESC LIMIT 1")
     result = cursor.fetchone()
     
     if result is None or result[0] != today:
-        print(f"Verileri son 7 gün içinde tutmak için tarihler güncelleniyor... (Son güncelleme: {result[0] if result else 'Hiç'})")
-        update_dates_to_last_7_days(cursor)
+        print(f"Veriler bugüne kaydırılıyor... (Son güncelleme: {result[0] if result else 'Hiç'})")
+        if result is not None:
+            days = (now.date() - datetime.strptime(result[0], '%Y-%m-%d').date()).days
+            if days > 0:
+                shift_dates(cursor, days)
         
         # system_info'yu güncelle veya ekle
         cursor.execute("DELETE FROM system_info")
         cursor.execute(
             "INSERT INTO system_info (last_update_date, created_at) VALUES (?, ?)",
-            (today, datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'))
+            (today, now.strftime('%Y-%m-%dT%H:%M:%SZ'))
         )
         print("Tarihler başarıyla güncellendi!")
-    else:
-        print("Tarihler güncel, güncelleme gerekmiyor.")
+        return True
+    print("Tarihler güncel, güncelleme gerekmiyor.")
+    return False
 
-def update_dates_to_last_7_days(cursor):
-    """Tüm siparişleri, anomalileri ve bildirimleri son 7 gün içinde olacak şekilde güncelle"""
-    base_date = datetime.now()
-    
-    # Tüm siparişleri al ve tarihlerini güncelle
-    cursor.execute("SELECT id FROM orders")
-    orders = cursor.fetchall()
-    
-    for order in orders:
-        order_id = order[0]
-        # Son 7 gün içinde rastgele dağıt
-        random_days = random.randint(0, 6)
-        random_hours = random.randint(0, 23)
-        new_date = (base_date - timedelta(days=random_days, hours=random_hours)).strftime('%Y-%m-%d')
-        cursor.execute("UPDATE orders SET date = ? WHERE id = ?", (new_date, order_id))
-    
-    # Anomali tarihlerini güncelle
-    cursor.execute("SELECT id FROM anomalies")
-    anomalies = cursor.fetchall()
-    
-    for anomaly in anomalies:
-        anomaly_id = anomaly[0]
-        random_days = random.randint(0, 6)
-        random_hours = random.randint(0, 23)
-        new_date = (base_date - timedelta(days=random_days, hours=random_hours)).strftime('%Y-%m-%dT%H:%M:%SZ')
-        cursor.execute("UPDATE anomalies SET date = ? WHERE id = ?", (new_date, anomaly_id))
-    
-    # Bildirim tarihlerini güncelle
-    cursor.execute("SELECT id FROM notifications")
-    notifications = cursor.fetchall()
-    
-    for notification in notifications:
-        notification_id = notification[0]
-        random_days = random.randint(0, 6)
-        random_hours = random.randint(0, 23)
-        new_date = (base_date - timedelta(days=random_days, hours=random_hours)).strftime('%Y-%m-%dT%H:%M:%SZ')
-        cursor.execute("UPDATE notifications SET date = ? WHERE id = ?", (new_date, notification_id))
+# Tarih metninin gün kısmını kaydırır, saat kısmını ve biçimini ('2025-01-01', '2025-01-01T10:00:00Z',
+# '2025-01-01 10:00:00') olduğu gibi bırakır
+SHIFT_DATE_SQL = "date(substr({0}, 1, 10), :shift) || substr({0}, 11)"
+
+def _shift_key_column(cursor, table: str, column: str, params: dict):
+    """Birincil anahtarın parçası olan tarih sütununu kaydır.
+
+    Satırlar tek tek güncellendiğinden yeni değer henüz kaydırılmamış bir satırla çakışabilir;
+    önce çakışamayacak önekli değerlere, sonra öneksiz hale getirilir.
+    """
+    cursor.execute(f"UPDATE {table} SET {column} = '~' || {SHIFT_DATE_SQL.format(column)}", params)
+    cursor.execute(f"UPDATE {table} SET {column} = substr({column}, 2)")
+
+def shift_dates(cursor, days: int):
+    """Siparişleri, anomalileri, bildirimleri ve tarihe bağlı özetleri `days` gün ileri al.
+
+    Her tablo tek küme tabanlı UPDATE ile kaydırılır. Satır başı özet/günlük tetikleyicileri bulk_load
+    işaretiyle atlanır; saatlik özet, tespit özetleri, işlenmemiş değişiklik günlüğü ve saatlik model
+    filigranları aynı gün sayısıyla kendileri kaydırıldığından yeniden hesaplama gerekmez.
+    """
+    params = {'shift': f"{days:+d} days", 'seconds': days * 86400}
+    cursor.execute("INSERT INTO bulk_load(active) VALUES (1)")
+    tables = ('orders', 'anomalies', 'notifications')
+    if order_trigger_target(cursor).compact:
+        # Bilinen biçimdeki sipariş tarihleri epoch saniyesidir: kaydırma tamsayı toplaması olur.
+        # Biçimi bilinmeyen (date_text) tarihler metin olarak kaydırılıp ts'leri yeniden hesaplanır
+        cursor.execute(f"UPDATE {ORDER_ROWS_TABLE} SET ts = ts + :seconds WHERE date_text IS NULL", params)
+        cursor.execute(f"""
+            UPDATE {ORDER_ROWS_TABLE}
+            SET date_text = {SHIFT_DATE_SQL.format('date_text')}, ts = unixepoch({SHIFT_DATE_SQL.format('date_text')})
+            WHERE date_text IS NOT NULL AND date(substr(date_text, 1, 10)) IS NOT NULL
+        """, params)
+        tables = ('anomalies', 'notifications')
+        shift_partitions(cursor, days)
+    for table in tables:
+        cursor.execute(f"UPDATE {table} SET date = {SHIFT_DATE_SQL.format('date')} "
+                       f"WHERE date(substr(date, 1, 10)) IS NOT NULL", params)
+    # Saat kapsamlı istatistiksel anomalilerin grubu saatin kendisidir
+    cursor.execute(f"UPDATE anomalies SET subject = {SHIFT_DATE_SQL.format('subject')} WHERE scope = 'hour'", params)
+
+    for table, column in (('rollup_hourly', 'hour'), ('detector_daily', 'day'), ('detector_customer_daily', 'day')):
+        _shift_key_column(cursor, table, column, params)
+    cursor.execute(f"""
+        UPDATE order_changes SET day = {SHIFT_DATE_SQL.format('day')}
+        WHERE seq > (SELECT COALESCE(MAX(value), 0) FROM detector_watermarks WHERE name = 'order_changes')
+    """, params)
+    cursor.execute(f"""
+        UPDATE detector_models
+        SET state = json_set(state, '$.last_hour', {SHIFT_DATE_SQL.format("json_extract(state, '$.last_hour')")})
+        WHERE json_extract(state, '$.last_hour') IS NOT NULL
+    """, params)
+    cursor.execute("DELETE FROM bulk_load")
 
 def seed_data(cursor):
     """Veritabanını örnek verilerle doldur"""
@@ -611,6 +659,10 @@ def seed_data(cursor):
         VALUES (?, ?, ?, ?, ?, ?)
     ''', notifications_data)
     
+    seed_defaults(cursor)
+
+def seed_defaults(cursor):
+    """Varsayılan ayarları ve admin kullanıcısını ekle; envanter siparişlerdeki ürünlerden oluşturulur"""
     # Varsayılan ayarlar
     default_settings = (
         1, 1, "", 15, 24, 5, 
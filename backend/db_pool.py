@@ -0,0 +1,254 @@
+"""
+Veritabanı Bağlantı Havuzu
+main.py ve AnomalyDetector tarafından paylaşılan, WAL modunda yeniden kullanılabilir SQLite bağlantıları
+"""
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ecommerce.db')
+
+# Her bağlantı açılırken uygulanan ayarlar
+PRAGMAS = {
+    'journal_mode': 'WAL',        # Okuyucular yazıcıyı beklemez
+    'synchronous': 'NORMAL',      # WAL ile güvenli, FULL'dan çok daha hızlı
+    'cache_size': -20000,         # ~20 MB sayfa önbelleği (negatif = KiB)
+    'mmap_size': 268435456,       # 256 MB bellek eşlemeli okuma
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+# Kilitli veritabanında pes etmeden önce beklenecek süre (ms)
+BUSY_TIMEOUT_MS = 5000
+
+# Havuzdaki en fazla bağlantı sayısı; DB executor'ı da aynı sayıda thread ile çalışır
+MAX_CONNECTIONS = 8
+
+
+class PooledConnection(sqlite3.Connection):
+    """close() çağrısında gerçekten kapanmak yerine havuza geri dönen bağlantı"""
+
+    pool: Optional['ConnectionPool'] = None
+    checked_out: bool = False
+    # Bağlantıyı tutan thread (detached ödünçlerde None)
+    owner: Optional[int] = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def really_close(self):
+        sqlite3.Connection.close(self)
+
+
+class ConnectionPool:
+    """Thread başına yeniden kullanılan bağlantılarla sınırlı SQLite bağlantı havuzu"""
+
+    def __init__(self, db_path: str = DB_PATH, max_connections: int = MAX_CONNECTIONS,
+                 acquire_timeout: float = 10.0, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.acquire_timeout = acquire_timeout
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._idle = []
+        self._created = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+        self._stats = {
+            'acquired': 0,
+            'hits': 0,
+            'misses': 0,
+            'reentrant': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+        }
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            factory=PooledConnection
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        for name, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.pool = self
+        return conn
+
+    def acquire(self, detached: bool = False) -> PooledConnection:
+        """Havuzdan bağlantı al; bu thread zaten bir bağlantı tutuyorsa onu tekrar kullan.
+
+        detached=True ile alınan bağlantı thread'e bağlanmaz; farklı thread'lerde ilerleyen
+        akış (streaming) yanıtları gibi durumlarda herhangi bir thread'den iade edilebilir.
+        """
+        held = None if detached else getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            with self._cond:
+                self._stats['acquired'] += 1
+                self._stats['reentrant'] += 1
+            return held
+
+        started = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._stats['hits'] += 1
+                    break
+                if self._created < self.max_connections:
+                    self._created += 1
+                    conn = None
+                    self._stats['misses'] += 1
+                    break
+
+                waited = True
+                remaining = self.acquire_timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise TimeoutError(
+                        f"Veritabanı bağlantı havuzu {self.acquire_timeout} saniyede boşalmadı"
+                    )
+                self._cond.wait(remaining)
+
+            wait_ms = (time.perf_counter() - started) * 1000
+            self._stats['acquired'] += 1
+            if waited:
+                self._stats['waits'] += 1
+            self._stats['total_wait_ms'] += wait_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+
+        conn.checked_out = True
+        conn.owner = None if detached else threading.get_ident()
+        if not detached:
+            self._local.conn = conn
+            self._local.depth = 1
+        return conn
+
+    def release(self, conn: PooledConnection):
+        """Bağlantıyı havuza geri bırak (iç içe kullanımda sadece derinliği azaltır)"""
+        if not conn.checked_out:
+            # Aynı bağlantı için ikinci close() çağrısı yok sayılır
+            return
+
+        if conn.owner is not None:
+            # Thread'e bağlı ödünç sadece onu tutan thread'den bırakılır. Bağlantı iade edildikten
+            # sonra başka bir thread'e verilmişse önceki ödüncün geç kalan close() çağrısı yok sayılır;
+            # aksi halde yeni sahibinin işlemi geri alınır ve bağlantı iki kullanıcıya birden verilirdi
+            if getattr(self._local, 'conn', None) is not conn:
+                return
+            self._local.depth -= 1
+            if self._local.depth > 0:
+                return
+            self._local.conn = None
+        conn.checked_out = False
+        conn.owner = None
+
+        # Yarım kalan işlem sonraki kullanıcıya yazma kilidi bırakmasın
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.really_close()
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """with bloğu boyunca havuzdan bir bağlantı kullan"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Boştaki tüm bağlantıları gerçekten kapat"""
+        with self._cond:
+            while self._idle:
+                self._idle.pop().really_close()
+                self._created -= 1
+
+    def stats(self) -> Dict:
+        """Havuz isabet ve bekleme istatistikleri"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['created'] = self._created
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._created - len(self._idle)
+            stats['max_connections'] = self.max_connections
+        checkouts = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / checkouts, 4) if checkouts else 0.0
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / checkouts, 4) if checkouts else 0.0
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 3)
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 3)
+        return stats
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = DB_PATH) -> ConnectionPool:
+    """Verilen veritabanı dosyası için paylaşılan havuzu getir (yoksa oluştur)"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key)
+            _pools[key] = pool
+        return pool
+
+
+def get_connection(db_path: str = DB_PATH) -> PooledConnection:
+    """Havuzdan bağlantı al; close() bağlantıyı havuza iade eder"""
+    return get_pool(db_path).acquire()
+
+
+# Event loop'u bloklamamak için tüm senkron veritabanı işleri bu sınırlı executor'da çalışır.
+# Thread sayısı havuz boyutuna eşit olduğundan her thread kendi bağlantısını bekleme olmadan tekrar kullanır.
+_db_executor = ThreadPoolExecutor(max_workers=MAX_CONNECTIONS, thread_name_prefix='db')
+
+
+async def run_db(func: Callable, *args, **kwargs):
+    """Senkron veritabanı fonksiyonunu DB executor'ında çalıştır ve sonucunu bekle"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
+
+
+def run_in_db_thread(func: Callable) -> Callable:
+    """Senkron route fonksiyonunu event loop dışında çalışan async route'a dönüştüren dekoratör"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    return wrapper
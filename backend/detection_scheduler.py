@@ -0,0 +1,192 @@
+"""
+Anomali Tespit Zamanlayıcısı
+Tespiti istek işleyicilerinden ayıran arka plan çalışanı. Tespit belirli aralıklarla ve istek
+üzerine (ayar kaydı, manuel tetikleme) çalışır. Aynı anda tek tur çalışır; henüz başlamamış bir
+iş varken gelen tetiklemeler o işe eklenir ve hepsi aynı job_id'yi alır.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# Periyodik tespit aralığı (saniye)
+DETECTION_INTERVAL_SECONDS = 300
+
+# Durumu sorgulanabilen en fazla iş sayısı; eski bitmiş işler unutulur
+MAX_JOB_HISTORY = 100
+
+
+def _now() -> str:
+    return datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class DetectionJob:
+    """Tek bir tespit turu; queued → running → succeeded | failed"""
+
+    def __init__(self, reason: str, prefix: str = 'DET'):
+        self.id = f"{prefix}-{uuid.uuid4().hex[:12]}"
+        self.status = 'queued'
+        self.reasons = [reason]
+        self.triggers = 1
+        self.requested_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.duration_ms: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('succeeded', 'failed')
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'reasons': list(self.reasons),
+            'triggers': self.triggers,
+            'requested_at': self.requested_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'duration_ms': self.duration_ms,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class DetectionScheduler:
+    """Tespit turlarını tek bir arka plan thread'inde sırayla çalıştıran zamanlayıcı.
+
+    Aynı zamanlayıcı başka periyodik bakım işleri (ör. saklama turları) için de kullanılır;
+    name thread ve log adı, job_prefix iş kimliği önekidir.
+    """
+
+    def __init__(self, run_detection: Callable[[str], Dict],
+                 interval_seconds: float = DETECTION_INTERVAL_SECONDS,
+                 on_complete: Optional[Callable[[], None]] = None,
+                 name: str = 'anomaly-detection', label: str = 'Anomali tespit', job_prefix: str = 'DET'):
+        self.run_detection = run_detection
+        self.interval_seconds = interval_seconds
+        self.on_complete = on_complete
+        self.name = name
+        self.label = label
+        self.job_prefix = job_prefix
+        self._jobs: 'OrderedDict[str, DetectionJob]' = OrderedDict()
+        self._pending: Optional[DetectionJob] = None
+        self._running: Optional[DetectionJob] = None
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def start(self):
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+        print(f"⏱️ {self.label} zamanlayıcısı başlatıldı ({self.interval_seconds:g} sn aralıkla)")
+
+    def stop(self, timeout: float = 10.0):
+        """Çalışan turun bitmesini bekler; kuyruktaki iş çalıştırılmaz"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def request(self, reason: str) -> DetectionJob:
+        """Tespit iste; henüz başlamamış bir iş varsa yeni iş açmadan ona eklenir"""
+        with self._condition:
+            if self._pending:
+                self._pending.triggers += 1
+                if reason not in self._pending.reasons:
+                    self._pending.reasons.append(reason)
+                return self._pending
+
+            job = DetectionJob(reason, self.job_prefix)
+            self._pending = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_JOB_HISTORY:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if not oldest.done:
+                    break
+                del self._jobs[oldest_id]
+            self._condition.notify_all()
+            return job
+
+    def get(self, job_id: str) -> Optional[DetectionJob]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[DetectionJob]:
+        """İş bitene (veya süre dolana) kadar bekle"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job:
+                self._condition.wait_for(lambda: job.done or self._stopping, timeout)
+            return job
+
+    def _next_job(self) -> Optional[DetectionJob]:
+        with self._condition:
+            deadline = time.monotonic() + self.interval_seconds
+            while not self._pending and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if self._stopping:
+                return None
+        if not self._pending:
+            self.request('interval')
+
+        with self._condition:
+            job, self._pending = self._pending, None
+            self._running = job
+            job.status = 'running'
+            job.started_at = _now()
+            return job
+
+    def _loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            started = time.perf_counter()
+            try:
+                # Tur iş kimliğiyle çalışır; yazdığı anomaliler run_id olarak bu kimliği taşır
+                result = self.run_detection(job.id)
+                error = None
+            except Exception as e:
+                result = None
+                error = str(e)
+                print(f"❌ Hata: {self.label} turu başarısız ({job.id}): {error}")
+
+            # İşi bekleyenler uyanmadan önce (ör. önbellek geçersiz kılma) tamamlanmalı
+            if self.on_complete:
+                try:
+                    self.on_complete()
+                except Exception as e:
+                    print(f"Uyarı: {self.label} sonrası işlem başarısız: {str(e)}")
+
+            with self._condition:
+                job.result = result
+                job.error = error
+                job.status = 'failed' if error else 'succeeded'
+                job.finished_at = _now()
+                job.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                self._running = None
+                self._condition.notify_all()
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return {
+                'interval_seconds': self.interval_seconds,
+                'running': self._running.id if self._running else None,
+                'pending': self._pending.id if self._pending else None,
+                'jobs': len(self._jobs),
+            }
@@ -0,0 +1,230 @@
+"""
+Artımlı Tespit Özetleri
+Anomali tespitinin kullandığı gün/durum/ürün (detector_daily) ve gün/durum/müşteri
+(detector_customer_daily) bazlı sipariş sayıları.
+orders üzerindeki tetikleyiciler her değişikliği order_changes günlüğüne +1/-1 olarak ekler;
+tespit turu sadece son filigrandan (watermark) sonraki günlük kayıtlarını özete katlar ve
+pencereleri (24 saat, 7 gün, geç kargo) bu küçük tablodan okur. Maliyet tablo boyutuna değil
+yeni değişiklik sayısına bağlıdır.
+
+Tutarlılık kontrolü / yeniden oluşturma (backend dizininden):
+    python detector_aggregates.py            # farkları raporla
+    python detector_aggregates.py --rebuild  # özeti sıfırdan hesapla
+"""
+import sqlite3
+import sys
+from typing import Dict, List, Tuple
+
+from db_pool import DB_PATH
+from order_store import TriggerTarget, order_trigger_target
+from partitions import each_order_source
+
+# Sipariş gününün anahtarı; hem '2025-01-01' hem '2025-01-01T10:30:00Z' için 'YYYY-MM-DD'
+DAY_SQL = "substr({date}, 1, 10)"
+
+# Tablo taramalarında orders görünümünün sütunları
+ORDERS_COLUMNS = TriggerTarget('orders').columns('orders')
+
+CHANGE_LOG_WATERMARK = 'order_changes'
+
+# Özet tablosu → gruplama sütunu; günlüğün her kaydı hepsine katlanır
+AGGREGATE_TABLES = {
+    'detector_daily': 'product',
+    'detector_customer_daily': 'customer',
+}
+
+CHANGE_LOG_TRIGGERS = ('order_changes_ai', 'order_changes_ad', 'order_changes_au')
+
+
+def _log(columns: Dict[str, str], delta: int) -> str:
+    return (f"INSERT INTO order_changes(day, status, product, customer, delta) "
+            f"VALUES ({DAY_SQL.format_map(columns)}, {columns['status']}, {columns['product']}, "
+            f"{columns['customer']}, {delta});")
+
+
+def create_detector_aggregates(cursor, insert_when: str = None):
+    """Değişiklik günlüğünü, özet tablosunu ve tetikleyicileri oluştur, ardından özeti doldur.
+
+    insert_when verilirse INSERT tetikleyicisi sadece koşul sağlanınca çalışır (toplu yükleme
+    satırları add_inserted_orders_to_change_log ile parti başına eklenir).
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            product TEXT NOT NULL,
+            delta INTEGER NOT NULL,
+            customer TEXT
+        )
+    """)
+    for table, column in AGGREGATE_TABLES.items():
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                day TEXT NOT NULL,
+                status TEXT NOT NULL,
+                {column} TEXT NOT NULL,
+                orders INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, status, {column})
+            ) WITHOUT ROWID
+        """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS detector_watermarks (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    create_change_log_triggers(cursor, insert_when)
+    create_update_trigger(cursor)
+
+    rebuild_detector_aggregates(cursor)
+
+
+def create_change_log_triggers(cursor, insert_when: str = None, delete_when: str = None):
+    """orders INSERT ve DELETE günlük tetikleyicilerini oluştur"""
+    target = order_trigger_target(cursor)
+    guard = f" WHEN {insert_when}" if insert_when else ""
+    delete_guard = f" WHEN {delete_when}" if delete_when else ""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS order_changes_ai AFTER INSERT ON {target.table}{guard} BEGIN
+            {_log(target.columns('new'), 1)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS order_changes_ad AFTER DELETE ON {target.table}{delete_guard} BEGIN
+            {_log(target.columns('old'), -1)}
+        END
+    """)
+
+
+def create_update_trigger(cursor, when: str = None):
+    """orders UPDATE günlük tetikleyicisini oluştur; when verilirse sadece koşul sağlanınca çalışır"""
+    target = order_trigger_target(cursor)
+    guard = f" WHEN {when}" if when else ""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS order_changes_au
+        AFTER UPDATE OF {target.watched(['date', 'status', 'product', 'customer'])} ON {target.table}{guard} BEGIN
+            {_log(target.columns('old'), -1)}
+            {_log(target.columns('new'), 1)}
+        END
+    """)
+
+
+def add_customer_aggregates(cursor, insert_when: str = None):
+    """Önceki sürümün günlüğüne customer sütununu ekle ve tetikleyicileri müşteriyi de yazacak şekilde yenile"""
+    cursor.execute("PRAGMA table_info(order_changes)")
+    if 'customer' not in [col[1] for col in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE order_changes ADD COLUMN customer TEXT")
+    for trigger in CHANGE_LOG_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    create_detector_aggregates(cursor, insert_when)
+
+
+def add_inserted_orders_to_change_log(cursor, after_rowid: int):
+    """Tetikleyicisiz eklenmiş (rowid > after_rowid) siparişleri değişiklik günlüğüne tek sorguyla ekle"""
+    cursor.execute(f"""
+        INSERT INTO order_changes(day, status, product, customer, delta)
+        SELECT {DAY_SQL.format_map(ORDERS_COLUMNS)}, status, product, customer, 1 FROM orders WHERE rowid > ?
+    """, (after_rowid,))
+
+
+def get_watermark(cursor) -> int:
+    row = cursor.execute("SELECT value FROM detector_watermarks WHERE name = ?", (CHANGE_LOG_WATERMARK,)).fetchone()
+    return row[0] if row else 0
+
+
+def apply_pending_changes(cursor) -> int:
+    """Filigrandan sonraki günlük kayıtlarını özete katla, tüketilen kayıtları sil; katlanan kayıt sayısını döndür.
+
+    Çağıran işlemi commit etmelidir; günlük okuma, özet güncellemesi ve filigran aynı işlemde ilerler.
+    """
+    watermark = get_watermark(cursor)
+    pending, latest = cursor.execute(
+        "SELECT COUNT(*), COALESCE(MAX(seq), 0) FROM order_changes WHERE seq > ?", (watermark,)
+    ).fetchone()
+    if not pending:
+        return 0
+
+    for table, column in AGGREGATE_TABLES.items():
+        cursor.execute(f"""
+            INSERT INTO {table}(day, status, {column}, orders)
+            SELECT day, status, {column}, SUM(delta) FROM order_changes
+            WHERE seq > ? AND seq <= ? GROUP BY day, status, {column}
+            ON CONFLICT(day, status, {column}) DO UPDATE SET orders = orders + excluded.orders
+        """, (watermark, latest))
+        cursor.execute(f"DELETE FROM {table} WHERE orders = 0")
+    cursor.execute("DELETE FROM order_changes WHERE seq <= ?", (latest,))
+    cursor.execute("""
+        INSERT INTO detector_watermarks(name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = excluded.value
+    """, (CHANGE_LOG_WATERMARK, latest))
+    return pending
+
+
+def compute_detector_aggregates(cursor, table: str = 'detector_daily') -> Dict[Tuple[str, str, str], int]:
+    """Özetin olması gereken değerlerini orders'tan (mühürlenmiş aylar dahil) hesapla"""
+    column = AGGREGATE_TABLES[table]
+    expected: Dict[Tuple[str, str, str], int] = {}
+    for source_cursor, source in each_order_source(cursor):
+        source_cursor.execute(f"""
+            SELECT {DAY_SQL.format_map(ORDERS_COLUMNS)} AS day, status, {column}, COUNT(*)
+            FROM {source} AS orders GROUP BY day, status, {column}
+        """)
+        for day, status, key, count in source_cursor.fetchall():
+            expected[(day, status, key)] = expected.get((day, status, key), 0) + count
+    return expected
+
+
+def rebuild_detector_aggregates(cursor):
+    """Özetleri sıfırdan hesapla; bekleyen günlük kayıtları artık özete dahil olduğundan silinir"""
+    for table, column in AGGREGATE_TABLES.items():
+        expected = compute_detector_aggregates(cursor, table)
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.executemany(
+            f"INSERT INTO {table}(day, status, {column}, orders) VALUES (?, ?, ?, ?)",
+            [(day, status, key, count) for (day, status, key), count in expected.items()]
+        )
+    cursor.execute("DELETE FROM order_changes")
+    latest = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'order_changes'").fetchone()
+    cursor.execute("""
+        INSERT INTO detector_watermarks(name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = excluded.value
+    """, (CHANGE_LOG_WATERMARK, latest[0] if latest else 0))
+
+
+def check_detector_aggregates(cursor) -> List[str]:
+    """Bekleyen değişiklikler katlandıktan sonraki özetleri orders'tan hesaplananla karşılaştır"""
+    apply_pending_changes(cursor)
+    differences = []
+    for table, column in AGGREGATE_TABLES.items():
+        expected = compute_detector_aggregates(cursor, table)
+        cursor.execute(f"SELECT day, status, {column}, orders FROM {table}")
+        stored = {(day, status, key): count for day, status, key, count in cursor.fetchall()}
+
+        for key in sorted(set(expected) | set(stored)):
+            if expected.get(key, 0) != stored.get(key, 0):
+                differences.append(f"{table} {'/'.join(key)}: saklanan={stored.get(key, 0)} gerçek={expected.get(key, 0)}")
+    return differences
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    if "--rebuild" in sys.argv:
+        rebuild_detector_aggregates(cursor)
+        conn.commit()
+        print("✅ Tespit özetleri sıfırdan yeniden oluşturuldu")
+    else:
+        differences = check_detector_aggregates(cursor)
+        conn.commit()
+        if differences:
+            print("❌ Tutarsız tespit özetleri (düzeltmek için: python detector_aggregates.py --rebuild):")
+            for difference in differences[:20]:
+                print(f"   - {difference}")
+            conn.close()
+            sys.exit(1)
+        print("✅ Tüm tespit özetleri tutarlı")
+
+    conn.close()
@@ -0,0 +1,80 @@
+"""
+Akışlı Dışa Aktarma
+Sorgu sonuçlarını sunucu tarafı cursor'dan parça parça okuyup NDJSON veya CSV
+olarak (isteğe bağlı gzip ile) akıtan yardımcılar. Bellek kullanımı satır sayısından bağımsızdır.
+"""
+import csv
+import io
+import json
+import sqlite3
+import zlib
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from db_pool import get_pool
+
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _encode_batch(rows: List[Dict], columns: Sequence[str], fmt: str, write_header: bool) -> bytes:
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if write_header:
+            writer.writerow(columns)
+        writer.writerows([[row[column] for column in columns] for row in rows])
+        return buffer.getvalue().encode('utf-8')
+    return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows).encode('utf-8')
+
+
+def stream_rows(query: Union[str, Callable[[sqlite3.Connection], Iterator]], params: Sequence,
+                columns: Sequence[str], fmt: str, compress: bool,
+                transform: Optional[Callable[[Dict], Dict]] = None) -> Iterator[bytes]:
+    """Sorgu sonucunu EXPORT_BATCH_SIZE'lık parçalar halinde kodlanmış bayt olarak üret.
+
+    query bir sorgu metni ya da bağlantıyı alıp satır üreten bir fonksiyondur (ör. ay dosyalarına
+    yönlendirilen sipariş sorgusu). Bağlantı thread'e bağlanmadan alınır; StreamingResponse her
+    parçayı farklı bir thread'de isteyebileceği için iade de herhangi bir thread'den yapılabilir.
+    """
+    conn = get_pool().acquire(detached=True)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    source = None
+    try:
+        source = query(conn) if callable(query) else conn.execute(query, params)
+        fetch = getattr(source, 'fetchmany', None) or (lambda size: list(islice(source, size)))
+        first = True
+        while True:
+            batch = fetch(EXPORT_BATCH_SIZE)
+            if not batch and not first:
+                break
+            # Sorgu önce columns'u sırasıyla seçer; sonraki (ör. sıralama) sütunları yazılmaz
+            rows = [dict(zip(columns, row)) for row in batch]
+            if transform:
+                rows = [transform(row) for row in rows]
+            chunk = _encode_batch(rows, columns, fmt, write_header=first)
+            first = False
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+            if not batch:
+                break
+        if compressor:
+            yield compressor.flush()
+    finally:
+        # Yarıda bırakılan üreteç bağlı ay dosyalarını bağlantı havuza dönmeden ayırır
+        if source is not None:
+            source.close()
+        conn.close()
+
+
+def export_headers(name: str, fmt: str, compress: bool) -> Dict[str, str]:
+    headers = {'Content-Disposition': f'attachment; filename="{name}.{fmt}"'}
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    return headers
@@ -0,0 +1,130 @@
+"""
+Kimlik Üretici
+Veritabanına gitmeden, toplu ve çakışmasız kimlik üreten Snowflake/ULID benzeri üretici.
+
+96 bitlik kimlik: 48 bit milisaniye zaman damgası | 10 bit düğüm | 22 bit süreç (pid) | 16 bit sıra.
+Crockford base32 ile 20 karaktere kodlanır (ör. ANO-00D19F7TR0G00125W000); zaman damgası en anlamlı
+bitlerde olduğundan kimlikler metin olarak da zaman sırasına göre sıralanır.
+
+- Aynı süreç içinde: kilit altında artan sıra numarası; aynı milisaniyede 65536 kimlik dolarsa zaman
+  damgası beklemeden bir milisaniye ileri alınır. Saat geri giderse son zaman damgası kullanılmaya devam
+  eder; kimlikler her durumda tekdüze artar.
+- Süreçler arasında: pid aynı anda çalışan süreçler için tekildir (Linux pid_max <= 2^22).
+  fork sonrası çocuk süreç kendi pid'ini alır ve sıra sıfırdan başlar.
+- Makineler arasında: ANOMALY_ID_NODE ortam değişkeni (0-1023) her makineye ayrı verilir.
+"""
+import os
+import threading
+import time
+from typing import List, Optional
+
+CROCKFORD_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+TIMESTAMP_BITS = 48
+NODE_BITS = 10
+PROCESS_BITS = 22
+SEQUENCE_BITS = 16
+
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# 96 bit / 5 bit = 19.2 → 20 karakter
+ENCODED_LENGTH = 20
+
+NODE_ENV = 'ANOMALY_ID_NODE'
+
+# Kimliğin son 4 karakteri (20 bit) sıra numarasını içerir; önceki 16 karakter aynı milisaniyede sabittir.
+# Son karakterler 10 bitlik çiftler tablosundan okunur, böylece kimlik başına base32 döngüsü çalışmaz
+TAIL_BITS = 20
+_PAIRS = [CROCKFORD_ALPHABET[i >> 5] + CROCKFORD_ALPHABET[i & 31] for i in range(1024)]
+
+
+def encode_base32(value: int, length: int = ENCODED_LENGTH) -> str:
+    """Tamsayıyı sabit uzunlukta Crockford base32 metnine çevir (baştaki sıfırlar korunur)"""
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def decode_base32(text: str) -> int:
+    value = 0
+    for char in text:
+        value = (value << 5) | CROCKFORD_ALPHABET.index(char)
+    return value
+
+
+def _default_node() -> int:
+    node = int(os.environ.get(NODE_ENV, '0'))
+    if not 0 <= node <= MAX_NODE:
+        raise ValueError(f"{NODE_ENV} 0 ile {MAX_NODE} arasında olmalı: {node}")
+    return node
+
+
+class IdGenerator:
+    """Önekli, tekdüze artan ve sıralanabilir kimlik üretici (thread ve fork güvenli)"""
+
+    def __init__(self, prefix: str, node: Optional[int] = None):
+        self.prefix = prefix
+        self.node = _default_node() if node is None else node
+        if not 0 <= self.node <= MAX_NODE:
+            raise ValueError(f"Düğüm kimliği 0 ile {MAX_NODE} arasında olmalı: {self.node}")
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker = 0
+        self._last_ms = 0
+        self._sequence = 0
+        self._head_ms = None
+        self._head = ''
+
+    def _reset_for_process(self):
+        pid = os.getpid()
+        self._pid = pid
+        self._worker = (self.node << PROCESS_BITS) | (pid & ((1 << PROCESS_BITS) - 1))
+        self._last_ms = 0
+        self._sequence = 0
+        # Önbellekteki baş kısım ebeveyn sürecin pid'ini taşır
+        self._head_ms = None
+
+    def next_ids(self, count: int) -> List[str]:
+        """count adet kimliği tek kilit alımıyla üret"""
+        ids = []
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset_for_process()
+
+            now_ms = int(time.time() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms, self._sequence = now_ms, 0
+
+            while count > 0:
+                if self._sequence > MAX_SEQUENCE:
+                    # Bu milisaniyenin sıra numaraları bitti; mantıksal saat bir milisaniye ilerler
+                    self._last_ms, self._sequence = max(now_ms, self._last_ms + 1), 0
+
+                base = (self._last_ms << (NODE_BITS + PROCESS_BITS + SEQUENCE_BITS)) | (self._worker << SEQUENCE_BITS)
+                if self._head_ms != self._last_ms:
+                    self._head_ms = self._last_ms
+                    self._head = f"{self.prefix}-{encode_base32(base >> TAIL_BITS, ENCODED_LENGTH - TAIL_BITS // 5)}"
+                head = self._head
+                tail_base = base & ((1 << TAIL_BITS) - 1)
+                batch = min(count, MAX_SEQUENCE + 1 - self._sequence)
+                for sequence in range(self._sequence, self._sequence + batch):
+                    tail = tail_base | sequence
+                    ids.append(head + _PAIRS[tail >> 10] + _PAIRS[tail & 1023])
+                self._sequence += batch
+                count -= batch
+        return ids
+
+    def next_id(self) -> str:
+        return self.next_ids(1)[0]
+
+
+def id_timestamp_ms(generated_id: str) -> int:
+    """Üretilmiş kimliğin milisaniye zaman damgası"""
+    return decode_base32(generated_id.rsplit('-', 1)[1]) >> (NODE_BITS + PROCESS_BITS + SEQUENCE_BITS)
+
+
+# Dedektörün ürettiği anomaliler için paylaşılan üretici
+anomaly_ids = IdGenerator('ANO')
@@ -1,30 +1,174 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import Optional, List
-import sqlite3
 import json
+import asyncio
+import base64
+import time
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 import uvicorn
-from anomaly_detector import trigger_detection_after_settings_update
+from anomaly_detector import run_detection_job
+from db_pool import get_pool, run_db, run_in_db_thread
+from migrations import normalize_search_text
+from rollups import fetch_buckets
+from exports import MEDIA_TYPES, export_headers, stream_rows
+from partitions import routed_rows
+from bulk_ingest import ingest_orders, parse_bulk_body
+from response_cache import CacheEntry, make_etag, response_cache
+from retention import RETENTION_INTERVAL_SECONDS, retention_status, run_retention_job
+from detection_scheduler import DetectionScheduler
+from stock_levels import fetch_low_stock
 
 app = FastAPI(title="E-ticaret Sipariş Anomali Tespit API", version="1.0.0")
 
-# Başlangıçta veritabanı tarihlerini kontrol etmek ve güncellemek için startup olayı
-@app.on_event("startup")
-async def startup_event():
-    """Başlangıçta veritabanı tarihlerini kontrol et ve güncelle"""
+# Anomali tespiti istek içinde değil, bu zamanlayıcının arka plan thread'inde çalışır
+detection_scheduler = DetectionScheduler(
+    run_detection_job,
+    on_complete=lambda: response_cache.bump_tables("anomalies")
+)
+
+# Süresi dolan anomali ve bildirimleri günde bir arşive taşır; aynı zamanlayıcı sınıfı kullanılır
+retention_scheduler = DetectionScheduler(
+    run_retention_job,
+    interval_seconds=RETENTION_INTERVAL_SECONDS,
+    on_complete=lambda: response_cache.bump_tables("anomalies", "notifications"),
+    name='retention', label='Saklama', job_prefix='RET'
+)
+
+# ?wait=true ile POST /anomalies/detect'in işi bekleyeceği en uzun süre (saniye)
+DETECTION_WAIT_TIMEOUT_SECONDS = 30
+
+def refresh_dates():
+    """Son güncellemeden bu yana geçen gün kadar verileri bugüne kaydır (gün içinde ilk açılışta)"""
+    from database import check_and_update_dates
+    conn = get_db_connection()
     try:
-        from database import check_and_update_dates
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        check_and_update_dates(cursor)
+        shifted = check_and_update_dates(conn.cursor())
         conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
         conn.close()
-        print(" Başlangıçta veritabanı tarih kontrolü tamamlandı")
+    if shifted:
+        response_cache.bump_tables("orders", "anomalies", "notifications")
+
+# Tarih kaydırması tek işlemde yazma kilidini tutar; büyük veritabanında bu süre db_pool.BUSY_TIMEOUT_MS'i
+# aşar. Yazan istekler "database is locked" almak yerine kaydırmanın bitmesini bekler (okumalar WAL
+# sayesinde beklemez). Olay kaydırma sürmüyorken kuruludur
+dates_refreshed = asyncio.Event()
+dates_refreshed.set()
+
+# Yazan bir isteğin tarih kaydırmasını bekleyeceği en uzun süre (saniye); aşılırsa 503 döner
+DATE_REFRESH_WAIT_SECONDS = 120
+
+async def refresh_dates_in_background():
+    try:
+        await run_db(refresh_dates)
+        print(" Veritabanı tarih kontrolü tamamlandı")
     except Exception as e:
-        print(f"Uyarı: Başlangıçta veritabanı tarih kontrolü başarısız: {str(e)}")
+        print(f"Uyarı: Veritabanı tarih kontrolü başarısız: {str(e)}")
+    finally:
+        dates_refreshed.set()
+    # İlk tespit turu açılışı bekletmez; kaydırılmış tarihlerle arka planda çalışır
+    detection_scheduler.request("startup")
+
+# Arka plan görevlerine referans tutulur; aksi halde çöp toplayıcı bitmeden silebilir
+background_tasks = set()
+
+# Başlangıçta şema migrasyonlarını uygulamak ve tarih kontrolünü başlatmak için startup olayı
+@app.on_event("startup")
+async def startup_event():
+    """Başlangıçta şema migrasyonlarını uygula, veritabanı tarihlerini arka planda güncelle"""
+    def migrate():
+        from migrations import apply_migrations
+        conn = get_db_connection()
+        try:
+            apply_migrations(conn)
+        finally:
+            conn.close()
+
+    try:
+        await run_db(migrate)
+    except Exception as e:
+        print(f"Uyarı: Başlangıçta şema migrasyonları başarısız: {str(e)}")
+    
+    # Tarih kaydırması küme tabanlıdır ama satır sayısıyla büyür; açılış onu beklemez
+    dates_refreshed.clear()
+    task = asyncio.create_task(refresh_dates_in_background())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    
+    detection_scheduler.start()
+    retention_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Arka plan tespit ve saklama zamanlayıcılarını durdur"""
+    await asyncio.to_thread(detection_scheduler.stop)
+    await asyncio.to_thread(retention_scheduler.stop)
+
+# Önbelleğe alınan GET yolları ve yanıtlarının bağlı olduğu tablolar.
+# Bu tablolara yazan her yol response_cache.bump_tables(...) çağırmalıdır.
+CACHED_ROUTES = {
+    "/dashboard/stats": ("orders", "anomalies"),
+    "/dashboard/anomaly-types": ("anomalies",),
+    "/anomalies": ("anomalies",),
+    "/anomalies/filtered": ("anomalies",),
+    "/anomalies/windows": ("orders",),
+    "/anomalies/backtest": ("orders",),
+    "/settings": ("settings",),
+    "/inventory": ("inventory",),
+}
+
+@app.middleware("http")
+async def date_refresh_middleware(request: Request, call_next):
+    """Yazan istekleri açılıştaki tarih kaydırması bitene kadar beklet (bkz. dates_refreshed)"""
+    if request.method in ("POST", "PUT", "PATCH", "DELETE") and not dates_refreshed.is_set():
+        try:
+            await asyncio.wait_for(dates_refreshed.wait(), DATE_REFRESH_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            return JSONResponse(status_code=503, headers={"Retry-After": "5"},
+                                content={"detail": "Veritabanı tarihleri güncelleniyor, lütfen tekrar deneyin"})
+    return await call_next(request)
+
+# CORS middleware'inden önce eklenir ki CORS başlıkları önbellekten dönen yanıtlara da eklensin
+@app.middleware("http")
+async def cache_middleware(request: Request, call_next):
+    """CACHED_ROUTES için yanıtları önbellekten sun; If-None-Match eşleşirse 304 döndür"""
+    tables = CACHED_ROUTES.get(request.url.path)
+    if request.method != "GET" or tables is None:
+        return await call_next(request)
+
+    key = request.url.path + "?" + "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    if_none_match = request.headers.get("if-none-match")
+
+    entry = response_cache.get(key, tables)
+    if entry is not None:
+        if if_none_match == entry.etag:
+            response_cache.record_not_modified()
+            return Response(status_code=304, headers={"ETag": entry.etag, "X-Cache": "HIT"})
+        return Response(content=entry.body, status_code=entry.status_code,
+                        headers={**entry.headers, "X-Cache": "HIT"})
+
+    # Sürümler istekten önce alınır; istek sırasında yazma olursa kayıt bir sonraki okumada bayatlar
+    versions = response_cache.table_versions(tables)
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = make_etag(body)
+    headers = {"content-type": response.headers.get("content-type", "application/json"), "ETag": etag}
+    response_cache.set(key, CacheEntry(body, response.status_code, headers, etag, versions,
+                                       time.monotonic() + response_cache.ttl_seconds))
+
+    if if_none_match == etag:
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers={"ETag": etag, "X-Cache": "MISS"})
+    return Response(content=body, status_code=response.status_code, headers={**headers, "X-Cache": "MISS"})
 
 # Frontend isteklerine izin vermek için CORS middleware
 app.add_middleware(
@@ -33,6 +177,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Cache"],
 )
 
 # İstek/yanıt doğrulaması için Pydantic modelleri
@@ -57,6 +202,10 @@ class Anomaly(BaseModel):
     cancel_rate_threshold: Optional[int] = None
     late_shipping_threshold: Optional[int] = None
     stock_out_threshold: Optional[int] = None
+    scope: Optional[str] = None
+    subject: Optional[str] = None
+    source: Optional[str] = None
+    run_id: Optional[str] = None
 
 class Notification(BaseModel):
     id: str
@@ -101,6 +250,7 @@ class InventoryItem(BaseModel):
     
 class InventoryUpdate(BaseModel):
     current_stock: int
+    min_stock: Optional[int] = None
 
 class User(BaseModel):
     id: int
@@ -122,70 +272,273 @@ class ForgotPassword(BaseModel):
     email: str
     min_stock: int
 
-# Veritabanı bağlantı yardımcısı
+# Veritabanı bağlantı yardımcısı (paylaşılan havuzdan; close() bağlantıyı havuza iade eder)
 def get_db_connection():
-    import os
-    db_path = os.path.join(os.path.dirname(__file__), 'ecommerce.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool().acquire()
+
+# Sipariş sayfalama yardımcıları
+ORDER_COLUMNS = ['id', 'date', 'customer', 'product', 'amount', 'status', 'anomaly', 'severity']
+MAX_ORDERS_PAGE_SIZE = 1000
+
+ANOMALY_COLUMNS = ['id', 'type', 'severity', 'description', 'date', 'orderId', 'suggestions',
+                   'cancel_rate_threshold', 'late_shipping_threshold', 'stock_out_threshold', 'scope', 'subject',
+                   'source', 'run_id']
+
+# /dashboard/chart-data tek istekte en fazla bu kadar kova döndürür (ör. 83 günlük saatlik veri)
+MAX_CHART_BUCKETS = 2000
+
+# /anomalies/windows pencere ve eşiklerinin üst sınırı (1 yıl)
+MAX_WINDOW_HOURS = 24 * 366
+
+# Sipariş anlık görüntüsü orders tablo sürümü değişene kadar istekler arasında paylaşılır.
+# NumPy kullanan window_engine ve backtest ilk istekte yüklenir; açılış onları beklemez
+snapshot_caches = {}
+
+def get_snapshot_cache(name: str):
+    from window_engine import SnapshotCache
+    return snapshot_caches.setdefault(name, SnapshotCache())
+
+def parse_order_fields(fields: Optional[str]) -> List[str]:
+    """fields=id,date,... parametresini doğrulanmış sütun listesine çevir"""
+    if not fields:
+        return list(ORDER_COLUMNS)
+    columns = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [c for c in columns if c not in ORDER_COLUMNS]
+    if unknown or not columns:
+        raise HTTPException(status_code=400, detail=f"Geçersiz alan(lar): {', '.join(unknown)}")
+    return list(dict.fromkeys(columns))
+
+def encode_order_cursor(date: str, order_id: str) -> str:
+    """(date, id) sayfa anahtarını URL güvenli bir token'a çevir"""
+    raw = json.dumps([date, order_id], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_order_cursor(token: str):
+    """encode_order_cursor ile üretilen token'ı (date, id) ikilisine geri çevir"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        date, order_id = json.loads(raw)
+        if not isinstance(date, str) or not isinstance(order_id, str):
+            raise ValueError
+        return date, order_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz cursor")
+
+def build_order_search_query(search: str) -> Optional[str]:
+    """Arama metnini orders_fts için önek eşleşmeli bir FTS5 MATCH ifadesine çevir.
+
+    Her kelime tırnaklı bir önek ifadesi olur ("ord-001"* gibi) ve kelimeler AND ile bağlanır.
+    """
+    terms = [normalize_search_text(word).replace('"', '') for word in search.split()]
+    terms = [term for term in terms if any(ch.isalnum() for ch in term)]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
 
 # API Rotaları
 @app.get("/")
 async def root():
     return {"message": "E-ticaret Sipariş Anomali Tespit API"}
 
-@app.get("/orders", response_model=List[Order])
-async def get_orders(
-    status: Optional[str] = None,
-    date_from: Optional[str] = None,
-    date_to: Optional[str] = None,
-    search: Optional[str] = None
-):
-    """Siparişleri filtreleme seçenekleri ile getir"""
-    conn = get_db_connection()
-    query = "SELECT * FROM orders WHERE 1=1"
+@app.get("/health")
+async def health():
+    """Canlılık kontrolü; veritabanına dokunmaz, açılış biter bitmez yanıt verir"""
+    return {"status": "ok"}
+
+def build_order_filters(status: Optional[str], date_from: Optional[str], date_to: Optional[str],
+                        search: bool = False):
+    """/orders ve /orders/export için ortak WHERE koşulları (orders tablosu 'o' takma adıyla).
+
+    search ile arama eşleşmeleri routed_rows'un bir kez hesapladığı order_search'ten okunur.
+    """
+    query = ""
     params = []
     
+    if search:
+        query += " AND o.rowid IN (SELECT rowid FROM order_search)"
+    
     if status and status != "all":
-        query += " AND status = ?"
+        query += " AND o.status = ?"
         params.append(status)
     
+    # Tarih aralığı metin yerine epoch zaman damgası (ts) üzerinde karşılaştırılır
     if date_from:
-        query += " AND date >= ?"
+        query += " AND o.ts >= unixepoch(?)"
         params.append(date_from)
     
     if date_to:
-        query += " AND date <= ?"
+        query += " AND o.ts <= unixepoch(?)"
         params.append(date_to)
     
-    if search:
-        query += " AND (id LIKE ? OR customer LIKE ? OR product LIKE ?)"
-        search_param = f"%{search}%"
-        params.extend([search_param, search_param, search_param])
+    return query, params
+
+@app.get("/orders/export")
+def export_orders(
+    request: Request,
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    search: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")
+):
+    """Siparişleri NDJSON veya CSV olarak akıt (Accept-Encoding: gzip ile sıkıştırılmış)"""
+    columns = parse_order_fields(fields)
+    # Sıralama anahtarı (ts, id) istenen sütunlardan sonra seçilir; yanıta yalnızca istenenler yazılır
+    select_columns = columns + [c for c in ('id',) if c not in columns]
+    match = build_order_search_query(search) if search else None
+    filters, params = build_order_filters(status, date_from, date_to, match is not None)
+    query = (f"SELECT {', '.join(f'o.{c} AS {c}' for c in select_columns)}, o.ts AS sort_ts "
+             f"FROM {{source}} o WHERE 1=1{filters}")
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    
+    def rows(conn):
+        return routed_rows(conn, query, params, date_from=date_from, date_to=date_to, match=match)
+    
+    return StreamingResponse(
+        stream_rows(rows, (), columns, format, compress),
+        media_type=MEDIA_TYPES[format],
+        headers=export_headers("orders", format, compress)
+    )
+
+def fetch_orders(conn, select_columns: List[str], status: Optional[str] = None, date_from: Optional[str] = None,
+                 date_to: Optional[str] = None, match: Optional[str] = None, by_relevance: bool = False,
+                 after: Optional[tuple] = None, limit: Optional[int] = None):
+    """/orders sorgusunu kur; sıcak tabloya ve sadece tarih aralığı / cursor ile kesişen ay dosyalarına gönder.
+
+    after, decode_order_cursor'ın döndürdüğü (date, id) sayfa anahtarıdır; match ise
+    build_order_search_query'nin FTS5 ifadesi. Satırlar partitions.routed_rows'tan sıralı döner.
+    """
+    # {source}: orders görünümü veya mühürlenmiş bir ayın dosyası (partitions.routed_rows)
+    query = f"SELECT {', '.join(f'o.{c} AS {c}' for c in select_columns)}, o.ts AS sort_ts"
+    params = []
+    
+    if by_relevance:
+        # CROSS JOIN: eşleşmelerden gidilir, ay dosyası baştan sona taranmaz
+        query += ", s.rank AS rank FROM order_search s CROSS JOIN {source} o ON o.rowid = s.rowid WHERE 1=1"
+        filters, filter_params = build_order_filters(status, date_from, date_to)
+    else:
+        query += " FROM {source} o WHERE 1=1"
+        filters, filter_params = build_order_filters(status, date_from, date_to, match is not None)
+    query += filters
+    params.extend(filter_params)
     
-    query += " ORDER BY date DESC"
+    if after:
+        query += " AND (o.ts < unixepoch(?) OR (o.ts = unixepoch(?) AND o.id < ?))"
+        params.extend([after[0], after[0], after[1]])
     
+    return routed_rows(conn, query, params, limit=limit, ranked=by_relevance, date_from=date_from,
+                       date_to=date_to, before=after[0] if after else None, match=match)
+
+@app.get("/orders", response_model=List[Order])
+@run_in_db_thread
+def get_orders(
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_ORDERS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    sort: str = Query("date", pattern="^(date|relevance)$")
+):
+    """Siparişleri filtreleme seçenekleri ile getir.
+
+    limit verilirse sonuçlar (date, id) üzerinde cursor tabanlı sayfalanır; sonraki sayfanın
+    cursor'ı X-Next-Cursor başlığında döner. fields ile sadece istenen sütunlar seçilir.
+    search, orders_fts tam metin indeksinde önek ve aksan duyarsız eşleşme yapar;
+    sort=relevance ile sonuçlar eşleşme skoruna göre sıralanır (cursor desteklenmez).
+    """
+    columns = parse_order_fields(fields)
+    # Sayfa anahtarı için date ve id her zaman seçilir, istenmediyse yanıttan çıkarılır
+    select_columns = columns + [c for c in ('date', 'id') if c not in columns]
+    after = decode_order_cursor(cursor) if cursor else None
+    match = build_order_search_query(search) if search else None
+    by_relevance = sort == "relevance" and match is not None
+    if by_relevance and after:
+        raise HTTPException(status_code=400, detail="sort=relevance cursor ile kullanılamaz")
+
+    conn = get_db_connection()
     try:
-        cursor = conn.execute(query, params)
-        orders = cursor.fetchall()
-        conn.close()
-        
-        return [dict(order) for order in orders]
+        # Bir fazla satır okunur; varsa sonraki sayfa mevcuttur
+        rows = list(fetch_orders(conn, select_columns, status, date_from, date_to, match, by_relevance, after,
+                                 limit + 1 if limit else None))
     except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
         conn.close()
+    
+    headers = {}
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        if not by_relevance:
+            headers["X-Next-Cursor"] = encode_order_cursor(rows[-1]['date'], rows[-1]['id'])
+    
+    orders = [{column: row[column] for column in columns} for row in rows]
+    # Satırlar zaten veritabanı şemasına uygun; pydantic doğrulamasını atlayıp doğrudan döndür
+    return JSONResponse(content=orders, headers=headers)
+
+@app.post("/orders/bulk")
+async def bulk_create_orders(request: Request):
+    """Siparişleri toplu ekle.
+
+    Gövde JSON dizisi veya NDJSON (application/x-ndjson) olabilir. Satırlar partiler halinde
+    doğrulanıp her parti tek işlemde yazılır; hatalı satırlar atlanır ve index'leriyle raporlanır.
+    """
+    body = await request.body()
+    try:
+        records, parse_errors = parse_bulk_body(body, request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Geçersiz gövde: {str(e)}")
+    
+    def ingest():
+        conn = get_db_connection()
+        try:
+            return ingest_orders(conn, records, Order, parse_errors)
+        finally:
+            conn.close()
+    
+    try:
+        result = await run_db(ingest)
+    except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        response_cache.bump_tables("orders")
+    return result
+
+@app.get("/anomalies/export")
+def export_anomalies(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")
+):
+    """Anomalileri NDJSON veya CSV olarak akıt (Accept-Encoding: gzip ile sıkıştırılmış)"""
+    columns = ANOMALY_COLUMNS
+    query = f"SELECT {', '.join(columns)} FROM anomalies ORDER BY date DESC"
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    
+    def decode_suggestions(row):
+        # NDJSON'da öneriler liste olarak, CSV'de JSON metni olarak kalır
+        row['suggestions'] = json.loads(row['suggestions'])
+        return row
+    
+    return StreamingResponse(
+        stream_rows(query, [], columns, format, compress,
+                    transform=decode_suggestions if format == "ndjson" else None),
+        media_type=MEDIA_TYPES[format],
+        headers=export_headers("anomalies", format, compress)
+    )
 
 @app.get("/anomalies", response_model=List[Anomaly])
-async def get_anomalies():
+@run_in_db_thread
+def get_anomalies():
     """Tüm anomalileri getir"""
     conn = get_db_connection()
     try:
         cursor = conn.execute("""SELECT id, type, severity, description, date, orderId, suggestions,
-                                         cancel_rate_threshold, late_shipping_threshold, stock_out_threshold 
+                                         cancel_rate_threshold, late_shipping_threshold, stock_out_threshold,
+                                         scope, subject, source, run_id
                                  FROM anomalies ORDER BY date DESC""")
         anomalies = cursor.fetchall()
-        conn.close()
         
         result = []
         for anomaly in anomalies:
@@ -195,20 +548,24 @@ async def get_anomalies():
         
         return result
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.get("/anomalies/filtered", response_model=List[Anomaly])
-async def get_filtered_anomalies(
+@run_in_db_thread
+def get_filtered_anomalies(
     cancel_rate_threshold: Optional[int] = None,
     late_shipping_threshold: Optional[int] = None,
-    stock_out_threshold: Optional[int] = None
+    stock_out_threshold: Optional[int] = None,
+    source: Optional[str] = Query(None, pattern="^(threshold|group|statistical)$")
 ):
-    """Eşik değerlerine göre filtrelenmiş anomalileri getir"""
+    """Eşik değerlerine ve üreten kaynağa göre filtrelenmiş anomalileri getir"""
     conn = get_db_connection()
     try:
         query = """SELECT id, type, severity, description, date, orderId, suggestions,
-                          cancel_rate_threshold, late_shipping_threshold, stock_out_threshold 
+                          cancel_rate_threshold, late_shipping_threshold, stock_out_threshold,
+                          scope, subject, source, run_id
                    FROM anomalies WHERE 1=1"""
         params = []
         
@@ -228,11 +585,15 @@ async def get_filtered_anomalies(
             query += """ AND (stock_out_threshold IS NOT NULL AND stock_out_threshold <= ?)"""
             params.append(stock_out_threshold)
         
+        # Kaynak: dedektörün hangi kontrolü üretti (seed/elle eklenen kayıtlarda source boştur)
+        if source is not None:
+            query += """ AND source = ?"""
+            params.append(source)
+        
         query += " ORDER BY date DESC"
         
         cursor = conn.execute(query, params)
         anomalies = cursor.fetchall()
-        conn.close()
         
         result = []
         for anomaly in anomalies:
@@ -242,147 +603,216 @@ async def get_filtered_anomalies(
         
         return result
     except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
         conn.close()
+
+def parse_hours_list(value: Optional[str], default) -> List[int]:
+    """'1,6,24' biçimindeki saat listesini doğrula"""
+    if not value:
+        return list(default)
+    try:
+        hours = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Geçersiz saat listesi: {value}")
+    if not hours or any(h <= 0 or h > MAX_WINDOW_HOURS for h in hours):
+        raise HTTPException(status_code=400, detail=f"Saatler 1 ile {MAX_WINDOW_HOURS} arasında olmalı")
+    return list(dict.fromkeys(hours))
+
+@app.get("/anomalies/windows")
+@run_in_db_thread
+def get_anomaly_windows(windows: Optional[str] = None, late: Optional[str] = None):
+    """İptal oranı, geç kargo ve ürün talebini birden çok pencere için tek geçişte hesapla.
+
+    windows: pencere saatleri (varsayılan 1,6,24,168), late: geç kargo eşik saatleri (varsayılan 24,48,72)
+    """
+    from window_engine import DEFAULT_LATE_THRESHOLDS_HOURS, DEFAULT_WINDOWS_HOURS, evaluate_windows, load_snapshot
+    windows_hours = parse_hours_list(windows, DEFAULT_WINDOWS_HOURS)
+    late_hours = parse_hours_list(late, DEFAULT_LATE_THRESHOLDS_HOURS)
+    conn = get_db_connection()
+    try:
+        snapshot = get_snapshot_cache("windows").get(response_cache.table_versions(("orders",)),
+                                                     lambda: load_snapshot(conn))
+    except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+    
+    metrics = evaluate_windows(snapshot, windows_hours=windows_hours, late_thresholds_hours=late_hours)
+    return metrics.to_dict()
+
+@app.get("/anomalies/backtest")
+@run_in_db_thread
+def get_anomaly_backtest(cancel: str = "10,15,20,25,30", late: str = "24,48,72",
+                         days: Optional[int] = Query(None, ge=1, le=3660),
+                         step_hours: Optional[int] = Query(None, ge=1, le=24),
+                         workers: Optional[int] = Query(None, ge=1)):
+    """Eşik ızgarasını geçmiş siparişler üzerinde geri test et.
+
+    cancel: iptal oranı eşikleri (%), late: geç kargo eşikleri (saat). Her kombinasyon için gün başına
+    tespitin üreteceği yeni highCancelRate/lateShipping anomalisi sayısı döner.
+    """
+    from backtest import DEFAULT_STEP_HOURS, MAX_GRID_POINTS, MAX_WORKERS, load_backtest_snapshot, run_backtest
+    if workers is not None and workers > MAX_WORKERS:
+        raise HTTPException(status_code=400, detail=f"workers en fazla {MAX_WORKERS} olabilir")
+    try:
+        cancel_thresholds = list(dict.fromkeys(float(part) for part in cancel.split(',') if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Geçersiz iptal oranı listesi: {cancel}")
+    if not cancel_thresholds or any(t < 0 or t > 100 for t in cancel_thresholds):
+        raise HTTPException(status_code=400, detail="İptal oranı eşikleri 0 ile 100 arasında olmalı")
+    late_thresholds = parse_hours_list(late, ())
+    if len(cancel_thresholds) * len(late_thresholds) > MAX_GRID_POINTS:
+        raise HTTPException(status_code=400, detail=f"Izgara en fazla {MAX_GRID_POINTS} kombinasyon olabilir")
+
+    conn = get_db_connection()
+    try:
+        snapshot = get_snapshot_cache("backtest").get(response_cache.table_versions(("orders",)),
+                                                      lambda: load_backtest_snapshot(conn))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+    return run_backtest(snapshot, cancel_thresholds, late_thresholds, days=days,
+                        step_hours=step_hours or DEFAULT_STEP_HOURS, workers=workers)
 
 @app.get("/notifications", response_model=List[Notification])
-async def get_notifications():
+@run_in_db_thread
+def get_notifications():
     """Tüm bildirimleri getir"""
     conn = get_db_connection()
     try:
         cursor = conn.execute("SELECT * FROM notifications ORDER BY date DESC")
         notifications = cursor.fetchall()
-        conn.close()
         
         return [dict(notification) for notification in notifications]
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.put("/notifications/{notification_id}/read")
-async def mark_notification_read(notification_id: str):
+@run_in_db_thread
+def mark_notification_read(notification_id: str):
     """Bildirimi okundu olarak işaretle"""
     conn = get_db_connection()
     try:
         conn.execute("UPDATE notifications SET read = 1 WHERE id = ?", (notification_id,))
         conn.commit()
-        conn.close()
+        response_cache.bump_tables("notifications")
         return {"message": "Bildirim okundu olarak işaretlendi"}
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.delete("/notifications/{notification_id}")
-async def delete_notification(notification_id: str):
+@run_in_db_thread
+def delete_notification(notification_id: str):
     """Bildirimi sil"""
     conn = get_db_connection()
     try:
         conn.execute("DELETE FROM notifications WHERE id = ?", (notification_id,))
         conn.commit()
-        conn.close()
+        response_cache.bump_tables("notifications")
         return {"message": "Bildirim silindi"}
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats():
-    """Dashboard istatistiklerini getir"""
+@run_in_db_thread
+def get_dashboard_stats():
+    """Dashboard istatistiklerini getir (tetikleyicilerle güncel tutulan counters tablosundan)"""
+    keys = {
+        "totalOrders": "orders.total",
+        "anomaliesDetected": "anomalies.total",
+        "lateShipments": "orders.late_shipments",
+        "cancelledOrders": "orders.status.cancelled",
+    }
     conn = get_db_connection()
     try:
-        # Toplam sipariş sayısını al
-        cursor = conn.execute("SELECT COUNT(*) as count FROM orders")
-        total_orders = cursor.fetchone()['count']
-        
-        # Tespit edilen anomali sayısını al
-        cursor = conn.execute("SELECT COUNT(*) as count FROM anomalies")
-        anomalies_detected = cursor.fetchone()['count']
-        
-        # Geç kargo sevkiyatlarını al
-        cursor = conn.execute("SELECT COUNT(*) as count FROM orders WHERE status = 'shipped' AND anomaly LIKE '%lateShipping%'")
-        late_shipments = cursor.fetchone()['count']
-        
-        # İptal edilen siparişleri al
-        cursor = conn.execute("SELECT COUNT(*) as count FROM orders WHERE status = 'cancelled'")
-        cancelled_orders = cursor.fetchone()['count']
+        cursor = conn.execute(
+            f"SELECT name, value FROM counters WHERE name IN ({', '.join('?' * len(keys))})",
+            list(keys.values())
+        )
+        counters = {row['name']: row['value'] for row in cursor.fetchall()}
         
-        conn.close()
-        
-        return {
-            "totalOrders": total_orders,
-            "anomaliesDetected": anomalies_detected,
-            "lateShipments": late_shipments,
-            "cancelledOrders": cancelled_orders
-        }
+        return {field: counters.get(name, 0) for field, name in keys.items()}
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.get("/dashboard/chart-data", response_model=List[ChartData])
-async def get_chart_data():
-    """Grafik verilerini getir"""
+@run_in_db_thread
+def get_chart_data(
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    granularity: str = Query("day", pattern="^(hour|day|week)$")
+):
+    """Grafik verilerini saatlik özet tablosundan getir (varsayılan: son 7 gün, günlük)"""
+    try:
+        end_day = datetime.strptime(date_to[:10], '%Y-%m-%d') if date_to else datetime.now()
+        start_day = datetime.strptime(date_from[:10], '%Y-%m-%d') if date_from else end_day - timedelta(days=6)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from/to YYYY-MM-DD biçiminde olmalı")
+    start_day = start_day.replace(hour=0, minute=0, second=0, microsecond=0)
+    end_day = end_day.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    if start_day >= end_day:
+        raise HTTPException(status_code=400, detail="from, to tarihinden sonra olamaz")
+    
+    # Grafikte gösterilecek kovalar (anahtar, etiket); boş kovalar 0 ile doldurulur
+    buckets = []
+    if granularity == "hour":
+        current, step = start_day, timedelta(hours=1)
+    elif granularity == "week":
+        current, step = start_day - timedelta(days=start_day.weekday()), timedelta(days=7)
+    else:
+        current, step = start_day, timedelta(days=1)
+    while current < end_day:
+        if granularity == "hour":
+            buckets.append((current.strftime('%Y-%m-%d %H:00:00'), f"{current.strftime('%b')} {current.day} {current.strftime('%H:00')}"))
+        else:
+            buckets.append((current.strftime('%Y-%m-%d'), current.strftime('%b %d').replace(' 0', ' ')))
+        if len(buckets) > MAX_CHART_BUCKETS:
+            raise HTTPException(status_code=400, detail=f"En fazla {MAX_CHART_BUCKETS} kova istenebilir")
+        current += step
+    
     conn = get_db_connection()
     try:
-        # Yerel zamanda 7 gün önceki tarihi hesapla
-        start_date = (datetime.now() - timedelta(days=6)).strftime('%Y-%m-%d')
-        
-        # Yerel tarihleri kullanarak son 7 günün sipariş ve anomali verilerini al
-        cursor = conn.execute("""
-            SELECT 
-                date,
-                COUNT(*) as orders
-            FROM orders 
-            WHERE date >= ?
-            GROUP BY date
-            ORDER BY date
-        """, (start_date,))
-        orders_data = cursor.fetchall()
-        
-        cursor = conn.execute("""
-            SELECT 
-                DATE(date) as date,
-                COUNT(*) as anomalies
-            FROM anomalies 
-            WHERE DATE(date) >= ?
-            GROUP BY DATE(date)
-            ORDER BY date
-        """, (start_date,))
-        anomalies_data = cursor.fetchall()
-        
-        conn.close()
-        
-        # Verileri birleştir
-        chart_data = []
-        orders_dict = {row['date']: row['orders'] for row in orders_data}
-        anomalies_dict = {row['date']: row['anomalies'] for row in anomalies_data}
-        
-        # Son 7 günü oluştur
-        for i in range(7):
-            date = (datetime.now() - timedelta(days=6-i)).strftime('%Y-%m-%d')
-            formatted_date = (datetime.now() - timedelta(days=6-i)).strftime('%b %d').replace(' 0', ' ')
-            chart_data.append({
-                "date": formatted_date,
-                "orders": orders_dict.get(date, 0),
-                "anomalies": anomalies_dict.get(date, 0)
-            })
-        
-        return chart_data
+        counts = fetch_buckets(
+            conn,
+            start_day.strftime('%Y-%m-%d %H:00:00'),
+            end_day.strftime('%Y-%m-%d %H:00:00'),
+            granularity
+        )
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+    
+    return [
+        {"date": label, "orders": counts.get(key, (0, 0))[0], "anomalies": counts.get(key, (0, 0))[1]}
+        for key, label in buckets
+    ]
 
 @app.get("/dashboard/anomaly-types", response_model=List[AnomalyTypeData])
-async def get_anomaly_types():
+@run_in_db_thread
+def get_anomaly_types():
     """Anomali türü verilerini getir"""
     conn = get_db_connection()
     try:
+        # anomalies.type.<tip> sayaçları tip adına göre sıralı gelir (eski GROUP BY type sırası)
         cursor = conn.execute("""
-            SELECT type, COUNT(*) as count
-            FROM anomalies
-            GROUP BY type
+            SELECT substr(name, length('anomalies.type.') + 1) as type, value as count
+            FROM counters
+            WHERE name > 'anomalies.type.' AND name < 'anomalies.type/' AND value > 0
+            ORDER BY name
         """)
         anomaly_types = cursor.fetchall()
-        conn.close()
         
         colors = ["#EF4444", "#F59E0B", "#F97316", "#8B5CF6"]
         result = []
@@ -396,17 +826,18 @@ async def get_anomaly_types():
         
         return result
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.get("/settings", response_model=Settings)
-async def get_settings():
+@run_in_db_thread
+def get_settings():
     """Ayarları getir"""
     conn = get_db_connection()
     try:
         cursor = conn.execute("SELECT * FROM settings WHERE id = 1")
         settings = cursor.fetchone()
-        conn.close()
         
         if settings:
             settings_dict = dict(settings)
@@ -427,12 +858,14 @@ async def get_settings():
                 }
             }
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.post("/settings")
-async def update_settings(settings: Settings):
-    """Ayarları güncelle"""
+@run_in_db_thread
+def update_settings(settings: Settings):
+    """Ayarları güncelle ve yeni eşiklerle arka planda anomali tespiti iste"""
     conn = get_db_connection()
     try:
         conn.execute("""
@@ -448,44 +881,95 @@ async def update_settings(settings: Settings):
             json.dumps(settings.notifications)
         ))
         conn.commit()
-        conn.close()
-        
-        # Yeni ayarlarla anomali tespitini tetikle
-        print(f"🔄 Ayarlar güncellendi - yeni eşik değerleriyle anomali tespiti tetikleniyor:")
-        print(f"   İptal Oranı: {settings.cancelRateThreshold}%")
-        print(f"   Geç Kargo: {settings.lateShippingThreshold} saat") 
-        print(f"   Stok Tükenmesi: {settings.stockOutThreshold} birim")
-        
-        try:
-            new_anomalies = trigger_detection_after_settings_update()
-            print(f" Güncellenmiş ayarlara göre {len(new_anomalies)} yeni anomali oluşturuldu")
-        except Exception as e:
-            print(f"Uyarı: Anomali tespiti başarısız: {str(e)}")
-        
-        return {"message": "Ayarlar başarıyla güncellendi", "anomalies_updated": True}
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+    response_cache.bump_tables("settings")
+    
+    # Tespit isteği beklemez; durum GET /anomalies/detect/{job_id} ile izlenir
+    print(f"🔄 Ayarlar güncellendi - yeni eşik değerleriyle anomali tespiti kuyruğa alındı:")
+    print(f"   İptal Oranı: {settings.cancelRateThreshold}%")
+    print(f"   Geç Kargo: {settings.lateShippingThreshold} saat") 
+    print(f"   Stok Tükenmesi: {settings.stockOutThreshold} birim")
+    job = detection_scheduler.request("settings")
+    
+    return {"message": "Ayarlar başarıyla güncellendi", "detection_job": job.to_dict()}
 
-@app.post("/anomalies/detect")
-async def trigger_anomaly_detection():
-    """Manuel olarak anomali tespitini tetikle"""
+@app.get("/system/cache")
+async def get_cache_stats():
+    """Yanıt önbelleği isabet/ıska istatistiklerini getir"""
+    return response_cache.stats()
+
+@app.get("/system/detection")
+async def get_detection_scheduler_stats():
+    """Arka plan tespit zamanlayıcısının durumunu getir"""
+    return detection_scheduler.stats()
+
+@app.get("/system/retention")
+@run_in_db_thread
+def get_retention_status():
+    """Saklama kuralları, arşiv boyutu ve son saklama turlarını getir"""
+    conn = get_db_connection()
     try:
-        from anomaly_detector import run_anomaly_detection
-        new_anomalies = run_anomaly_detection()
-        return {
-            "message": "Anomali tespiti tamamlandı",
-            "new_anomalies_count": len(new_anomalies),
-            "anomalies": new_anomalies
-        }
+        status = retention_status(conn)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Anomali tespiti başarısız: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+    status['scheduler'] = retention_scheduler.stats()
+    return status
+
+@app.post("/system/retention", status_code=202)
+async def trigger_retention(wait: bool = False):
+    """Saklama turunu kuyruğa al; wait=true ile bitene kadar beklenir"""
+    job = retention_scheduler.request("manual")
+    if wait:
+        await asyncio.to_thread(retention_scheduler.wait, job.id, DETECTION_WAIT_TIMEOUT_SECONDS)
+        if job.status == "failed":
+            raise HTTPException(status_code=500, detail=f"Saklama turu başarısız: {job.error}")
+    return JSONResponse(content=job.to_dict(), status_code=200 if job.done else 202)
+
+@app.get("/system/retention/{job_id}")
+async def get_retention_job(job_id: str):
+    """Saklama işinin durumunu getir"""
+    job = retention_scheduler.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Saklama işi bulunamadı")
+    return job.to_dict()
+
+@app.get("/system/db-pool")
+async def get_db_pool_stats():
+    """Bağlantı havuzu isabet ve bekleme süresi istatistiklerini getir"""
+    return get_pool().stats()
+
+@app.post("/anomalies/detect", status_code=202)
+async def trigger_anomaly_detection(wait: bool = False):
+    """Anomali tespitini kuyruğa al; bekleyen bir iş varsa onunla birleştirilir.
+
+    wait=true ile iş bitene kadar (en fazla DETECTION_WAIT_TIMEOUT_SECONDS) beklenir.
+    """
+    job = detection_scheduler.request("manual")
+    if wait:
+        await asyncio.to_thread(detection_scheduler.wait, job.id, DETECTION_WAIT_TIMEOUT_SECONDS)
+        if job.status == "failed":
+            raise HTTPException(status_code=500, detail=f"Anomali tespiti başarısız: {job.error}")
+    return JSONResponse(content=job.to_dict(), status_code=200 if job.done else 202)
+
+@app.get("/anomalies/detect/{job_id}")
+async def get_anomaly_detection_job(job_id: str):
+    """Tespit işinin durumunu getir"""
+    job = detection_scheduler.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tespit işi bulunamadı")
+    return job.to_dict()
 
 @app.get("/inventory")
-async def get_inventory():
+@run_in_db_thread
+def get_inventory():
     """Tüm envanter öğelerini getir"""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, product_name, current_stock, max_stock, min_stock, created_at, updated_at
@@ -493,17 +977,38 @@ async def get_inventory():
             ORDER BY product_name
         """)
         inventory = cursor.fetchall()
-        conn.close()
         
         return [dict(row) for row in inventory]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
+
+@app.get("/inventory/low-stock")
+@run_in_db_thread
+def get_low_stock_items(threshold: Optional[int] = Query(None, ge=0)):
+    """Düşük stoklu öğeleri getir (current_stock <= min_stock veya current_stock < threshold).
+
+    threshold verilmezse ayarlardaki stockOutThreshold kullanılır. Her öğe günlük satış hızı
+    (daily_velocity) ve tahmini tükenme günü (days_until_stockout) ile döner.
+    """
+    conn = get_db_connection()
+    try:
+        if threshold is None:
+            row = conn.execute("SELECT stockOutThreshold FROM settings WHERE id = 1").fetchone()
+            threshold = row[0] if row else 5
+        return fetch_low_stock(conn, threshold)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.get("/inventory/{product_name}")
-async def get_inventory_item(product_name: str):
+@run_in_db_thread
+def get_inventory_item(product_name: str):
     """Belirli bir ürün için envanter bilgisini getir"""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, product_name, current_stock, max_stock, min_stock, created_at, updated_at
@@ -511,20 +1016,24 @@ async def get_inventory_item(product_name: str):
             WHERE product_name = ?
         """, (product_name,))
         item = cursor.fetchone()
-        conn.close()
         
         if not item:
             raise HTTPException(status_code=404, detail="Ürün enventerde bulunamadı")
         
         return dict(item)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.put("/inventory/{product_name}")
-async def update_inventory(product_name: str, inventory_update: InventoryUpdate):
+@run_in_db_thread
+def update_inventory(product_name: str, inventory_update: InventoryUpdate):
     """Belirli bir ürün için envanteri güncelle"""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Ürünün var olup olmadığını kontrol et
@@ -536,48 +1045,36 @@ async def update_inventory(product_name: str, inventory_update: InventoryUpdate)
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         cursor.execute("""
             UPDATE inventory 
-            SET current_stock = ?, min_stock = ?, updated_at = ?
+            SET current_stock = ?, min_stock = COALESCE(?, min_stock), updated_at = ?
             WHERE product_name = ?
         """, (inventory_update.current_stock, inventory_update.min_stock, current_time, product_name))
         
         conn.commit()
-        conn.close()
+        response_cache.bump_tables("inventory")
         
-        return {"message": "Envanter başarıyla güncellendi"}
+        # Stok tükendi anomalisi envanterden hesaplandığından tespit yeniden kuyruğa alınır
+        job = detection_scheduler.request("inventory")
+        return {"message": "Envanter başarıyla güncellendi", "detection_job": job.to_dict()}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/inventory/low-stock")
-async def get_low_stock_items():
-    """Düşük stoklu öğeleri getir (current_stock <= min_stock)"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, product_name, current_stock, max_stock, min_stock, created_at, updated_at
-            FROM inventory
-            WHERE current_stock <= min_stock
-            ORDER BY (current_stock - min_stock) ASC
-        """)
-        low_stock_items = cursor.fetchall()
+    finally:
         conn.close()
-        
-        return [dict(row) for row in low_stock_items]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
 # Kullanıcı Kimlik Doğrulama Endpoint'leri
+
 @app.post("/auth/register")
-async def register_user(user_data: UserRegister):
+@run_in_db_thread
+def register_user(user_data: UserRegister):
     """Yeni kullanıcı kaydı"""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         # E-postanın zaten var olup olmadığını kontrol et
         cursor.execute("SELECT id FROM users WHERE email = ?", (user_data.email,))
         if cursor.fetchone():
-            conn.close()
             raise HTTPException(status_code=400, detail="E-posta zaten kayıtlı")
         
         # Yeni kullanıcı ekle
@@ -592,7 +1089,6 @@ async def register_user(user_data: UserRegister):
         # Oluşturulan kullanıcıyı al
         cursor.execute("SELECT id, username, email, created_at FROM users WHERE id = ?", (user_id,))
         user = cursor.fetchone()
-        conn.close()
         
         return {
             "message": "Kullanıcı başarıyla kaydedildi",
@@ -602,12 +1098,15 @@ async def register_user(user_data: UserRegister):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.post("/auth/login")
-async def login_user(login_data: UserLogin):
+@run_in_db_thread
+def login_user(login_data: UserLogin):
     """Kullanıcı giriş kimlik doğrulaması"""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Kullanıcı kimlik bilgilerini kontrol et
@@ -615,14 +1114,12 @@ async def login_user(login_data: UserLogin):
         user = cursor.fetchone()
         
         if not user or user['password'] != login_data.password:
-            conn.close()
             raise HTTPException(status_code=401, detail="Geçersiz kimlik bilgileri")
         
         # Son giriş tarihini güncelle
         cursor.execute("UPDATE users SET last_login = ? WHERE id = ?", 
                       (datetime.now().isoformat(), user['id']))
         conn.commit()
-        conn.close()
         
         return {
             "message": "Giriş başarılı",
@@ -636,18 +1133,20 @@ async def login_user(login_data: UserLogin):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.post("/auth/forgot-password")
-async def forgot_password(forgot_data: ForgotPassword):
+@run_in_db_thread
+def forgot_password(forgot_data: ForgotPassword):
     """Şifre sıfırlama talebini işle"""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         # E-postanın var olup olmadığını kontrol et
         cursor.execute("SELECT id FROM users WHERE email = ?", (forgot_data.email,))
         user = cursor.fetchone()
-        conn.close()
         
         if not user:
             raise HTTPException(status_code=404, detail="E-posta bulunamadı")
@@ -659,17 +1158,19 @@ async def forgot_password(forgot_data: ForgotPassword):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 @app.get("/users/me")
-async def get_current_user(email: str = Query(...)):
+@run_in_db_thread
+def get_current_user(email: str = Query(...)):
     """E-posta ile mevcut kullanıcı bilgisini al"""
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute("SELECT id, username, email, created_at, last_login FROM users WHERE email = ?", (email,))
         user = cursor.fetchone()
-        conn.close()
         
         if not user:
             raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
@@ -679,6 +1180,8 @@ async def get_current_user(email: str = Query(...)):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,309 @@
+"""
+Şema Migrasyonları
+PRAGMA user_version ile sürümlenen, sırayla ve bir kez uygulanan şema değişiklikleri
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+from anomaly_repository import add_source_columns
+from counters import create_counters
+from counters import create_orders_change_triggers as create_counters_change_triggers
+from counters import create_orders_insert_trigger as create_counters_insert_trigger
+from db_pool import DB_PATH
+from detector_aggregates import AGGREGATE_TABLES, add_customer_aggregates, create_detector_aggregates
+from detector_aggregates import create_change_log_triggers
+from detector_aggregates import create_update_trigger as create_change_log_update_trigger
+from order_store import (CONVERT_BATCH_SIZE, ORDER_ROWS_TABLE, copy_legacy_orders, create_order_rows,
+                         create_order_rows_indexes, create_orders_view, order_trigger_target)
+from partitions import create_partition_tables
+from rollups import add_cancelled_column, create_rollups
+from rollups import create_change_triggers as create_rollup_change_triggers
+from rollups import create_insert_trigger as create_rollup_insert_trigger
+from rollups import create_update_trigger as create_rollup_update_trigger
+from retention import create_retention_tables
+from statistical_detectors import create_model_store
+from stock_levels import create_low_stock_indexes
+
+
+def add_anomaly_threshold_columns(cursor):
+    """Eski veritabanlarındaki anomalies tablosuna eşik sütunlarını ekle"""
+    cursor.execute("PRAGMA table_info(anomalies)")
+    existing_columns = [col[1] for col in cursor.fetchall()]
+
+    for column_name, column_type in [
+        ('cancel_rate_threshold', 'INTEGER'),
+        ('late_shipping_threshold', 'INTEGER'),
+        ('stock_out_threshold', 'INTEGER')
+    ]:
+        if column_name not in existing_columns:
+            cursor.execute(f"ALTER TABLE anomalies ADD COLUMN {column_name} {column_type}")
+            print(f"✅ {column_name} sütunu anomalies tablosuna eklendi")
+
+
+def create_hot_path_indexes(cursor):
+    """Sık kullanılan sorgu yolları için ikincil indeksleri oluştur"""
+    # /orders: tarih sıralaması ve (date, id) cursor sayfalaması, zaman penceresi sorguları
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_date_id ON orders(date, id)")
+    # /orders?status=... ve geç kargo kontrolü (status IN (...) AND date <= ?)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_date_id ON orders(status, date, id)")
+    # İptal oranı: tarih penceresinde status sayımı (kapsayan indeks)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_date_status ON orders(date, status)")
+    # /anomalies tarih sıralaması
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_date ON anomalies(date)")
+    # Tip bazlı temizlik ve /dashboard/anomaly-types gruplaması
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_type_date ON anomalies(type, date)")
+    # /notifications tarih sıralaması
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_date ON notifications(date)")
+
+
+# Türkçe noktasız ı, unicode61 tokenizer'ı tarafından i'ye katlanmadığı için elle çevrilir.
+# Ş/ş, Ö/ö, Ç/ç, Ğ/ğ, Ü/ü ve İ ise remove_diacritics 2 ile zaten aksansız eşleşir.
+FTS_NORMALIZE_SQL = "replace({}, 'ı', 'i')"
+
+
+def normalize_search_text(text: str) -> str:
+    """Arama metnini orders_fts'e yazılan metinle aynı şekilde normalize et"""
+    return text.replace('ı', 'i')
+
+
+FTS_COLUMNS = ['id', 'customer', 'product']
+
+
+def _fts_values(columns) -> str:
+    return ', '.join(FTS_NORMALIZE_SQL.format(columns[c]) for c in FTS_COLUMNS)
+
+
+def create_orders_fts_insert_trigger(cursor, when: str = None):
+    """orders INSERT FTS tetikleyicisini oluştur; when verilirse sadece koşul sağlanınca çalışır"""
+    target = order_trigger_target(cursor)
+    guard = f" WHEN {when}" if when else ""
+    new_values = _fts_values(target.columns('new'))
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_ai AFTER INSERT ON {target.table}{guard} BEGIN
+            INSERT INTO orders_fts(rowid, id, customer, product) VALUES (new.rowid, {new_values});
+        END
+    """)
+
+
+def add_inserted_orders_to_fts(cursor, after_rowid: int):
+    """Tetikleyicisiz eklenmiş (rowid > after_rowid) siparişleri FTS indeksine tek sorguyla ekle"""
+    cursor.execute(f"""
+        INSERT INTO orders_fts(rowid, id, customer, product)
+        SELECT rowid, {', '.join(FTS_NORMALIZE_SQL.format(c) for c in FTS_COLUMNS)} FROM orders WHERE rowid > ?
+    """, (after_rowid,))
+
+
+def create_orders_fts(cursor):
+    """orders(id, customer, product) için tetikleyicilerle senkron tutulan FTS5 indeksi oluştur"""
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS orders_fts USING fts5(
+            id, customer, product,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    create_orders_fts_insert_trigger(cursor)
+    create_orders_fts_change_triggers(cursor)
+
+    # Mevcut siparişleri indekse yükle
+    cursor.execute("DELETE FROM orders_fts")
+    add_inserted_orders_to_fts(cursor, 0)
+
+
+def create_orders_fts_change_triggers(cursor, delete_when: str = None):
+    """orders DELETE ve id/müşteri/ürün UPDATE FTS tetikleyicilerini oluştur"""
+    target = order_trigger_target(cursor)
+    guard = f" WHEN {delete_when}" if delete_when else ""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_ad AFTER DELETE ON {target.table}{guard} BEGIN
+            DELETE FROM orders_fts WHERE rowid = old.rowid;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_au AFTER UPDATE OF {target.watched(FTS_COLUMNS)} ON {target.table} BEGIN
+            DELETE FROM orders_fts WHERE rowid = old.rowid;
+            INSERT INTO orders_fts(rowid, id, customer, product) VALUES (new.rowid, {_fts_values(target.columns('new'))});
+        END
+    """)
+
+
+# bulk_load tablosunda satır varken orders INSERT tetikleyicileri ve tarih UPDATE tetikleyicileri
+# çalışmaz. Satırı yalnızca toplu yükleme ve tarih kaydırması kendi işlemi içinde ekleyip commit'ten
+# önce siler; yazmalar seri olduğundan ve commit edilmemiş satır başka bağlantılara görünmediğinden
+# diğer yazıcıların tetikleyicileri etkilenmez.
+BULK_LOAD_GUARD = "NOT EXISTS (SELECT 1 FROM bulk_load)"
+
+
+def guard_orders_insert_triggers(cursor):
+    """orders INSERT tetikleyicilerini toplu yüklemede atlanabilecek şekilde yeniden oluştur"""
+    cursor.execute("CREATE TABLE IF NOT EXISTS bulk_load (active INTEGER PRIMARY KEY)")
+    for trigger in ('orders_fts_ai', 'counters_orders_ai', 'rollup_orders_ai'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    create_orders_fts_insert_trigger(cursor, BULK_LOAD_GUARD)
+    create_counters_insert_trigger(cursor, BULK_LOAD_GUARD)
+    create_rollup_insert_trigger(cursor, 'orders', BULK_LOAD_GUARD)
+
+
+def create_detector_change_log(cursor):
+    """Artımlı anomali tespiti için orders değişiklik günlüğünü ve gün/durum/ürün özetini oluştur"""
+    create_detector_aggregates(cursor, BULK_LOAD_GUARD)
+
+
+def add_grouped_detection(cursor):
+    """Ürün/müşteri bazlı anomaliler için kapsam sütunlarını ve müşteri özetini ekle.
+
+    scope ('product' | 'customer') ve subject (ürün adı / müşteri) tespit turları arasında
+    aynı grubun anomalisini tanımak için kullanılır; genel eşik anomalilerinde ikisi de NULL kalır.
+    """
+    cursor.execute("PRAGMA table_info(anomalies)")
+    existing_columns = [col[1] for col in cursor.fetchall()]
+    for column_name in ('scope', 'subject'):
+        if column_name not in existing_columns:
+            cursor.execute(f"ALTER TABLE anomalies ADD COLUMN {column_name} TEXT")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_anomalies_subject
+        ON anomalies(type, scope, subject) WHERE subject IS NOT NULL
+    """)
+    add_customer_aggregates(cursor, BULK_LOAD_GUARD)
+    # Grup geç kargo sorgusu: eski günlerin çoğu teslim edilmiş siparişlerden oluşur; kapsayan
+    # (status, day) indeksi sadece bekleyen/kargodaki satırları okur
+    for table, column in AGGREGATE_TABLES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_status_day ON {table}(status, day, {column}, orders)")
+
+
+def add_statistical_models(cursor):
+    """İstatistiksel modeller için saatlik iptal sayısını ve model durumu tablosunu ekle"""
+    add_cancelled_column(cursor, BULK_LOAD_GUARD)
+    create_model_store(cursor)
+
+
+def guard_date_update_triggers(cursor):
+    """Tarih değişikliğini izleyen UPDATE tetikleyicilerini toplu işlemlerde atlanabilecek şekilde yenile.
+
+    database.shift_dates tüm tarihleri tek UPDATE ile kaydırırken bulk_load satırı ekler; satır başına
+    özet/günlük yazmak yerine özet tabloları da kendisi küme tabanlı kaydırır.
+    """
+    for trigger in ('rollup_orders_au', 'rollup_anomalies_au', 'order_changes_au'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    create_rollup_update_trigger(cursor, 'orders', BULK_LOAD_GUARD)
+    create_rollup_update_trigger(cursor, 'anomalies', BULK_LOAD_GUARD)
+    create_change_log_update_trigger(cursor, BULK_LOAD_GUARD)
+
+
+def convert_orders_to_compact(cursor):
+    """orders tablosunu sıkıştırılmış order_rows tablosuna ve orders görünümüne dönüştür.
+
+    Satırlar rowid sırasıyla CONVERT_BATCH_SIZE'lık partiler halinde kopyalanır ve her parti ayrı
+    commit edilir; büyük bir veritabanında işlem günlüğü ve kilit süresi parti boyutuyla sınırlı kalır.
+    Bu, "tek işlemde migrasyon" kuralının tek istisnasıdır: süreç yarıda kesilirse user_version
+    artmadığından migrasyon yeniden çalışır ve kopyalama order_rows'taki son rowid'den devam eder.
+    Eski tablonun silinmesi, görünüm, indeksler ve tetikleyiciler son partiyle aynı işlemdedir.
+    rowid'ler korunduğundan orders_fts, sayaçlar, özetler ve model filigranları geçerli kalır.
+    """
+    conn = cursor.connection
+    create_order_rows(cursor)
+    copied = cursor.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {ORDER_ROWS_TABLE}").fetchone()[0]
+    while True:
+        batch_end = cursor.execute(
+            "SELECT MAX(rowid) FROM (SELECT rowid FROM orders WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+            (copied, CONVERT_BATCH_SIZE)
+        ).fetchone()[0]
+        if batch_end is None:
+            break
+        copy_legacy_orders(cursor, 'orders', copied, batch_end)
+        conn.commit()
+        cursor.execute("BEGIN")
+        copied = batch_end
+        print(f"   ↳ {copied} rowid'e kadar kopyalandı")
+
+    legacy_count = cursor.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    stored_count = cursor.execute(f"SELECT COUNT(*) FROM {ORDER_ROWS_TABLE}").fetchone()[0]
+    if legacy_count != stored_count:
+        raise sqlite3.IntegrityError(f"orders dönüştürülemedi: {legacy_count} satırdan {stored_count} kopyalandı")
+
+    # Eski tablonun indeksleri ve tetikleyicileri de silinir
+    cursor.execute("DROP TABLE orders")
+    create_orders_view(cursor)
+    create_order_rows_indexes(cursor)
+
+    create_orders_fts_insert_trigger(cursor, BULK_LOAD_GUARD)
+    create_orders_fts_change_triggers(cursor)
+    create_counters_insert_trigger(cursor, BULK_LOAD_GUARD)
+    create_counters_change_triggers(cursor)
+    create_rollup_insert_trigger(cursor, 'orders', BULK_LOAD_GUARD)
+    create_rollup_change_triggers(cursor, 'orders', BULK_LOAD_GUARD)
+    create_change_log_triggers(cursor, BULK_LOAD_GUARD)
+    create_change_log_update_trigger(cursor, BULK_LOAD_GUARD)
+
+
+def add_order_partitions(cursor):
+    """Aylık sipariş dosyaları kaydını ekle ve orders DELETE tetikleyicilerini atlanabilir yap.
+
+    Mühürleme (partitions.seal_month) satırları ana tablodan bulk_load altında siler; FTS kayıtları,
+    sayaçlar, saatlik özetler ve tespit özetleri mühürlenen siparişleri saymaya devam eder.
+    """
+    create_partition_tables(cursor)
+    for trigger in ('orders_fts_ad', 'counters_orders_ad', 'rollup_orders_ad', 'order_changes_ad'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    create_orders_fts_change_triggers(cursor, BULK_LOAD_GUARD)
+    create_counters_change_triggers(cursor, BULK_LOAD_GUARD)
+    create_rollup_change_triggers(cursor, 'orders', BULK_LOAD_GUARD, BULK_LOAD_GUARD)
+    create_change_log_triggers(cursor, BULK_LOAD_GUARD, BULK_LOAD_GUARD)
+
+
+# (sürüm, açıklama, fonksiyon) - yeni migrasyonlar sadece listenin sonuna eklenir
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "anomalies eşik sütunları", add_anomaly_threshold_columns),
+    (2, "sıcak sorgu yolları için indeksler", create_hot_path_indexes),
+    (3, "orders için FTS5 arama indeksi", create_orders_fts),
+    (4, "dashboard sayaç tablosu ve tetikleyicileri", create_counters),
+    (5, "saatlik sipariş/anomali özet tablosu", create_rollups),
+    (6, "toplu yükleme için koşullu orders INSERT tetikleyicileri", guard_orders_insert_triggers),
+    (7, "artımlı anomali tespiti için değişiklik günlüğü ve özet", create_detector_change_log),
+    (8, "ürün/müşteri bazlı anomali kapsamı ve müşteri özeti", add_grouped_detection),
+    (9, "envanter düşük stok indeksleri", create_low_stock_indexes),
+    (10, "istatistiksel modeller: saatlik iptal sayısı ve model durumları", add_statistical_models),
+    (11, "anomalies kaynak (source) ve tespit turu (run_id) sütunları", add_source_columns),
+    (12, "saklama kuralları, sıkıştırılmış arşiv ve saklama turu kayıtları", create_retention_tables),
+    (13, "tarih kaydırması için koşullu UPDATE tetikleyicileri", guard_date_update_triggers),
+    (14, "sıkıştırılmış sipariş depolaması: epoch zaman damgası ve sözlük tabloları", convert_orders_to_compact),
+    (15, "aylık sipariş dosyaları (partition) kaydı ve atlanabilir DELETE tetikleyicileri", add_order_partitions),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn) -> int:
+    """Bekleyen migrasyonları sırayla uygula; uygulanan migrasyon sayısını döndür"""
+    current_version = get_schema_version(conn)
+    applied = 0
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current_version:
+            continue
+        cursor = conn.cursor()
+        try:
+            # DDL dahil tüm migrasyon tek işlemde uygulanır (14 hariç: partiler halinde commit eder)
+            if not conn.in_transaction:
+                cursor.execute("BEGIN")
+            migrate(cursor)
+            # PRAGMA parametre kabul etmez; sürüm listeden geldiği için güvenli
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        print(f"🔧 Migrasyon {version} uygulandı: {description}")
+        applied += 1
+
+    return applied
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    applied = apply_migrations(conn)
+    print(f"Şema sürümü: {get_schema_version(conn)} ({applied} migrasyon uygulandı)")
+    conn.close()
@@ -0,0 +1,244 @@
+"""
+Sıkıştırılmış Sipariş Depolaması
+Siparişler order_rows tablosunda tamsayı sütunlarla tutulur:
+- ts: tarihin epoch saniyesi (UTC); aralık sorguları ve sıralama metin karşılaştırması yerine tamsayıyla yapılır
+- date_format: tarihin yazıldığı biçim (DATE_FORMATS sırası); tarih okunurken aynı metne geri çevrilir.
+  Bu biçimlere uymayan tarihler date_text'te olduğu gibi saklanır
+- customer_id, product_id, status_id, anomaly_id: customers, products, order_statuses ve anomaly_types
+  sözlük tablolarına yabancı anahtar; her ürün ve müşteri adı bir kez yazılır
+
+orders artık aynı sütunları (ve filtre/sıralama için ts'yi) döndüren bir görünümdür; INSTEAD OF
+tetikleyicileri görünüme yapılan INSERT/UPDATE/DELETE'leri order_rows'a çevirir. Sayaç, özet, FTS ve
+değişiklik günlüğü tetikleyicileri order_rows üzerindedir ve sütunları TriggerTarget ile çözer;
+böylece eski migrasyonlar eski orders tablosunda, sonrakiler sıkıştırılmış tabloda aynı kodla çalışır.
+"""
+from typing import Dict, Iterable
+
+ORDER_ROWS_TABLE = 'order_rows'
+
+# Tarih biçimleri; date_format bu listedeki sıradır
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%d %H:%M:%S')
+
+# Görünüm sütunu → sözlük tablosu; order_rows'taki anahtar sütunu '<sütun>_id'
+DICTIONARY_TABLES = {
+    'customer': 'customers',
+    'product': 'products',
+    'status': 'order_statuses',
+    'anomaly': 'anomaly_types',
+}
+
+# Sabit kodlu bilinen değerler (sırası kod); API'den gelen yeni değerler sözlüğe sonradan eklenir
+KNOWN_VALUES = {
+    'status': ('pending', 'shipped', 'delivered', 'cancelled'),
+    'anomaly': ('anomaly.highCancelRate', 'anomaly.stockOut', 'anomaly.lateShipping', 'anomaly.priceAnomaly'),
+}
+
+# Görünüm sütunu değişince güncellenen order_rows sütunları (UPDATE OF listeleri için)
+STORED_COLUMNS = {
+    'date': ('ts', 'date_format', 'date_text'),
+    **{column: (f'{column}_id',) for column in DICTIONARY_TABLES},
+}
+
+# /orders: ts sıralaması ve (ts, id) cursor sayfalaması; status filtresi ve geç kargo / iptal atfı
+ORDER_ROWS_INDEXES = {
+    'idx_order_rows_ts_id': 'ts, id',
+    'idx_order_rows_status_ts_id': 'status_id, ts, id',
+}
+
+DAY_SECONDS = 24 * 3600
+
+# Eski tablodan parti başına kopyalanan satır sayısı
+CONVERT_BATCH_SIZE = 50000
+
+
+def stored_date_sql(row: str, shift_days: int = 0) -> str:
+    """order_rows satırının tarihini yazıldığı metne geri çeviren ifade.
+
+    shift_days: satırın saklandığından bu yana kaydırılan gün sayısı (mühürlenmiş ay dosyaları)
+    """
+    formats = " ".join(f"WHEN {code} THEN '{pattern}'" for code, pattern in enumerate(DATE_FORMATS) if code)
+    text, ts = f"{row}.date_text", f"{row}.ts"
+    if shift_days:
+        text = f"COALESCE(date(substr({text}, 1, 10), '{shift_days:+d} days') || substr({text}, 11), {text})"
+        ts = f"({ts} + {shift_days * DAY_SECONDS})"
+    return f"COALESCE({text}, strftime(CASE {row}.date_format {formats} ELSE '{DATE_FORMATS[0]}' END, {ts}, 'unixepoch'))"
+
+
+def date_format_sql(value: str) -> str:
+    """Tarih metninin DATE_FORMATS içindeki kodu; metin epoch'tan aynen geri üretilemiyorsa NULL"""
+    cases = " ".join(f"WHEN strftime('{pattern}', unixepoch({value}), 'unixepoch') = {value} THEN {code}"
+                     for code, pattern in enumerate(DATE_FORMATS))
+    return f"CASE {cases} END"
+
+
+def _lookup_sql(column: str, value: str) -> str:
+    return f"(SELECT id FROM {DICTIONARY_TABLES[column]} WHERE name = {value})"
+
+
+class RowColumns(dict):
+    """Sütun adı → new/old satırındaki SQL ifadesi; tanımsız sütunlar '<satır>.<sütun>' olarak çözülür.
+
+    Tetikleyici şablonları bununla format_map edilir (ör. "{status} = 'cancelled'").
+    """
+
+    def __init__(self, row: str, expressions: Dict[str, str] = None):
+        super().__init__(expressions or {})
+        self.row = row
+
+    def __missing__(self, column: str) -> str:
+        return f"{self.row}.{column}"
+
+
+class TriggerTarget:
+    """Tetikleyicinin bağlanacağı tablo ve görünüm sütunlarının new/old satırındaki karşılıkları"""
+
+    def __init__(self, table: str, compact: bool = False):
+        self.compact = compact
+        self.table = ORDER_ROWS_TABLE if compact else table
+
+    def columns(self, row: str) -> RowColumns:
+        if not self.compact:
+            return RowColumns(row)
+        expressions = {'date': stored_date_sql(row)}
+        expressions.update({column: f"(SELECT name FROM {table} WHERE id = {row}.{column}_id)"
+                            for column, table in DICTIONARY_TABLES.items()})
+        return RowColumns(row, expressions)
+
+    def watched(self, columns: Iterable[str]) -> str:
+        """UPDATE OF listesi: görünüm sütunlarının saklandığı tablo sütunları"""
+        if not self.compact:
+            return ', '.join(columns)
+        return ', '.join(stored for column in columns for stored in STORED_COLUMNS.get(column, (column,)))
+
+
+def order_trigger_target(cursor) -> TriggerTarget:
+    """orders görünüm ise sipariş tetikleyicileri order_rows'a, eski şemada orders tablosuna bağlanır"""
+    row = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'orders'").fetchone()
+    return TriggerTarget('orders', compact=row is not None and row[0] == 'view')
+
+
+def create_order_rows(cursor):
+    """Sözlük tablolarını (bilinen durum ve anomali tipleri sabit kodlarla) ve order_rows'u oluştur"""
+    for table in DICTIONARY_TABLES.values():
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    for column, values in KNOWN_VALUES.items():
+        cursor.executemany(f"INSERT OR IGNORE INTO {DICTIONARY_TABLES[column]}(id, name) VALUES (?, ?)",
+                           list(enumerate(values, start=1)))
+    # Açık INTEGER PRIMARY KEY: VACUUM rowid'leri değiştirmez (orders_fts ve model filigranları rowid'e bağlı)
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {order_rows_sql(ORDER_ROWS_TABLE)}")
+
+
+def order_rows_sql(table: str, references: bool = True) -> str:
+    """order_rows tanımı; mühürlenmiş ay dosyaları sözlük tabloları ana veritabanında kaldığından
+    references=False ile yabancı anahtarsız oluşturulur"""
+    def key(column: str, null: str = " NOT NULL") -> str:
+        target = f" REFERENCES {DICTIONARY_TABLES[column]}(id)" if references else ""
+        return f"{column}_id INTEGER{null}{target}"
+
+    return f"""{table} (
+            rowid INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            ts INTEGER,
+            date_format INTEGER,
+            date_text TEXT,
+            {key('customer')},
+            {key('product')},
+            amount REAL NOT NULL,
+            {key('status')},
+            {key('anomaly', '')},
+            severity TEXT,
+            CHECK (date_format IS NOT NULL OR date_text IS NOT NULL)
+        )"""
+
+
+def create_order_rows_indexes(cursor):
+    for name, columns in ORDER_ROWS_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {ORDER_ROWS_TABLE}({columns})")
+
+
+def orders_select_sql(table: str = ORDER_ROWS_TABLE, shift_days: int = 0) -> str:
+    """orders görünümünün sorgusu; table bağlanmış bir ay dosyasının order_rows'u da olabilir
+    (sözlük tabloları nitelendirilmediği için ana veritabanından okunur)"""
+    ts = f"r.ts + {shift_days * DAY_SECONDS}" if shift_days else "r.ts"
+    return f"""
+        SELECT r.rowid AS rowid, r.id AS id, {stored_date_sql('r', shift_days)} AS date, c.name AS customer,
+               p.name AS product, r.amount AS amount, s.name AS status, a.name AS anomaly,
+               r.severity AS severity, {ts} AS ts
+        FROM {table} r
+        JOIN customers c ON c.id = r.customer_id
+        JOIN products p ON p.id = r.product_id
+        JOIN order_statuses s ON s.id = r.status_id
+        LEFT JOIN anomaly_types a ON a.id = r.anomaly_id
+    """
+
+
+def insert_order_rows(cursor, source: str, params=(), keep_rowid: bool = False):
+    """source sorgusunun siparişlerini (rowid ve orders görünümünün sütunları) order_rows'a küme tabanlı yaz.
+
+    Yeni adlar önce sözlük tablolarına eklenir. keep_rowid ile kaynağın rowid'leri korunur; aksi halde
+    satırlar kaynağın rowid sırasıyla yeni rowid alır. Satır başı INSTEAD OF tetikleyicisinden çok daha hızlıdır.
+    """
+    for column, table in DICTIONARY_TABLES.items():
+        cursor.execute(f"INSERT OR IGNORE INTO {table}(name) SELECT DISTINCT {column} FROM ({source}) "
+                       f"WHERE {column} IS NOT NULL", params)
+    cursor.execute(f"""
+        INSERT INTO {ORDER_ROWS_TABLE}(rowid, id, ts, date_format, date_text, customer_id, product_id,
+                                       amount, status_id, anomaly_id, severity)
+        SELECT {'o.rowid' if keep_rowid else 'NULL'}, o.id, unixepoch(o.date), o.format,
+               CASE WHEN o.format IS NULL THEN o.date END, c.id, p.id, o.amount, s.id, a.id, o.severity
+        FROM (SELECT *, {date_format_sql('date')} AS format FROM ({source})) o
+        JOIN customers c ON c.name = o.customer
+        JOIN products p ON p.name = o.product
+        JOIN order_statuses s ON s.name = o.status
+        LEFT JOIN anomaly_types a ON a.name = o.anomaly
+        ORDER BY o.rowid
+    """, params)
+
+
+def copy_legacy_orders(cursor, legacy: str, after_rowid: int, last_rowid: int):
+    """Eski tablonun (after_rowid, last_rowid] aralığındaki satırlarını rowid'leri korunarak kopyala"""
+    insert_order_rows(cursor, f"SELECT rowid, * FROM {legacy} WHERE rowid > ? AND rowid <= ?",
+                      (after_rowid, last_rowid), keep_rowid=True)
+
+
+def create_orders_view(cursor):
+    """orders görünümünü ve yazmaları order_rows'a çeviren INSTEAD OF tetikleyicilerini oluştur"""
+    cursor.execute(f"CREATE VIEW IF NOT EXISTS orders AS {orders_select_sql()}")
+
+    def add_names(row: str) -> str:
+        return "\n".join(f"INSERT OR IGNORE INTO {table}(name) SELECT {row}.{column} WHERE {row}.{column} IS NOT NULL;"
+                         for column, table in DICTIONARY_TABLES.items())
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_view_ii INSTEAD OF INSERT ON orders BEGIN
+            {add_names('new')}
+            INSERT INTO {ORDER_ROWS_TABLE}(rowid, id, ts, date_format, date_text, customer_id, product_id,
+                                           amount, status_id, anomaly_id, severity)
+            SELECT new.rowid, new.id, unixepoch(new.date), f.format, CASE WHEN f.format IS NULL THEN new.date END,
+                   {_lookup_sql('customer', 'new.customer')}, {_lookup_sql('product', 'new.product')},
+                   new.amount, {_lookup_sql('status', 'new.status')}, {_lookup_sql('anomaly', 'new.anomaly')},
+                   new.severity
+            FROM (SELECT {date_format_sql('new.date')} AS format) f;
+        END
+    """)
+    # Sadece değişen sütunlar yazılır; order_rows'taki UPDATE OF tetikleyicileri gereksiz yere çalışmaz
+    updates = [
+        f"""UPDATE {ORDER_ROWS_TABLE} SET ts = unixepoch(new.date), date_format = {date_format_sql('new.date')},
+                   date_text = CASE WHEN ({date_format_sql('new.date')}) IS NULL THEN new.date END
+            WHERE rowid = old.rowid AND new.date IS NOT old.date;""",
+        *(f"UPDATE {ORDER_ROWS_TABLE} SET {column}_id = {_lookup_sql(column, f'new.{column}')} "
+          f"WHERE rowid = old.rowid AND new.{column} IS NOT old.{column};" for column in DICTIONARY_TABLES),
+        *(f"UPDATE {ORDER_ROWS_TABLE} SET {column} = new.{column} WHERE rowid = old.rowid AND new.{column} IS NOT old.{column};"
+          for column in ('id', 'amount', 'severity')),
+    ]
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_view_iu INSTEAD OF UPDATE ON orders BEGIN
+            {add_names('new')}
+            {chr(10).join(updates)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orders_view_id INSTEAD OF DELETE ON orders BEGIN
+            DELETE FROM {ORDER_ROWS_TABLE} WHERE rowid = old.rowid;
+        END
+    """)
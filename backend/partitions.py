@@ -0,0 +1,438 @@
+"""
+Aylık Sipariş Bölümleri (Partition)
+Sıcak pencerenin (içinde bulunulan ve önceki ay) dışında kalan aylar ana veritabanının yanındaki
+partitions/ dizininde ay başına ayrı bir SQLite dosyasına (orders_YYYY_MM.db) mühürlenir. Dosyalar
+order_rows ile aynı sütunları ve indeksleri taşır; sözlük tabloları ana veritabanında kalır.
+Mühürlenen ay bir daha yazılmaz: dosya salt okunur yapılır ve okurken değişmez (immutable) ve bellek
+eşlemeli olarak ATTACH edilir. Ana veritabanı, yedekleri ve VACUUM sadece sıcak ayları taşır.
+
+- order_partitions: ay, dosya, satır sayısı, [start_ts, end_ts) aralığı ve mühürlemeden sonra
+  kaydırılan gün sayısı (shift_days; tarih kaydırması dosyaya dokunmaz, okurken uygulanır)
+- sealed_order_ids: mühürlenen sipariş numaraları; order_rows'un UNIQUE(id) kısıtı ay dosyalarını
+  görmediğinden aynı numaranın yeniden eklenmesini tetikleyici engeller
+- FTS indeksi, sayaçlar, saatlik özetler ve tespit özetleri mühürlenen siparişleri saymaya devam eder
+  (satırlar ana tablodan bulk_load altında silinir)
+- Bir ay mühürlendikten sonra gelen o aya ait siparişler sıcak tabloda kalır; sorgular ikisini birleştirir
+
+Yönlendirme: routed_rows /orders ve /orders/export sorgusunu sadece tarih aralığı (ve cursor) ile
+kesişen aylara gönderir ve sıcak tabloyla UNION ALL birleştirir. Aylar çakışmadığından sorgu zaman
+dilimlerine bölünür: her dilim tek bir ay dosyası ve sıcak tablonun o dilimdeki satırlarıdır. Dilimler
+yeniden eskiye sırayla okunur, istenen satır sayısına ulaşınca durulur. Skora göre sıralamada aylar
+MAX_ATTACHED_PARTITIONS'lık gruplar halinde bağlanır (SQLite bir bağlantıya en fazla 10 veritabanı
+bağlar). Birden çok sorguya bölünen aramalarda FTS eşleşmeleri geçici tabloya bir kez yazılır.
+
+Kullanım (backend dizininden):
+    python partitions.py            # mühürlenmiş ayları listele
+    python partitions.py --seal     # sıcak pencere dışındaki ayları mühürle
+"""
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from db_pool import DB_PATH
+from order_store import ORDER_ROWS_INDEXES, ORDER_ROWS_TABLE, order_rows_sql, orders_select_sql
+
+PARTITION_DIR_NAME = 'partitions'
+
+# Mühürlenmeyen son ay sayısı (içinde bulunulan ay dahil)
+PARTITION_KEEP_MONTHS = 2
+
+# Bir bağlantıya aynı anda bağlanan en fazla ay dosyası (SQLITE_MAX_ATTACHED varsayılanı 10)
+MAX_ATTACHED_PARTITIONS = 8
+
+# Dilim sorgularından bir seferde okunan satır sayısı
+ROUTED_BATCH_SIZE = 1000
+
+# Ay dosyalarının bellek eşlemeli okuma sınırı (db_pool.PRAGMAS ile aynı)
+PARTITION_MMAP_SIZE = 268435456
+
+
+class Partition(NamedTuple):
+    month: str
+    file: str
+    shift_days: int
+    start_ts: int
+    end_ts: int
+
+
+def create_partition_tables(cursor):
+    """Ay dosyası kaydını, mühürlenen sipariş numaralarını ve tekrar ekleme tetikleyicisini oluştur"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_partitions (
+            month TEXT PRIMARY KEY,
+            file TEXT NOT NULL,
+            orders INTEGER NOT NULL,
+            start_ts INTEGER NOT NULL,
+            end_ts INTEGER NOT NULL,
+            shift_days INTEGER NOT NULL DEFAULT 0,
+            sealed_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE TABLE IF NOT EXISTS sealed_order_ids (id TEXT PRIMARY KEY) WITHOUT ROWID")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS order_rows_sealed_bi BEFORE INSERT ON {ORDER_ROWS_TABLE}
+        WHEN EXISTS (SELECT 1 FROM sealed_order_ids WHERE id = new.id) BEGIN
+            SELECT RAISE(ABORT, 'UNIQUE constraint failed: orders.id');
+        END
+    """)
+
+
+def _main_file(conn) -> str:
+    return next(row[2] for row in conn.execute("PRAGMA database_list").fetchall() if row[1] == 'main')
+
+
+def partition_dir(conn) -> Path:
+    """Ay dosyalarının dizini: ana veritabanının yanındaki partitions/"""
+    return Path(_main_file(conn)).resolve().parent / PARTITION_DIR_NAME
+
+
+def _schema(month: str) -> str:
+    return f"orders_{month.replace('-', '_')}"
+
+
+def _remove(path: Path):
+    if path.exists():
+        os.chmod(path, 0o644)
+        path.unlink()
+
+
+def _has_registry(conn) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'order_partitions'").fetchone() is not None
+
+
+def order_partitions(conn, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     before: Optional[str] = None) -> List[Partition]:
+    """[date_from, date_to] aralığıyla (ve cursor tarihinden öncesiyle) kesişen aylar, en yeniden eskiye"""
+    cursor = conn.execute("""
+        SELECT month, file, shift_days, start_ts, end_ts FROM order_partitions
+        WHERE (:date_from IS NULL OR end_ts > unixepoch(:date_from))
+          AND (:date_to IS NULL OR start_ts <= unixepoch(:date_to))
+          AND (:before IS NULL OR start_ts <= unixepoch(:before))
+        ORDER BY start_ts DESC
+    """, {'date_from': date_from, 'date_to': date_to, 'before': before})
+    return [Partition(*row) for row in cursor.fetchall()]
+
+
+@contextmanager
+def attached_partitions(conn, partitions: Sequence[Partition]) -> Iterator[List[str]]:
+    """Ay dosyalarını salt okunur ve bellek eşlemeli bağla; şema adlarını ver, çıkışta ayır.
+
+    Bağlantı açık bir işlem içinde olmamalı (SQLite işlem içinde ATTACH/DETACH'a izin vermez) ve
+    çıkışta bağlı şemaları okuyan açık bir imleç kalmamalı.
+    """
+    directory = partition_dir(conn)
+    attached = []
+    try:
+        for partition in partitions:
+            schema = _schema(partition.month)
+            conn.execute(f"ATTACH DATABASE ? AS {schema}",
+                         (f"{(directory / partition.file).as_uri()}?mode=ro&immutable=1",))
+            attached.append(schema)
+            conn.execute(f"PRAGMA {schema}.mmap_size = {PARTITION_MMAP_SIZE}")
+        yield attached
+    finally:
+        for schema in attached:
+            conn.execute(f"DETACH DATABASE {schema}")
+
+
+def _partition_source(schema: str, partition: Partition) -> str:
+    return f"({orders_select_sql(f'{schema}.{ORDER_ROWS_TABLE}', partition.shift_days)})"
+
+
+def _compound(arms: List[Tuple[str, Sequence]], order_by: str, limit: Optional[int],
+              search: Tuple[str, Sequence] = ("", ())) -> Tuple[str, List]:
+    query = search[0] + " UNION ALL ".join(sql for sql, _ in arms) + f" ORDER BY {order_by}"
+    params = [*search[1], *(param for _, arm_params in arms for param in arm_params)]
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+
+def _search_sql(ranked: bool) -> str:
+    rank = ", bm25(orders_fts)" if ranked else ""
+    return f"SELECT rowid{rank} FROM orders_fts WHERE orders_fts MATCH ?"
+
+
+def routed_rows(conn, template: str, params: Sequence, limit: Optional[int] = None, ranked: bool = False,
+                date_from: Optional[str] = None, date_to: Optional[str] = None,
+                before: Optional[str] = None, match: Optional[str] = None) -> Iterator[sqlite3.Row]:
+    """Sipariş sorgusunu sıcak tabloya ve ilgili ay dosyalarına gönder; satırları sıralı döndür.
+
+    template "SELECT ..., o.ts AS sort_ts FROM {source} o ... WHERE ..." biçimindedir (ORDER BY ve
+    LIMIT'siz, WHERE en sonda; id seçilmeli). Satırlar sort_ts ve id'ye göre azalan sıradadır.
+    match verilirse orders_fts eşleşmeleri (rowid ve ranked ile bm25 skoru rank) bir kez hesaplanıp
+    order_search adıyla sorgulara sunulur; ranked ile template rank'i seçer ve satırlar önce rank'e
+    göre sıralanır. date_from, date_to ve before (cursor tarihi) sadece ay dosyalarını elemek için
+    kullanılır; satır koşulları template'in içindedir. Dönen imleç/üreteç kapatılınca bağlı aylar ayrılır.
+    """
+    order_by = "rank, sort_ts DESC, id DESC" if ranked else "sort_ts DESC, id DESC"
+    partitions = order_partitions(conn, date_from, date_to, before)
+    if not partitions:
+        columns = "(rowid, rank)" if ranked else "(rowid)"
+        search = (f"WITH order_search{columns} AS MATERIALIZED ({_search_sql(ranked)}) ", (match,)) if match else ("", ())
+        return conn.execute(*_compound([(template.format(source='orders'), params)], order_by, limit, search))
+    rows = _ranked_rows if ranked else _segment_rows
+    return _searched(conn, match, ranked, rows(conn, template, params, order_by, limit, partitions))
+
+
+def _searched(conn, match: Optional[str], ranked: bool, rows: Iterator[sqlite3.Row]) -> Iterator[sqlite3.Row]:
+    """Birden çok sorguya bölünen aramada eşleşmeleri geçici tabloya bir kez yaz"""
+    if match is None:
+        yield from rows
+        return
+    conn.execute("DROP TABLE IF EXISTS temp.order_search")
+    conn.execute("CREATE TEMP TABLE order_search (rowid INTEGER PRIMARY KEY, rank REAL)")
+    try:
+        conn.execute(f"INSERT INTO temp.order_search(rowid{', rank' if ranked else ''}) {_search_sql(ranked)}",
+                     (match,))
+        # Sadece geçici tabloya yazan örtük işlem; açık işlem varken ATTACH yapılamaz
+        conn.commit()
+        yield from rows
+    finally:
+        rows.close()
+        conn.execute("DROP TABLE IF EXISTS temp.order_search")
+
+
+def _ranked_rows(conn, template: str, params: Sequence, order_by: str, limit: Optional[int],
+                 partitions: List[Partition]) -> Iterator[sqlite3.Row]:
+    # Skor sırası zamana bağlı değil: aylar MAX_ATTACHED_PARTITIONS'lık gruplar halinde bağlanır,
+    # her grubun en iyi limit satırı alınıp birleştirilir
+    rows = []
+    for start in range(0, len(partitions), MAX_ATTACHED_PARTITIONS):
+        group = partitions[start:start + MAX_ATTACHED_PARTITIONS]
+        with attached_partitions(conn, group) as schemas:
+            arms = [(template.format(source=_partition_source(schema, partition)), params)
+                    for schema, partition in zip(schemas, group)]
+            if start == 0:
+                arms.insert(0, (template.format(source='orders'), params))
+            rows.extend(conn.execute(*_compound(arms, order_by, limit)).fetchall())
+    rows.sort(key=lambda row: row['id'], reverse=True)
+    rows.sort(key=lambda row: (row['rank'], row['sort_ts'] is None, -(row['sort_ts'] or 0)))
+    yield from rows[:limit] if limit else rows
+
+
+def _segment_rows(conn, template: str, params: Sequence, order_by: str, limit: Optional[int],
+                  partitions: List[Partition]) -> Iterator[sqlite3.Row]:
+    # Aylar birbiriyle çakışmadığından zaman dilimlere bölünür: en yeni ayın sonrası sadece sıcak
+    # tablodan, sonra her ay kendi dosyası ve sıcak tablonun [bir eski ayın sonu, ayın sonu)
+    # aralığındaki satırlarıyla okunur. Dilimler yeniden eskiye sırayla okunur ve limit dolunca
+    # durulur; ilk sayfalar çoğu zaman hiçbir ay dosyasını bağlamaz. Tarihi ayrıştırılamayan
+    # (ts NULL) siparişler sadece sıcak tabloda olur ve en sona sıralanır
+    segments = [(None, None, partitions[0].end_ts)]
+    segments += [(partition, partition.end_ts, partitions[index + 1].end_ts if index + 1 < len(partitions) else None)
+                 for index, partition in enumerate(partitions)]
+    produced = 0
+    for partition, newer, older in segments:
+        hot, hot_params = template.format(source='orders'), list(params)
+        if newer is not None:
+            hot += " AND (o.ts < ? OR o.ts IS NULL)" if older is None else " AND o.ts < ?"
+            hot_params.append(newer)
+        if older is not None:
+            hot += " AND o.ts >= ?"
+            hot_params.append(older)
+        with attached_partitions(conn, [partition] if partition else []) as schemas:
+            arms = [(hot, hot_params)] + [(template.format(source=_partition_source(schema, partition)), params)
+                                          for schema in schemas]
+            cursor = conn.execute(*_compound(arms, order_by, limit - produced if limit else None))
+            try:
+                while True:
+                    batch = cursor.fetchmany(ROUTED_BATCH_SIZE)
+                    if not batch:
+                        break
+                    produced += len(batch)
+                    yield from batch
+            finally:
+                cursor.close()
+        if limit and produced >= limit:
+            return
+
+
+def _registered(conn) -> List[Partition]:
+    return order_partitions(conn) if _has_registry(conn) else []
+
+
+def _reader(conn) -> sqlite3.Connection:
+    return sqlite3.connect(f"{Path(_main_file(conn)).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def each_order_source(cursor) -> Iterator[Tuple[sqlite3.Cursor, str]]:
+    """orders görünümü ve mühürlenmiş aylar için (imleç, FROM kaynağı) çiftleri.
+
+    Sayaç, özet ve tespit özeti hesaplamaları içindir: aylar ana veritabanının salt okunur ikinci
+    bir bağlantısına sırayla bağlanır, böylece cursor açık bir işlemin içinde de olabilir. Kaynak
+    görünüm sütunlarını döndürür ve takma adla kullanılır (FROM {kaynak} AS orders).
+    """
+    yield cursor, 'orders'
+    yield from ((reader, _partition_source(schema, partition))
+                for reader, schema, partition in _each_partition(cursor))
+
+
+def each_order_table(cursor) -> Iterator[Tuple[sqlite3.Cursor, str, int]]:
+    """order_rows ve mühürlenmiş ayların tabloları için (imleç, tablo, kaydırılan gün) üçlüleri"""
+    yield cursor, ORDER_ROWS_TABLE, 0
+    yield from ((reader, f"{schema}.{ORDER_ROWS_TABLE}", partition.shift_days)
+                for reader, schema, partition in _each_partition(cursor))
+
+
+def _each_partition(cursor) -> Iterator[Tuple[sqlite3.Cursor, str, Partition]]:
+    # Kayıt cursor'ın bağlantısından okunur: henüz commit edilmemiş değişiklikler de görünür
+    partitions = _registered(cursor.connection)
+    if not partitions:
+        return
+    reader = _reader(cursor.connection)
+    try:
+        for partition in partitions:
+            with attached_partitions(reader, [partition]) as (schema,):
+                partition_cursor = reader.cursor()
+                try:
+                    yield partition_cursor, schema, partition
+                finally:
+                    partition_cursor.close()
+    finally:
+        reader.close()
+
+
+def sealable_months(conn, now: Optional[datetime] = None, keep_months: int = PARTITION_KEEP_MONTHS) -> List[str]:
+    """Sıcak pencereden eski, henüz mühürlenmemiş ve mühürlü bir ayla çakışmayan aylar (eskiden yeniye)"""
+    now = now or datetime.now()
+    cutoff = conn.execute("SELECT unixepoch(?, 'start of month', ?)",
+                          (now.strftime('%Y-%m-%d'), f"-{keep_months - 1} months")).fetchone()[0]
+    sealed = _registered(conn)
+    months = []
+    # Her adım ts indeksinde tek arama: bir sonraki siparişi olan ayın başına atlanır
+    row = conn.execute(f"SELECT MIN(ts) FROM {ORDER_ROWS_TABLE} WHERE ts IS NOT NULL").fetchone()
+    ts = row[0]
+    while ts is not None and ts < cutoff:
+        month, start, end = conn.execute("""
+            SELECT strftime('%Y-%m', :ts, 'unixepoch'), unixepoch(:ts, 'unixepoch', 'start of month'),
+                   unixepoch(:ts, 'unixepoch', 'start of month', '+1 month')
+        """, {'ts': ts}).fetchone()
+        if not any(p.month == month or (p.start_ts < end and p.end_ts > start) for p in sealed):
+            months.append(month)
+        ts = conn.execute(f"SELECT MIN(ts) FROM {ORDER_ROWS_TABLE} WHERE ts >= ?", (end,)).fetchone()[0]
+    return months
+
+
+def _write_partition(path: Path, source_uri: str, start: int, end: int, fence: int) -> int:
+    """Ayın satırlarını ana veritabanından yeni ay dosyasına kopyala; kopyalanan satır sayısını döndür"""
+    conn = sqlite3.connect(path.as_uri(), uri=True)
+    try:
+        conn.execute(f"CREATE TABLE {order_rows_sql(ORDER_ROWS_TABLE, references=False)}")
+        conn.execute("ATTACH DATABASE ? AS src", (source_uri,))
+        conn.execute(f"""
+            INSERT INTO main.{ORDER_ROWS_TABLE}
+            SELECT * FROM src.{ORDER_ROWS_TABLE} WHERE ts >= ? AND ts < ? AND rowid < ? ORDER BY rowid
+        """, (start, end, fence))
+        for name, columns in ORDER_ROWS_INDEXES.items():
+            conn.execute(f"CREATE INDEX main.{name} ON {ORDER_ROWS_TABLE}({columns})")
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+        copied = conn.execute(f"SELECT COUNT(*) FROM {ORDER_ROWS_TABLE}").fetchone()[0]
+    finally:
+        conn.close()
+    os.chmod(path, 0o444)
+    return copied
+
+
+def seal_month(conn, month: str, now: Optional[datetime] = None) -> int:
+    """Ayın siparişlerini ay dosyasına taşı; taşınan satır sayısını döndür.
+
+    Yazma kilidi (BEGIN IMMEDIATE) kopyalama boyunca tutulur, kopyalanan satırlar silinene kadar
+    değişemez. En büyük rowid'li sipariş hiç mühürlenmez: yeni siparişlerin rowid'i mühürlenenlerinkiyle
+    (ve orders_fts'teki kayıtlarıyla) çakışmaz. Kayıt ve silme tek işlemdedir; yarıda kalan bir
+    denemenin dosyası sonraki denemede yeniden yazılır.
+    """
+    now = now or datetime.now()
+    conn.commit()
+    cursor = conn.cursor()
+    start, end = cursor.execute("SELECT unixepoch(? || '-01'), unixepoch(? || '-01', '+1 month')",
+                                (month, month)).fetchone()
+    directory = partition_dir(conn)
+    directory.mkdir(exist_ok=True)
+    path = directory / f"{_schema(month)}.db"
+    _remove(path)
+
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        fence = cursor.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {ORDER_ROWS_TABLE}").fetchone()[0]
+        copied = _write_partition(path, f"{Path(_main_file(conn)).resolve().as_uri()}?mode=ro", start, end, fence)
+        if not copied:
+            conn.rollback()
+            _remove(path)
+            return 0
+        rows = f"FROM {ORDER_ROWS_TABLE} WHERE ts >= ? AND ts < ? AND rowid < ?"
+        cursor.execute("INSERT INTO bulk_load(active) VALUES (1)")
+        cursor.execute(f"INSERT INTO sealed_order_ids(id) SELECT id {rows}", (start, end, fence))
+        deleted = cursor.execute(f"DELETE {rows}", (start, end, fence)).rowcount
+        if deleted != copied:
+            raise sqlite3.IntegrityError(f"{month} mühürlenemedi: {copied} satır kopyalandı, {deleted} silindi")
+        cursor.execute("DELETE FROM bulk_load")
+        cursor.execute("""
+            INSERT INTO order_partitions(month, file, orders, start_ts, end_ts, sealed_at) VALUES (?, ?, ?, ?, ?, ?)
+        """, (month, path.name, copied, start, end, now.strftime('%Y-%m-%dT%H:%M:%S')))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        _remove(path)
+        raise
+    return copied
+
+
+def seal_partitions(conn, now: Optional[datetime] = None, keep_months: int = PARTITION_KEEP_MONTHS) -> Dict[str, int]:
+    """Sıcak pencereden eski ayları mühürle; ay → taşınan sipariş sayısı"""
+    return {month: seal_month(conn, month, now) for month in sealable_months(conn, now, keep_months)}
+
+
+def shift_partitions(cursor, days: int):
+    """Tarih kaydırmasını ay dosyalarına dokunmadan kayda işle (okurken shift_days uygulanır)"""
+    cursor.execute("""
+        UPDATE order_partitions
+        SET shift_days = shift_days + :days, start_ts = start_ts + :seconds, end_ts = end_ts + :seconds
+    """, {'days': days, 'seconds': days * 86400})
+
+
+def drop_partitions(cursor) -> List[Path]:
+    """Tüm ayları kayıttan sil; dosyaları çağıran işlemi commit ettikten sonra siler (döndürülen yollar).
+
+    Mühürlenmiş siparişlerin FTS kayıtları ve özetlere katkıları kalır; çağıran bunları yeniden kurmalıdır.
+    """
+    directory = partition_dir(cursor.connection)
+    paths = [directory / partition.file for partition in _registered(cursor)]
+    cursor.execute("DELETE FROM order_partitions")
+    cursor.execute("DELETE FROM sealed_order_ids")
+    return paths
+
+
+def remove_partition_files(paths: Sequence[Path]):
+    for path in paths:
+        _remove(path)
+
+
+def partition_status(conn) -> List[Dict]:
+    cursor = conn.execute("""
+        SELECT month, file, orders, shift_days, sealed_at FROM order_partitions ORDER BY month
+    """)
+    directory = partition_dir(conn)
+    return [{'month': month, 'file': file, 'orders': orders, 'shift_days': shift_days, 'sealed_at': sealed_at,
+             'bytes': (directory / file).stat().st_size if (directory / file).exists() else None}
+            for month, file, orders, shift_days, sealed_at in cursor.fetchall()]
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+
+    if "--seal" in sys.argv:
+        sealed = seal_partitions(conn)
+        for month, count in sealed.items():
+            print(f"📦 {month}: {count} sipariş mühürlendi")
+        if not sealed:
+            print("✅ Mühürlenecek ay yok")
+    else:
+        for partition in partition_status(conn):
+            print(f"📦 {partition['month']}: {partition['orders']} sipariş, "
+                  f"{(partition['bytes'] or 0) / 1024 / 1024:.1f} MB ({partition['file']})")
@@ -0,0 +1,108 @@
+"""
+Yanıt Önbelleği
+Sık okunan, seyrek değişen GET endpoint'leri için süreç içi TTL + LRU önbellek.
+Her kayıt bağlı olduğu tabloların sürüm numaralarını saklar; yazma yolları bump_tables() ile
+sürümü artırdığında kayıt geçersiz olur. ETag / If-None-Match ile 304 yanıtları desteklenir.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class CacheEntry:
+    __slots__ = ('body', 'status_code', 'headers', 'etag', 'versions', 'expires_at')
+
+    def __init__(self, body: bytes, status_code: int, headers: Dict[str, str], etag: str,
+                 versions: Tuple[int, ...], expires_at: float):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers
+        self.etag = etag
+        self.versions = versions
+        self.expires_at = expires_at
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class ResponseCache:
+    """Tablo sürümleriyle geçersiz kılınan TTL + LRU yanıt önbelleği"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'expired': 0,
+            'evictions': 0,
+            'not_modified': 0,
+        }
+
+    def table_versions(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump_tables(self, *tables: str):
+        """Yazma sonrası çağrılır: bu tablolara bağlı tüm önbellek kayıtları geçersiz olur"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, key: str, tables: Iterable[str]) -> Optional[CacheEntry]:
+        versions = self.table_versions(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if entry.versions != versions:
+                self._stats['stale'] += 1
+                self._stats['misses'] += 1
+                del self._entries[key]
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self._stats['not_modified'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['ttl_seconds'] = self.ttl_seconds
+            stats['table_versions'] = dict(self._versions)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+response_cache = ResponseCache()
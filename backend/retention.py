@@ -0,0 +1,386 @@
+"""
+Saklama (Retention) ve Sıkıştırma
+Süresi dolan anomali ve bildirimleri sıkıştırılmış arşiv tablosuna taşır, ardından boşalan sayfaları
+artımlı VACUUM ile dosyadan geri verir; sıcak tablolar küçük kalır.
+
+Kurallar retention_policies tablosundadır; hedef tablo ve sınıf (anomalilerde önem derecesi,
+bildirimlerde okundu/okunmadı) başına:
+- max_age_days: bundan eski kayıtlar arşivlenir (NULL: yaşa göre arşivleme yok)
+- max_per_type: tip başına en yeni bu kadar kayıt tutulur (NULL: sayıya göre arşivleme yok)
+
+Sıcak pencerenin dışına çıkan sipariş ayları da her turda kendi dosyalarına mühürlenir (partitions.py).
+
+Süresi dolan kayıtlar kural başına pencere fonksiyonu geçişiyle bulunur ve id sırasıyla sınırlı
+partilerle (keyset) okunup taşınır; her parti (arşiv satırı + silme) kendi kısa işleminde yazılır.
+Tespit turlarının eşitlediği güncel eşik/grup anomalileri (source = threshold | group) arşivlenmez;
+onlar geçmiş değil anlık durumdur.
+
+Kullanım (backend dizininden):
+    python retention.py                          # kuralları uygula
+    python retention.py --dry-run                # sadece arşivlenecek kayıt sayılarını göster
+    python retention.py --enable-incremental-vacuum   # mevcut veritabanını artımlı VACUUM moduna geçir (tek seferlik)
+"""
+import json
+import sqlite3
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from db_pool import DB_PATH, get_pool
+from partitions import seal_partitions, sealable_months
+
+# Bir işlemde taşınan en fazla kayıt; yazma kilidi kısa tutulur
+RETENTION_BATCH_SIZE = 500
+
+# Bir turda en fazla bu kadar parti işlenir; kalan kayıtlar sonraki tura kalır
+MAX_BATCHES_PER_RUN = 200
+
+# PRAGMA incremental_vacuum her adımda en fazla bu kadar sayfayı dosyadan geri verir
+VACUUM_STEP_PAGES = 1000
+
+# Saklama turlarının aralığı (günde bir)
+RETENTION_INTERVAL_SECONDS = 24 * 3600
+
+# Tespit turlarının her seferinde eşitlediği kaynaklar; bunlar arşivlenmez
+LIVE_ANOMALY_SOURCES = ('threshold', 'group')
+
+# Hedef tablo → (sınıf sütunu, sınıf adı → sütun değeri (None: aynen), arşivlenebilir kayıt koşulu (None: hepsi))
+RETENTION_TARGETS = {
+    'anomalies': ("severity", None,
+                  f"(source IS NULL OR source NOT IN ({', '.join(repr(s) for s in LIVE_ANOMALY_SOURCES)}))"),
+    'notifications': ("read", {'read': 1, 'unread': 0}, None),
+}
+
+# (hedef, sınıf, max_age_days, max_per_type)
+DEFAULT_POLICIES = [
+    ('anomalies', 'high', 180, 500),
+    ('anomalies', 'medium', 90, 200),
+    ('anomalies', 'low', 30, 100),
+    ('notifications', 'read', 30, 500),
+    ('notifications', 'unread', 90, None),
+]
+
+POLICY_COLUMNS = ['target', 'class', 'max_age_days', 'max_per_type']
+
+
+def create_retention_tables(cursor):
+    """Kural, arşiv ve tur kaydı tablolarını oluştur; varsayılan kuralları ekle"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS retention_policies (
+            target TEXT NOT NULL,
+            class TEXT NOT NULL,
+            max_age_days INTEGER,
+            max_per_type INTEGER,
+            PRIMARY KEY (target, class)
+        ) WITHOUT ROWID
+    """)
+    cursor.executemany("INSERT OR IGNORE INTO retention_policies VALUES (?, ?, ?, ?)", DEFAULT_POLICIES)
+
+    # Her satır bir partidir: kayıtlar zlib ile sıkıştırılmış NDJSON olarak saklanır
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archive_batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target TEXT NOT NULL,
+            archived_at TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            first_date TEXT,
+            last_date TEXT,
+            raw_bytes INTEGER NOT NULL,
+            payload BLOB NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archive_batches_target ON archive_batches(target, archived_at)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS retention_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            finished_at TEXT NOT NULL,
+            archived TEXT NOT NULL,
+            batches INTEGER NOT NULL,
+            archive_bytes INTEGER NOT NULL,
+            freelist_pages INTEGER NOT NULL,
+            pages_reclaimed INTEGER NOT NULL,
+            bytes_reclaimed INTEGER NOT NULL,
+            duration_ms REAL NOT NULL
+        )
+    """)
+
+    # Kural başına pencere geçişi (sınıf, tip, tarih) sırasıyla indeksten okunur
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_severity_type_date ON anomalies(severity, type, date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_read_type_date ON notifications(read, type, date)")
+
+
+def fetch_policies(conn) -> List[Dict]:
+    cursor = conn.execute(f"SELECT {', '.join(POLICY_COLUMNS)} FROM retention_policies ORDER BY target, class")
+    return [dict(zip(POLICY_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def _expired_sql(policy: Dict, now: datetime) -> Optional[Tuple[str, Tuple]]:
+    """Kuralın arşivleyeceği kayıtları (yaşı dolmuş veya tipinin en yeni N kaydı dışında kalan) seçen
+    sorgu ve parametreleri; kural hiçbir şey arşivlemiyorsa None"""
+    class_column, class_values, archivable = RETENTION_TARGETS[policy['target']]
+    class_value = class_values[policy['class']] if class_values else policy['class']
+    if policy['max_age_days'] is None and policy['max_per_type'] is None:
+        return None
+    cutoff = (now - timedelta(days=policy['max_age_days'])).strftime('%Y-%m-%d') if policy['max_age_days'] is not None else ''
+    max_per_type = policy['max_per_type'] if policy['max_per_type'] is not None else -1
+    condition = f"{class_column} = ?" + (f" AND {archivable}" if archivable else "")
+
+    # Eski sürüm ORDER BY ... LIMIT alt sorgusunu tip başına ayrı çalıştırıyordu; burada tüm tipler
+    # tek sıralı geçişte numaralanır
+    return f"""
+        SELECT id FROM (
+            SELECT id, date,
+                   row_number() OVER (PARTITION BY type ORDER BY date DESC, id DESC) AS position
+            FROM {policy['target']}
+            WHERE {condition}
+        )
+        WHERE (date < ? OR (? >= 0 AND position > ?)) AND id > ?
+    """, (class_value, cutoff, max_per_type, max_per_type)
+
+
+def expired_ids(conn, policy: Dict, now: datetime, after: str = '', limit: int = RETENTION_BATCH_SIZE) -> List[str]:
+    """Kuralın arşivleyeceği kayıtlardan id sırasıyla after'dan sonraki en fazla limit kimlik.
+
+    Partiler id üzerinden sayfalanır (keyset); bellek ve okuma parti boyuyla sınırlıdır. Süresi
+    dolan kayıtların silinmesi kalanların durumunu değiştirmez: sırada onların arkasındaki kayıtlar
+    daha eskidir ve zaten süresi dolmuştur.
+    """
+    expired = _expired_sql(policy, now)
+    if expired is None:
+        return []
+    query, params = expired
+    cursor = conn.execute(f"{query} ORDER BY id LIMIT ?", (*params, after, limit))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def count_expired(conn, policy: Dict, now: datetime, after: str = '') -> int:
+    """Kuralın arşivleyeceği, id'si after'dan büyük kayıt sayısı"""
+    expired = _expired_sql(policy, now)
+    if expired is None:
+        return 0
+    query, params = expired
+    return conn.execute(f"SELECT COUNT(*) FROM ({query})", (*params, after)).fetchone()[0]
+
+
+def archive_batch(conn, target: str, ids: List[str], now: datetime) -> Tuple[int, int]:
+    """Kayıtları tek işlemde arşiv satırına yaz ve tablodan sil; (taşınan kayıt, arşiv baytı) döndür"""
+    cursor = conn.cursor()
+    ids_json = json.dumps(ids)
+    cursor.execute(f"SELECT * FROM {target} WHERE id IN (SELECT value FROM json_each(?)) ORDER BY date",
+                   (ids_json,))
+    columns = [description[0] for description in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    if not rows:
+        return 0, 0
+
+    raw = "\n".join(json.dumps(row, ensure_ascii=False) for row in rows).encode('utf-8')
+    payload = zlib.compress(raw, 6)
+    cursor.execute("""
+        INSERT INTO archive_batches(target, archived_at, row_count, first_date, last_date, raw_bytes, payload)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (target, now.strftime('%Y-%m-%dT%H:%M:%S'), len(rows), rows[0]['date'], rows[-1]['date'],
+          len(raw), payload))
+    cursor.execute(f"DELETE FROM {target} WHERE id IN (SELECT value FROM json_each(?))", (ids_json,))
+    moved = cursor.rowcount
+    conn.commit()
+    return moved, len(payload)
+
+
+def read_archive_batch(conn, batch_id: int) -> List[Dict]:
+    """Arşiv partisini aç (geri yükleme ve inceleme için)"""
+    row = conn.execute("SELECT payload FROM archive_batches WHERE id = ?", (batch_id,)).fetchone()
+    if row is None:
+        return []
+    return [json.loads(line) for line in zlib.decompress(row[0]).decode('utf-8').splitlines()]
+
+
+def _pragma(conn, name: str) -> int:
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def incremental_vacuum(conn, max_steps: Optional[int] = None) -> Dict:
+    """Boş sayfaları VACUUM_STEP_PAGES'lik adımlarla dosyadan geri ver.
+
+    Tam VACUUM'un aksine tabloyu yeniden yazmaz ve kısa adımlarla çalışır; sadece
+    auto_vacuum = INCREMENTAL olan veritabanlarında sayfa geri verir.
+    """
+    page_size = _pragma(conn, 'page_size')
+    freelist_before = _pragma(conn, 'freelist_count')
+    incremental = _pragma(conn, 'auto_vacuum') == 2
+
+    steps = 0
+    if incremental:
+        while _pragma(conn, 'freelist_count') > 0 and (max_steps is None or steps < max_steps):
+            # Sonuç sütunu olmayan PRAGMA'yı execute() tek adım çalıştırır (tek sayfa); executescript
+            # ifadeyi sonuna kadar yürütür
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES});")
+            steps += 1
+
+    reclaimed = freelist_before - _pragma(conn, 'freelist_count')
+    return {
+        'incremental': incremental,
+        'freelist_pages': freelist_before,
+        'pages_reclaimed': reclaimed,
+        'bytes_reclaimed': reclaimed * page_size,
+        'steps': steps,
+    }
+
+
+def run_retention(conn, now: Optional[datetime] = None, dry_run: bool = False,
+                  max_batches: int = MAX_BATCHES_PER_RUN) -> Dict:
+    """Tüm kuralları uygula, boşalan alanı geri ver ve turu retention_runs'a kaydet"""
+    now = now or datetime.now()
+    started = time.perf_counter()
+    archived = {target: 0 for target in RETENTION_TARGETS}
+    pending = {target: 0 for target in RETENTION_TARGETS}
+    batches = 0
+    archive_bytes = 0
+
+    for policy in fetch_policies(conn):
+        if dry_run:
+            pending[policy['target']] += count_expired(conn, policy, now)
+            continue
+        after = ''
+        while True:
+            if batches >= max_batches:
+                pending[policy['target']] += count_expired(conn, policy, now, after)
+                break
+            ids = expired_ids(conn, policy, now, after)
+            if not ids:
+                break
+            moved, stored = archive_batch(conn, policy['target'], ids, now)
+            archived[policy['target']] += moved
+            archive_bytes += stored
+            batches += 1
+            after = ids[-1]
+
+    if dry_run:
+        return {'dry_run': True, 'pending': pending, 'sealable_months': sealable_months(conn, now)}
+
+    # Sıcak pencere dışına çıkan aylar kendi dosyalarına taşınır; boşalan sayfalar aşağıda geri verilir
+    sealed = seal_partitions(conn, now)
+    vacuum = incremental_vacuum(conn)
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    conn.execute("""
+        INSERT INTO retention_runs(started_at, finished_at, archived, batches, archive_bytes, freelist_pages,
+                                   pages_reclaimed, bytes_reclaimed, duration_ms)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (now.strftime('%Y-%m-%dT%H:%M:%S'), datetime.now().strftime('%Y-%m-%dT%H:%M:%S'), json.dumps(archived),
+          batches, archive_bytes, vacuum['freelist_pages'], vacuum['pages_reclaimed'], vacuum['bytes_reclaimed'],
+          duration_ms))
+    conn.commit()
+    return {
+        'archived': archived,
+        'pending': pending,
+        'batches': batches,
+        'archive_bytes': archive_bytes,
+        'sealed': sealed,
+        'vacuum': vacuum,
+        'duration_ms': duration_ms,
+    }
+
+
+def retention_status(conn, runs: int = 10) -> Dict:
+    """Kurallar, son turlar ve arşiv boyutu"""
+    cursor = conn.execute("""
+        SELECT started_at, finished_at, archived, batches, archive_bytes, freelist_pages, pages_reclaimed,
+               bytes_reclaimed, duration_ms
+        FROM retention_runs ORDER BY id DESC LIMIT ?
+    """, (runs,))
+    columns = [description[0] for description in cursor.description]
+    recent = []
+    for row in cursor.fetchall():
+        run = dict(zip(columns, row))
+        run['archived'] = json.loads(run['archived'])
+        recent.append(run)
+    cursor = conn.execute("""
+        SELECT target, COUNT(*), COALESCE(SUM(row_count), 0), COALESCE(SUM(raw_bytes), 0),
+               COALESCE(SUM(length(payload)), 0)
+        FROM archive_batches GROUP BY target
+    """)
+    archive = {row[0]: {'batches': row[1], 'rows': row[2], 'raw_bytes': row[3], 'stored_bytes': row[4]}
+               for row in cursor.fetchall()}
+    return {
+        'policies': fetch_policies(conn),
+        'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(_pragma(conn, 'auto_vacuum')),
+        'archive': archive,
+        'runs': recent,
+    }
+
+
+def run_retention_job(run_id: str) -> Dict:
+    """Zamanlayıcının saklama işi; havuzdan alınan bağlantıyla bir tur çalıştırır"""
+    conn = get_pool().acquire()
+    try:
+        result = run_retention(conn)
+    finally:
+        conn.close()
+    print(f"📦 Saklama turu ({run_id}): {result['archived']} arşivlendi, {result['sealed']} mühürlendi, "
+          f"{result['vacuum']['bytes_reclaimed'] / 1024:.0f} KB geri verildi")
+    return result
+
+
+def enable_incremental_vacuum(conn):
+    """Mevcut veritabanını auto_vacuum = INCREMENTAL moduna geçir (tek seferlik tam VACUUM).
+
+    Tam VACUUM, INTEGER PRIMARY KEY'i olmayan tablolarda (eski şemadaki orders) rowid'leri yeniden numaralandırabilir.
+    orders_fts ve istatistiksel modelin sipariş filigranı rowid'e bağlı olduğundan VACUUM öncesi
+    eşleme saklanır; rowid değiştiyse FTS indeksi yeniden kurulur ve filigran güncel sona taşınır.
+    """
+    if _pragma(conn, 'auto_vacuum') == 2:
+        print("✅ Veritabanı zaten artımlı VACUUM modunda")
+        return
+    conn.commit()
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS orders_rowids AS SELECT rowid AS old_rowid, id FROM orders")
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+    moved = conn.execute("""
+        SELECT COUNT(*) FROM temp.orders_rowids r JOIN orders o ON o.id = r.id WHERE o.rowid != r.old_rowid
+    """).fetchone()[0]
+    if moved:
+        from migrations import add_inserted_orders_to_fts
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM orders_fts")
+        add_inserted_orders_to_fts(cursor, 0)
+        # Yeni numaralandırmada eski filigran anlamsızdır; mevcut siparişler işlenmiş sayılır
+        row = cursor.execute("SELECT state FROM detector_models WHERE name = 'order_amount'").fetchone()
+        if row:
+            state = json.loads(row[0])
+            state['last_rowid'] = cursor.execute("SELECT COALESCE(MAX(rowid), 0) FROM orders").fetchone()[0]
+            cursor.execute("UPDATE detector_models SET state = ? WHERE name = 'order_amount'",
+                           (json.dumps(state, separators=(',', ':')),))
+        print(f"🔁 {moved} siparişin rowid'i değişti; FTS indeksi ve sipariş filigranı yenilendi")
+    conn.execute("DROP TABLE temp.orders_rowids")
+    conn.commit()
+    print("✅ Artımlı VACUUM modu etkin")
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+
+    if "--enable-incremental-vacuum" in sys.argv:
+        enable_incremental_vacuum(conn)
+    else:
+        result = run_retention(conn, dry_run="--dry-run" in sys.argv)
+        if result.get('dry_run'):
+            for target, count in result['pending'].items():
+                print(f"📦 {target}: {count} kayıt arşivlenecek")
+            for month in result['sealable_months']:
+                print(f"📦 orders: {month} ayı mühürlenecek")
+        else:
+            for target, count in result['archived'].items():
+                print(f"📦 {target}: {count} kayıt arşivlendi")
+            for month, count in result['sealed'].items():
+                print(f"📦 orders: {month} ayının {count} siparişi mühürlendi")
+            vacuum = result['vacuum']
+            if not vacuum['incremental']:
+                print("ℹ️ auto_vacuum kapalı; boş sayfalar dosyada kalır (python retention.py --enable-incremental-vacuum)")
+            print(f"🧹 {vacuum['pages_reclaimed']} sayfa ({vacuum['bytes_reclaimed'] / 1024:.0f} KB) geri verildi, "
+                  f"{result['batches']} parti, {result['duration_ms']} ms")
+
+    conn.close()
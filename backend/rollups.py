@@ -0,0 +1,225 @@
+"""
+Zaman Kovası Özetleri
+Saatlik sipariş ve anomali sayılarını tutan, tetikleyicilerle artımlı güncellenen özet tablosu.
+/dashboard/chart-data ham tabloları taramak yerine bu tablodan saat/gün/hafta kovalarını toplar.
+
+Tutarlılık kontrolü / yeniden oluşturma (backend dizininden):
+    python rollups.py            # farkları raporla
+    python rollups.py --rebuild  # özet tablosunu sıfırdan hesapla
+"""
+import sqlite3
+import sys
+from typing import Dict, List, Tuple
+
+from db_pool import DB_PATH
+from order_store import TriggerTarget, order_trigger_target
+from partitions import each_order_source
+
+# Tarih sütunundan saat kovası ('YYYY-MM-DD HH:00:00'); hem '2025-01-01' hem '2025-01-01T10:30:00Z' çalışır
+HOUR_BUCKET_SQL = "strftime('%Y-%m-%d %H:00:00', {})"
+
+# Kova anahtarını saatlik satırlardan türeten ifadeler
+GRANULARITY_SQL = {
+    'hour': "hour",
+    'day': "substr(hour, 1, 10)",
+    # Haftalar pazartesi başlar
+    'week': "date(hour, '-6 days', 'weekday 1')",
+}
+
+ROLLUP_TABLES = {
+    'orders': 'orders',
+    'anomalies': 'anomalies',
+}
+
+# Tablonun satırları koşul sağlanınca bu sütunları da artırır (istatistiksel iptal oranı modeli için):
+# (özet sütunu, koşulun bağlı olduğu sütun, koşul; sütunlar RowColumns ile çözülür)
+ROLLUP_CONDITIONAL_COLUMNS = {
+    'orders': [('cancelled', 'status', "{status} = 'cancelled'")],
+}
+
+ROLLUP_COLUMNS = ['orders', 'anomalies', 'cancelled']
+
+
+def _target(cursor, table: str) -> TriggerTarget:
+    return order_trigger_target(cursor) if table == 'orders' else TriggerTarget(table)
+
+
+def _change(column: str, columns: Dict[str, str], delta: int, condition: str = None) -> str:
+    bucket = HOUR_BUCKET_SQL.format(columns['date'])
+    extra = f" AND {condition.format_map(columns)}" if condition else ""
+    return (f"INSERT INTO rollup_hourly(hour, {column}) SELECT {bucket}, {delta} WHERE {bucket} IS NOT NULL{extra} "
+            f"ON CONFLICT(hour) DO UPDATE SET {column} = {column} + ({delta});")
+
+
+def _table_changes(table: str, columns: Dict[str, str], delta: int) -> str:
+    changes = [_change(ROLLUP_TABLES[table], columns, delta)]
+    changes += [_change(column, columns, delta, condition)
+                for column, _, condition in ROLLUP_CONDITIONAL_COLUMNS.get(table, [])]
+    return "\n".join(changes)
+
+
+def _count_columns(table: str) -> Tuple[List[str], List[str]]:
+    """Tablonun beslediği özet sütunları ve ham tablodan sayım ifadeleri"""
+    extras = ROLLUP_CONDITIONAL_COLUMNS.get(table, [])
+    row = TriggerTarget(table).columns(table)
+    columns = [ROLLUP_TABLES[table]] + [column for column, _, _ in extras]
+    counts = ["COUNT(*)"] + [f"COUNT(*) FILTER (WHERE {condition.format_map(row)})" for _, _, condition in extras]
+    return columns, counts
+
+
+def create_rollups(cursor):
+    """Saatlik özet tablosunu ve tetikleyicilerini oluştur, ardından mevcut veriden doldur"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_hourly (
+            hour TEXT PRIMARY KEY,
+            orders INTEGER NOT NULL DEFAULT 0,
+            anomalies INTEGER NOT NULL DEFAULT 0,
+            cancelled INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    for table in ROLLUP_TABLES:
+        create_insert_trigger(cursor, table)
+        create_change_triggers(cursor, table)
+
+    rebuild_rollups(cursor)
+
+
+def create_change_triggers(cursor, table: str, update_when: str = None, delete_when: str = None):
+    """Tablonun DELETE ve UPDATE özet tetikleyicilerini oluştur"""
+    target = _target(cursor, table)
+    guard = f" WHEN {delete_when}" if delete_when else ""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS rollup_{table}_ad AFTER DELETE ON {target.table}{guard} BEGIN
+            {_table_changes(table, target.columns('old'), -1)}
+        END
+    """)
+    create_update_trigger(cursor, table, update_when)
+
+
+def create_update_trigger(cursor, table: str, when: str = None):
+    """Tablonun UPDATE özet tetikleyicisini oluştur; when verilirse sadece koşul sağlanınca çalışır"""
+    # Koşullu sütunu olan tablolarda koşulun sütunu (ör. status) değişince de kovalar güncellenir
+    watched = ['date'] + [source for _, source, _ in ROLLUP_CONDITIONAL_COLUMNS.get(table, [])]
+    target = _target(cursor, table)
+    guard = f" WHEN {when}" if when else ""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS rollup_{table}_au AFTER UPDATE OF {target.watched(watched)}
+        ON {target.table}{guard} BEGIN
+            {_table_changes(table, target.columns('old'), -1)}
+            {_table_changes(table, target.columns('new'), 1)}
+        END
+    """)
+
+
+def add_cancelled_column(cursor, insert_when: str = None):
+    """Önceki sürümün özet tablosuna iptal sayısını ekle ve orders tetikleyicilerini yenile"""
+    cursor.execute("PRAGMA table_info(rollup_hourly)")
+    if 'cancelled' not in [col[1] for col in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE rollup_hourly ADD COLUMN cancelled INTEGER NOT NULL DEFAULT 0")
+    for trigger in ('rollup_orders_ai', 'rollup_orders_ad', 'rollup_orders_au'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    create_insert_trigger(cursor, 'orders', insert_when)
+    create_change_triggers(cursor, 'orders')
+    rebuild_rollups(cursor)
+
+
+def create_insert_trigger(cursor, table: str, when: str = None):
+    """Tablonun INSERT özet tetikleyicisini oluştur; when verilirse sadece koşul sağlanınca çalışır"""
+    target = _target(cursor, table)
+    guard = f" WHEN {when}" if when else ""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS rollup_{table}_ai AFTER INSERT ON {target.table}{guard} BEGIN
+            {_table_changes(table, target.columns('new'), 1)}
+        END
+    """)
+
+
+def add_inserted_rows(cursor, table: str, after_rowid: int):
+    """Tetikleyicisiz eklenmiş (rowid > after_rowid) satırları saatlik kovalara tek sorguyla ekle"""
+    columns, counts = _count_columns(table)
+    bucket = HOUR_BUCKET_SQL.format('date')
+    cursor.execute(f"""
+        INSERT INTO rollup_hourly(hour, {', '.join(columns)})
+        SELECT {bucket} AS bucket, {', '.join(counts)} FROM {table}
+        WHERE rowid > ? AND {bucket} IS NOT NULL GROUP BY bucket
+        ON CONFLICT(hour) DO UPDATE SET {', '.join(f'{column} = {column} + excluded.{column}' for column in columns)}
+    """, (after_rowid,))
+
+
+def compute_rollups(cursor) -> Dict[str, Tuple[int, ...]]:
+    """Saatlik kovaların olması gereken değerlerini (ROLLUP_COLUMNS sırasıyla) ham tablolardan
+    (siparişlerde mühürlenmiş aylar dahil) hesapla"""
+    expected: Dict[str, List[int]] = {}
+    bucket = HOUR_BUCKET_SQL.format('date')
+    for table in ROLLUP_TABLES:
+        columns, counts = _count_columns(table)
+        sources = each_order_source(cursor) if table == 'orders' else [(cursor, table)]
+        for source_cursor, source in sources:
+            source_cursor.execute(f"SELECT {bucket} AS hour, {', '.join(counts)} FROM {source} AS {table} "
+                                  f"WHERE {bucket} IS NOT NULL GROUP BY hour")
+            for hour, *values in source_cursor.fetchall():
+                row = expected.setdefault(hour, [0] * len(ROLLUP_COLUMNS))
+                for name, value in zip(columns, values):
+                    row[ROLLUP_COLUMNS.index(name)] += value
+    return {hour: tuple(values) for hour, values in expected.items()}
+
+
+def rebuild_rollups(cursor):
+    """Özet tablosunu sıfırdan hesaplayıp yaz"""
+    expected = compute_rollups(cursor)
+    cursor.execute("DELETE FROM rollup_hourly")
+    cursor.executemany(
+        f"INSERT INTO rollup_hourly(hour, {', '.join(ROLLUP_COLUMNS)}) VALUES (?, {', '.join('?' for _ in ROLLUP_COLUMNS)})",
+        [(hour, *values) for hour, values in expected.items()]
+    )
+
+
+def check_rollups(cursor) -> List[str]:
+    """Saklanan kovaları ham tablolardan hesaplananlarla karşılaştır; farkları döndür"""
+    expected = compute_rollups(cursor)
+    cursor.execute(f"SELECT hour, {', '.join(ROLLUP_COLUMNS)} FROM rollup_hourly")
+    stored = {hour: tuple(values) for hour, *values in cursor.fetchall()}
+
+    empty = (0,) * len(ROLLUP_COLUMNS)
+    differences = []
+    for hour in sorted(set(expected) | set(stored)):
+        if expected.get(hour, empty) != stored.get(hour, empty):
+            differences.append(f"{hour}: saklanan={stored.get(hour, empty)} gerçek={expected.get(hour, empty)}")
+    return differences
+
+
+def fetch_buckets(conn, start: str, end: str, granularity: str) -> Dict[str, Tuple[int, int]]:
+    """[start, end) saat aralığındaki kovaları (orders, anomalies) olarak topla.
+
+    start ve end 'YYYY-MM-DD HH:00:00' biçimindedir; anahtarlar GRANULARITY_SQL'deki kova ifadesidir.
+    """
+    bucket = GRANULARITY_SQL[granularity]
+    cursor = conn.execute(f"""
+        SELECT {bucket} AS bucket, SUM(orders), SUM(anomalies)
+        FROM rollup_hourly
+        WHERE hour >= ? AND hour < ?
+        GROUP BY bucket
+    """, (start, end))
+    return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    if "--rebuild" in sys.argv:
+        rebuild_rollups(cursor)
+        conn.commit()
+        print("✅ Saatlik özet tablosu sıfırdan yeniden oluşturuldu")
+    else:
+        differences = check_rollups(cursor)
+        if differences:
+            print("❌ Tutarsız kovalar (düzeltmek için: python rollups.py --rebuild):")
+            for difference in differences[:20]:
+                print(f"   - {difference}")
+            conn.close()
+            sys.exit(1)
+        print("✅ Tüm kovalar tutarlı")
+
+    conn.close()
@@ -1,17 +1,39 @@
 #!/usr/bin/env python3
 """
 FastAPI backend sunucusu için çalıştırma scripti
+
+Açılış idempotenttir: şema sürümü güncel ve veritabanı başlatılmış ise tablo oluşturma ve örnek
+veri adımları atlanır, mevcut veriler korunur. Tarih kaydırması ve ilk anomali tespiti sunucu
+istek kabul etmeye başladıktan sonra arka planda çalışır.
+
+Kullanım (backend dizininden):
+    python run.py              # veritabanını gerekirse hazırla ve sunucuyu başlat
+    python run.py --reset      # veritabanını silip örnek verilerle yeniden doldur
+    python run.py --reload     # kod değişikliklerinde sunucuyu yeniden başlat (geliştirme)
 """
+import argparse
+
 import uvicorn
-from database import init_database
+from database import ensure_database, init_database
 
 if __name__ == "__main__":
-    # Veritabanını örnek verilerle başlat
-    print("Veritabanı başlatılıyor...")
-    init_database()
-    print("Veritabanı başlatıldı!")
-    
+    parser = argparse.ArgumentParser(description="FastAPI backend sunucusu")
+    parser.add_argument("--reset", action="store_true", help="Mevcut veriyi silip örnek verilerle yeniden doldur")
+    parser.add_argument("--reload", action="store_true", help="Kod değişikliklerinde yeniden başlat")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.reset:
+        print("Veritabanı sıfırlanıyor...")
+        init_database()
+        print("Veritabanı başlatıldı!")
+    elif ensure_database():
+        print("Veritabanı hazırlandı!")
+    else:
+        print("Veritabanı güncel, başlatma adımları atlandı")
+
     # FastAPI sunucusunu başlat
-    print("FastAPI sunucusu http://localhost:8000 adresinde başlatılıyor")
-    print("API dokümantasyonu http://localhost:8000/docs adresinde mevcut")
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    print(f"FastAPI sunucusu http://localhost:{args.port} adresinde başlatılıyor")
+    print(f"API dokümantasyonu http://localhost:{args.port}/docs adresinde mevcut")
+    uvicorn.run("main:app", host=args.host, port=args.port, reload=args.reload)
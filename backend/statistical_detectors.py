@@ -0,0 +1,284 @@
+"""
+İstatistiksel Anomali Modelleri
+Sabit eşikler yerine verinin kendi geçmişine göre karar veren akışkan (streaming) dedektörler:
+
+- hourly_volume: Saatlik sipariş hacmi. Haftanın günü × saat (168 dilim) mevsimsel taban çizgisi
+  ve standartlaştırılmış sapmalar üzerinde EWMA kontrol grafiği (artış / düşüş).
+- hourly_cancel_rate: Saatlik iptal oranı için EWMA kontrol grafiği (sadece artış).
+- order_amount: Ürün bazında medyan/MAD ile robust z-skoru; olağandışı sipariş tutarları.
+
+Her modelin durumu detector_models tablosunda tek satır JSON olarak saklanır. Bir tur sadece son
+turdan sonra kapanan saatleri (rollup_hourly'den saat başına bir satır) ve yeni siparişleri
+(rowid filigranı) işler; geçmiş yeniden taranmaz. İlk turda modeller son WARMUP_DAYS günle ısınır.
+
+Yeni bir dedektör StatisticalDetector'dan türetilip STATISTICAL_DETECTORS listesine eklenir.
+"""
+import json
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# İlk turda modelin ısınmak için okuyacağı geçmiş (4 hafta: her mevsimsel dilim 4 gözlem)
+WARMUP_DAYS = 28
+
+# Bundan eski saat/siparişler modeli günceller ama anomali üretmez (ısınma ve uzun kesinti sonrası)
+EVENT_LOOKBACK_HOURS = 24
+
+# EWMA kontrol grafiği: ağırlık ve kontrol sınırı (sigma)
+EWMA_LAMBDA = 0.3
+EWMA_LIMIT_SIGMA = 3.0
+
+# Mevsimsel dilim ortalama/varyansının öğrenme hızı (ilk gözlemlerde 1/n ile tam ortalama)
+SEASONAL_ALPHA = 0.25
+SEASONAL_MIN_OBSERVATIONS = 3
+
+# İptal oranı için saat başına en az sipariş ve ısınma
+CANCEL_RATE_MIN_ORDERS = 5
+CANCEL_RATE_MIN_OBSERVATIONS = 24
+
+# Robust z-skoru: ürün başına ısınma örneği, eşik (Iglewicz-Hoaglin) ve medyan/MAD adım oranı
+AMOUNT_WARMUP = 15
+AMOUNT_Z_LIMIT = 3.5
+AMOUNT_STEP = 0.05
+
+
+def create_model_store(cursor):
+    """Model durumlarının saklandığı tabloyu oluştur"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS detector_models (
+            name TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+def load_state(cursor, name: str) -> Optional[Dict]:
+    row = cursor.execute("SELECT state FROM detector_models WHERE name = ?", (name,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def save_state(cursor, name: str, state: Dict):
+    cursor.execute("""
+        INSERT INTO detector_models(name, state, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at
+    """, (name, json.dumps(state, separators=(',', ':')), datetime.now().strftime('%Y-%m-%dT%H:%M:%S')))
+
+
+def _hour_key(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%d %H:00:00')
+
+
+def _ewma_step(mean: float, var: float, count: int, value: float, alpha: float):
+    """Üstel ağırlıklı ortalama/varyans güncellemesi; ilk gözlemlerde alpha = 1/n"""
+    alpha = max(alpha, 1.0 / (count + 1))
+    delta = value - mean
+    mean += alpha * delta
+    var = (1 - alpha) * (var + alpha * delta * delta)
+    return mean, var
+
+
+def _event(anomaly_type: str, scope: str, subject: str, severity: str, description: str,
+           date: str, order_id: Optional[str] = None) -> Dict:
+    return {'type': anomaly_type, 'scope': scope, 'subject': subject, 'severity': severity,
+            'description': description, 'date': date, 'orderId': order_id}
+
+
+class StatisticalDetector:
+    """Akışkan dedektör arayüzü: durumu JSON'a sığar, update sadece yeni veriyi işler"""
+    name = ''
+
+    def initial_state(self, cursor, now: datetime) -> Dict:
+        raise NotImplementedError
+
+    def update(self, cursor, state: Dict, now: datetime) -> List[Dict]:
+        """Durumu yerinde güncelle, tespit edilen olayları döndür"""
+        raise NotImplementedError
+
+
+class HourlyDetector(StatisticalDetector):
+    """Kapanmış saatleri rollup_hourly'den sırayla işleyen dedektörlerin ortak kısmı"""
+
+    def initial_state(self, cursor, now: datetime) -> Dict:
+        start = now.replace(minute=0, second=0, microsecond=0) - timedelta(days=WARMUP_DAYS)
+        return {'last_hour': _hour_key(start - timedelta(hours=1))}
+
+    def update(self, cursor, state: Dict, now: datetime) -> List[Dict]:
+        current_hour = now.replace(minute=0, second=0, microsecond=0)
+        next_hour = datetime.strptime(state['last_hour'], '%Y-%m-%d %H:%M:%S') + timedelta(hours=1)
+        if next_hour >= current_hour:
+            return []
+
+        cursor.execute("SELECT hour, orders, cancelled FROM rollup_hourly WHERE hour >= ? AND hour < ?",
+                       (_hour_key(next_hour), _hour_key(current_hour)))
+        counts = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        events_from = current_hour - timedelta(hours=EVENT_LOOKBACK_HOURS)
+
+        events = []
+        hour = next_hour
+        while hour < current_hour:
+            orders, cancelled = counts.get(_hour_key(hour), (0, 0))
+            event = self.observe(state, hour, orders, cancelled)
+            if event and hour >= events_from:
+                events.append(event)
+            hour += timedelta(hours=1)
+        state['last_hour'] = _hour_key(current_hour - timedelta(hours=1))
+        return events
+
+    def observe(self, state: Dict, hour: datetime, orders: int, cancelled: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+
+class HourlyVolumeDetector(HourlyDetector):
+    """Mevsimsel taban çizgisinden standart sapmalar üzerinde EWMA kontrol grafiği"""
+    name = 'hourly_volume'
+
+    def initial_state(self, cursor, now: datetime) -> Dict:
+        state = super().initial_state(cursor, now)
+        # Dilim (haftanın günü * 24 + saat) başına [gözlem, ortalama, varyans]
+        state.update({'slots': [[0, 0.0, 0.0] for _ in range(7 * 24)], 'ewma': 0.0})
+        return state
+
+    def observe(self, state: Dict, hour: datetime, orders: int, cancelled: int) -> Optional[Dict]:
+        slot = state['slots'][hour.weekday() * 24 + hour.hour]
+        count, mean, var = slot
+        event = None
+
+        if count >= SEASONAL_MIN_OBSERVATIONS:
+            # Poisson tabanı: seyrek dilimlerde varyans ortalamanın altına inmesin
+            std = math.sqrt(max(var, mean, 1.0))
+            state['ewma'] = EWMA_LAMBDA * (orders - mean) / std + (1 - EWMA_LAMBDA) * state['ewma']
+            limit = EWMA_LIMIT_SIGMA * math.sqrt(EWMA_LAMBDA / (2 - EWMA_LAMBDA))
+            if abs(state['ewma']) > limit:
+                spike = state['ewma'] > 0
+                key = _hour_key(hour)
+                description = (f"{key[:16]} saatinde sipariş hacmi {'olağandışı yüksek' if spike else 'olağandışı düşük'}: "
+                               f"{orders} sipariş (bu gün/saat için beklenen ~{mean:.0f})")
+                severity = 'high' if abs(state['ewma']) > limit * 2 else 'medium'
+                event = _event('anomaly.orderSpike' if spike else 'anomaly.orderDrop', 'hour', key,
+                               severity, description, key.replace(' ', 'T') + 'Z')
+                # Sinyalden sonra grafik sıfırlanır; aynı kayma her saat yeniden raporlanmaz
+                state['ewma'] = 0.0
+
+        slot[1], slot[2] = _ewma_step(mean, var, count, orders, SEASONAL_ALPHA)
+        slot[0] = count + 1
+        return event
+
+
+class HourlyCancelRateDetector(HourlyDetector):
+    """Saatlik iptal oranı için EWMA kontrol grafiği (saat kapandığı andaki durumlara göre)"""
+    name = 'hourly_cancel_rate'
+
+    def initial_state(self, cursor, now: datetime) -> Dict:
+        state = super().initial_state(cursor, now)
+        state.update({'count': 0, 'mean': 0.0, 'var': 0.0, 'ewma': None})
+        return state
+
+    def observe(self, state: Dict, hour: datetime, orders: int, cancelled: int) -> Optional[Dict]:
+        if orders < CANCEL_RATE_MIN_ORDERS:
+            return None
+        rate = cancelled / orders
+        event = None
+
+        if state['count'] >= CANCEL_RATE_MIN_OBSERVATIONS:
+            previous = state['mean'] if state['ewma'] is None else state['ewma']
+            state['ewma'] = EWMA_LAMBDA * rate + (1 - EWMA_LAMBDA) * previous
+            # Oranın örneklem varyansı da hesaba katılır (az siparişli saatler daha gürültülü)
+            sigma = math.sqrt(max(state['var'], state['mean'] * (1 - state['mean']) / orders, 1e-6))
+            limit = state['mean'] + EWMA_LIMIT_SIGMA * sigma * math.sqrt(EWMA_LAMBDA / (2 - EWMA_LAMBDA))
+            if state['ewma'] > limit:
+                key = _hour_key(hour)
+                description = (f"{key[:16]} saatinde iptal oranı ({rate * 100:.1f}%) olağandışı yüksek "
+                               f"(beklenen ~{state['mean'] * 100:.1f}%, {cancelled}/{orders} sipariş)")
+                severity = 'high' if rate > state['mean'] * 2 else 'medium'
+                event = _event('anomaly.highCancelRate', 'hour', key, severity, description,
+                               key.replace(' ', 'T') + 'Z')
+                state['ewma'] = None
+
+        state['mean'], state['var'] = _ewma_step(state['mean'], state['var'], state['count'], rate, 0.05)
+        state['count'] += 1
+        return event
+
+
+class OrderAmountDetector(StatisticalDetector):
+    """Ürün bazında akışkan medyan/MAD ile robust z-skoru (0.6745 * (x - medyan) / MAD)"""
+    name = 'order_amount'
+
+    def initial_state(self, cursor, now: datetime) -> Dict:
+        since = (now - timedelta(days=WARMUP_DAYS)).strftime('%Y-%m-%d')
+        # Isınma penceresinden önceki siparişler atlanır: rowid sırası tarih sırası değildir,
+        # bu yüzden filigran 0'dan başlar ve tarih koşulu ilk turda uygulanır
+        return {'last_rowid': 0, 'since': since, 'products': {}}
+
+    def update(self, cursor, state: Dict, now: datetime) -> List[Dict]:
+        query = "SELECT rowid, id, product, amount, date FROM orders WHERE rowid > ?"
+        params = [state['last_rowid']]
+        since = state.pop('since', None)
+        if since:
+            query += " AND ts >= unixepoch(?)"
+            params.append(since)
+        cursor.execute(query + " ORDER BY rowid", params)
+        events_from = (now - timedelta(hours=EVENT_LOOKBACK_HOURS)).strftime('%Y-%m-%d')
+        products = state['products']
+
+        events = []
+        for rowid, order_id, product, amount, date in cursor.fetchall():
+            state['last_rowid'] = max(state['last_rowid'], rowid)
+            model = products.setdefault(product, {'sample': []})
+            event = self.observe(model, order_id, product, amount, date)
+            if event and date >= events_from:
+                events.append(event)
+        return events
+
+    def observe(self, model: Dict, order_id: str, product: str, amount: float, date: str) -> Optional[Dict]:
+        if 'sample' in model:
+            model['sample'].append(amount)
+            if len(model['sample']) >= AMOUNT_WARMUP:
+                sample = sorted(model.pop('sample'))
+                median = sample[len(sample) // 2]
+                deviations = sorted(abs(value - median) for value in sample)
+                model.update({'median': median, 'mad': deviations[len(deviations) // 2]})
+            return None
+
+        median, mad = model['median'], model['mad']
+        # Fiyatı sabit ürünlerde MAD 0 olabilir; medyanın %1'i alt sınırdır
+        scale = max(mad, abs(median) * 0.01, 0.01)
+        z = 0.6745 * (amount - median) / scale
+        event = None
+        if abs(z) > AMOUNT_Z_LIMIT:
+            direction = 'yüksek' if z > 0 else 'düşük'
+            description = (f"{product} siparişinde olağandışı {direction} tutar: {amount:.2f} TL "
+                           f"(ürün medyanı {median:.2f} TL, robust z={z:.1f})")
+            severity = 'high' if abs(z) > AMOUNT_Z_LIMIT * 2 else 'medium'
+            event = _event('anomaly.priceAnomaly', 'order', order_id, severity, description,
+                           date if 'T' in date else f"{date}T00:00:00Z", order_id)
+
+        # Stokastik yaklaşım: her örnek medyanı ve MAD'i ölçek oranında bir adım kaydırır (O(1))
+        step = AMOUNT_STEP * scale
+        model['median'] = median + step * ((amount > median) - (amount < median))
+        deviation = abs(amount - median)
+        model['mad'] = max(mad + step * ((deviation > mad) - (deviation < mad)), 0.0)
+        return event
+
+
+STATISTICAL_DETECTORS: List[StatisticalDetector] = [
+    HourlyVolumeDetector(),
+    HourlyCancelRateDetector(),
+    OrderAmountDetector(),
+]
+
+
+def run_statistical_detectors(cursor, now: Optional[datetime] = None) -> List[Dict]:
+    """Tüm modelleri yeni veriyle güncelle; tespit edilen olayları döndür.
+
+    Durumlar cursor'ın işleminde yazılır; olayların kaydıyla birlikte commit edilmelidir.
+    """
+    now = now or datetime.now()
+    events = []
+    for detector in STATISTICAL_DETECTORS:
+        state = load_state(cursor, detector.name)
+        if state is None:
+            state = detector.initial_state(cursor, now)
+        events.extend(detector.update(cursor, state, now))
+        save_state(cursor, detector.name, state)
+    return events
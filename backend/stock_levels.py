@@ -0,0 +1,61 @@
+"""
+Stok Seviyeleri
+Envanterdeki düşük stoklu ürünler ve son sipariş hızına göre tahmini tükenme süresi.
+Düşük stok koşulu current_stock <= min_stock (yeniden sipariş seviyesi) veya current_stock <
+stockOutThreshold'dur; iki koşul da indeksten okunduğundan maliyet toplam ürün sayısına değil
+düşük stoklu ürün sayısına bağlıdır.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+# Sipariş hızı bu kadar günün ortalamasıdır (iptal edilen siparişler stoktan düşmez)
+VELOCITY_DAYS = 7
+
+LOW_STOCK_COLUMNS = ['id', 'product_name', 'current_stock', 'max_stock', 'min_stock', 'created_at', 'updated_at']
+
+
+def create_low_stock_indexes(cursor):
+    """Düşük stok sorgusunun iki koşulu için indeksler"""
+    # Kısmi indeks sadece yeniden sipariş seviyesinin altındaki satırları içerir
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_inventory_low_stock
+        ON inventory(current_stock) WHERE current_stock <= min_stock
+    """)
+    # current_stock < stockOutThreshold aralık taraması
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inventory_current_stock ON inventory(current_stock)")
+
+
+def fetch_low_stock(conn, threshold: int) -> List[Dict]:
+    """Düşük stoklu ürünleri günlük satış hızı ve tahmini tükenme günüyle getir.
+
+    Satış hızı tespit özetinden (detector_daily) okunur; özet son tespit turuna kadar günceldir.
+    """
+    columns = ', '.join(LOW_STOCK_COLUMNS)
+    cursor = conn.execute(f"""
+        SELECT {columns} FROM inventory WHERE current_stock <= min_stock
+        UNION
+        SELECT {columns} FROM inventory WHERE current_stock < ?
+    """, (threshold,))
+    items = [dict(row) for row in cursor.fetchall()]
+    if not items:
+        return []
+
+    since = (datetime.now() - timedelta(days=VELOCITY_DAYS - 1)).strftime('%Y-%m-%d')
+    cursor = conn.execute("""
+        SELECT product, SUM(orders) FROM detector_daily
+        WHERE day >= ? AND status != 'cancelled' AND product IN (SELECT value FROM json_each(?))
+        GROUP BY product
+    """, (since, json.dumps([item['product_name'] for item in items])))
+    sold = {row[0]: row[1] for row in cursor.fetchall()}
+
+    for item in items:
+        velocity = sold.get(item['product_name'], 0) / VELOCITY_DAYS
+        item['daily_velocity'] = round(velocity, 2)
+        item['days_until_stockout'] = round(item['current_stock'] / velocity, 1) if velocity > 0 else None
+
+    # Önce stoğu bitmiş ürünler, sonra en kısa sürede tükenecekler; hızı 0 olanlar sonda
+    items.sort(key=lambda item: (item['current_stock'] > 0,
+                                 item['days_until_stockout'] if item['days_until_stockout'] is not None else float('inf'),
+                                 item['current_stock'], item['product_name']))
+    return items
@@ -0,0 +1,59 @@
+"""
+Grup anomalisi atfı mühürlenmiş aylarla tutarlı olmalı: geç kargo sayıları ay dosyalarını da içeren
+özetten geldiğinden "en eski geciken" sipariş de ay dosyalarından seçilmeli.
+
+Kullanım (backend dizininden):
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from anomaly_detector import AnomalyDetector
+from database import create_schema
+from db_pool import get_pool
+from partitions import seal_partitions
+
+
+def test_group_attribution_reads_sealed_months(tmp_path):
+    db_path = str(tmp_path / "ecommerce.db")
+    today = datetime.now()
+    # Ürün A'nın bekleyen siparişleri her 10 günde bir; B'nin son 3 günde iptal ve sipariş artışı
+    orders = [(f"ORD-A-{day:03d}", (today - timedelta(days=day)).strftime('%Y-%m-%d'), "Müşteri 1", "Ürün A",
+               100.0, "pending") for day in range(5, 150, 10)]
+    orders += [(f"ORD-B-{day}", (today - timedelta(days=day)).strftime('%Y-%m-%d'), "Müşteri 2", "Ürün B",
+                50.0, "cancelled") for day in range(3)]
+    conn = sqlite3.connect(db_path)
+    try:
+        create_schema(conn)
+        conn.executemany("INSERT INTO orders(id, date, customer, product, amount, status) VALUES (?, ?, ?, ?, ?, ?)",
+                         orders)
+        conn.commit()
+    finally:
+        conn.close()
+
+    detector = AnomalyDetector(db_path)
+    try:
+        detector.refresh_aggregates()
+        conn = get_pool(db_path).acquire()
+        try:
+            assert seal_partitions(conn)
+            # En eski geciken sipariş artık sadece ay dosyasında
+            assert conn.execute("SELECT 1 FROM orders WHERE id = 'ORD-A-145'").fetchone() is None
+        finally:
+            conn.close()
+
+        anomalies = [
+            {'type': 'anomaly.lateShipping', 'scope': 'product', 'subject': 'Ürün A'},
+            {'type': 'anomaly.highCancelRate', 'scope': 'product', 'subject': 'Ürün B'},
+            {'type': 'anomaly.lateShipping', 'scope': 'customer', 'subject': 'Müşteri 1'},
+            {'type': 'anomaly.lateShipping', 'scope': 'product', 'subject': 'Ürün Yok'},
+        ]
+        detector.attribute_group_orders(anomalies, 24)
+        assert [anomaly['orderId'] for anomaly in anomalies] == ["ORD-A-145", "ORD-B-0", "ORD-A-145", None]
+    finally:
+        get_pool(db_path).close_all()
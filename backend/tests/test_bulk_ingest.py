@@ -0,0 +1,115 @@
+"""
+Toplu sipariş yükleme: hatalı satırlar index'leriyle raporlanmalı, geri kalanlar yazılmalı ve
+tetikleyicisiz güncellenen sayaçlar, saatlik özetler ve tespit özeti tablolarla tutarlı kalmalı.
+Parti içinde çakışma olursa (araya başka bir yazıcı girmiş gibi) parti satır satır yeniden yazılır.
+
+Kullanım (backend dizininden):
+    python -m pytest tests
+"""
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import bulk_ingest
+from anomaly_detector import AnomalyDetector
+from bulk_ingest import ingest_orders, parse_bulk_body
+from counters import check_counters
+from database import create_schema
+from db_pool import get_pool
+from detector_aggregates import check_detector_aggregates
+from main import Order
+from partitions import seal_partitions
+from rollups import check_rollups
+
+STATUSES = ("pending", "shipped", "delivered", "cancelled")
+
+
+def day(days_ago: int) -> str:
+    return (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """Son 150 güne siparişleri yazılmış, eski ayları mühürlenmiş veritabanının havuz bağlantısı"""
+    db_path = str(tmp_path / "ecommerce.db")
+    orders = [(f"ORD-{days:03d}", day(days), f"Müşteri {days % 4}", f"Ürün {days % 3}", 100.0, STATUSES[days % 4])
+              for days in range(150)]
+    setup = sqlite3.connect(db_path)
+    try:
+        create_schema(setup)
+        setup.executemany("INSERT INTO orders(id, date, customer, product, amount, status) VALUES (?, ?, ?, ?, ?, ?)",
+                          orders)
+        setup.commit()
+        AnomalyDetector(db_path).refresh_aggregates()
+        assert seal_partitions(setup)
+    finally:
+        setup.close()
+
+    connection = get_pool(db_path).acquire()
+    yield connection
+    connection.close()
+    get_pool(db_path).close_all()
+
+
+def bulk_body() -> bytes:
+    lines = [
+        json.dumps({'id': 'NEW-1', 'date': day(0), 'customer': 'Müşteri Yeni', 'product': 'Ürün Yeni',
+                    'amount': 10.5, 'status': 'pending'}),
+        '{"id": "BOZUK", ',
+        json.dumps({'id': 'NEW-1', 'date': day(1), 'customer': 'Müşteri 1', 'product': 'Ürün 1',
+                    'amount': 20.0, 'status': 'shipped'}),
+        # Sıcak tablodaki ve mühürlenmiş aydaki mevcut siparişler
+        json.dumps({'id': 'ORD-002', 'date': day(2), 'customer': 'Müşteri 2', 'product': 'Ürün 2',
+                    'amount': 30.0, 'status': 'delivered'}),
+        json.dumps({'id': 'ORD-140', 'date': day(3), 'customer': 'Müşteri 3', 'product': 'Ürün 0',
+                    'amount': 40.0, 'status': 'cancelled'}),
+        json.dumps({'id': 'NEW-2', 'date': f"{day(1)}T09:15:00Z", 'customer': 'Müşteri 1', 'product': 'Ürün 1',
+                    'amount': 50.0, 'status': 'cancelled', 'anomaly': 'anomaly.highCancelRate', 'severity': 'high'}),
+        json.dumps({'id': 'NEW-3', 'date': day(4), 'customer': 'Müşteri 1', 'product': 'Ürün 1',
+                    'amount': 'çok', 'status': 'pending'}),
+        '',
+        json.dumps({'id': 'NEW-4', 'date': day(120), 'customer': 'Müşteri 2', 'product': 'Ürün 2',
+                    'amount': 60.0, 'status': 'shipped'}),
+    ]
+    return "\n".join(lines).encode('utf-8')
+
+
+def assert_ingested(conn, result):
+    assert [error['index'] for error in result['errors']] == [1, 2, 3, 4, 6]
+    assert [error['id'] for error in result['errors']] == [None, 'NEW-1', 'ORD-002', 'ORD-140', 'NEW-3']
+    assert result['received'] == 8
+    assert result['inserted'] == 3
+    assert result['failed'] == 5
+
+    stored = conn.execute("SELECT id, amount FROM orders WHERE id LIKE 'NEW-%' ORDER BY id").fetchall()
+    assert [tuple(row) for row in stored] == [('NEW-1', 10.5), ('NEW-2', 50.0), ('NEW-4', 60.0)]
+    assert conn.execute("SELECT amount FROM orders WHERE id = 'ORD-002'").fetchone()[0] == 100.0
+    assert conn.execute("SELECT COUNT(*) FROM bulk_load").fetchone()[0] == 0
+
+    cursor = conn.cursor()
+    assert check_counters(cursor) == []
+    assert check_rollups(cursor) == []
+    assert check_detector_aggregates(cursor) == []
+
+
+def test_bulk_ingest_reports_rejected_rows(conn):
+    records, parse_errors = parse_bulk_body(bulk_body(), "application/x-ndjson")
+    result = ingest_orders(conn, records, Order, parse_errors, batch_size=3)
+    assert_ingested(conn, result)
+
+
+def test_bulk_ingest_falls_back_to_per_row_inserts(conn, monkeypatch):
+    # Ön kontrol mevcut numaraları göremez (kontrolden sonra başka bir yazıcı eklemiş gibi); parti
+    # IntegrityError ile geri alınıp satır satır yazılır
+    monkeypatch.setattr(bulk_ingest, "_existing_ids", lambda conn, ids: set())
+    records, parse_errors = parse_bulk_body(bulk_body(), "application/x-ndjson")
+    result = ingest_orders(conn, records, Order, parse_errors, batch_size=3)
+    assert_ingested(conn, result)
+    assert all('UNIQUE constraint failed' in error['error'] for error in result['errors'][2:4])
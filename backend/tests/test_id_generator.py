@@ -0,0 +1,48 @@
+"""
+Anomali kimliği üreticisi: fork ve spawn ile başlatılan süreçlerde (her birinde birden çok thread)
+üretilen kimlikler çakışmamalı, her thread'in kimlikleri kesin artan olmalı. Süreçler
+benchmarks/stress_anomaly_ids.py'deki üretim ve doğrulama adımlarıyla, sınırlı sayıda kimlikle çalışır.
+
+Kullanım (backend dizininden):
+    python -m pytest tests
+"""
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import id_generator
+from benchmarks.stress_anomaly_ids import run
+from id_generator import MAX_SEQUENCE, IdGenerator, anomaly_ids, id_timestamp_ms
+
+PROCESSES = 4
+THREADS = 2
+IDS_PER_PROCESS = 200000
+
+START_METHODS = [method for method in ("fork", "spawn") if method in multiprocessing.get_all_start_methods()]
+
+
+@pytest.mark.parametrize("method", START_METHODS)
+def test_no_collisions_across_processes(tmp_path, method):
+    # fork ile başlayan çocuklar üreticinin bu durumunu (pid, sıra, önbellek) devralır
+    anomaly_ids.next_ids(1000)
+    total, duplicates, unordered, _ = run(method, PROCESSES, IDS_PER_PROCESS, THREADS, str(tmp_path))
+    assert total == PROCESSES * IDS_PER_PROCESS
+    assert duplicates == 0
+    assert unordered == 0
+
+
+def test_sequence_rollover_advances_clock(monkeypatch):
+    # Saat durdurulur: aynı milisaniyenin sıra numaraları bitince mantıksal saat ilerlemeli
+    now_ms = 1700000000000
+    monkeypatch.setattr(id_generator.time, "time", lambda: now_ms / 1000)
+    generator = IdGenerator('TST')
+    ids = [generator.next_id() for _ in range(10)] + generator.next_ids(3 * (MAX_SEQUENCE + 1))
+    assert len(set(ids)) == len(ids)
+    assert all(earlier < later for earlier, later in zip(ids, ids[1:]))
+    assert id_timestamp_ms(ids[0]) == now_ms
+    assert id_timestamp_ms(ids[-1]) == now_ms + 3
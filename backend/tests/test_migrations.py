@@ -0,0 +1,103 @@
+"""
+Sıkıştırılmış sipariş depolamasına dönüşüm (migrasyon 14) partiler halinde commit eder; yarıda
+kesilirse migrasyon yeniden çalışır ve kopyalama order_rows'taki son rowid'den devam eder. Devam
+eden dönüşüm sonunda siparişler, rowid'leri, /orders satırları, sayaçlar ve özetler değişmemeli.
+
+Kullanım (backend dizininden):
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import migrations
+from counters import check_counters
+from database import create_schema
+from detector_aggregates import check_detector_aggregates
+from main import ORDER_COLUMNS, fetch_orders
+from migrations import MIGRATIONS, SCHEMA_VERSION, apply_migrations, get_schema_version
+from order_store import ORDER_ROWS_TABLE
+from rollups import check_rollups
+
+COMPACT_VERSION = 14
+BATCH_SIZE = 25
+STATUSES = ("pending", "shipped", "delivered", "cancelled")
+ANOMALIES = (None, None, "anomaly.lateShipping", "anomaly.highCancelRate")
+# DATE_FORMATS'taki üç biçim ve epoch'tan aynen geri üretilemeyen (date_text'te saklanan) bir tarih
+DATES = ("2025-03-{day:02d}", "2025-03-{day:02d}T10:30:00Z", "2025-03-{day:02d} 08:15:00", "2025-03-{day:02d}T10:30:00+03:00")
+
+
+def build_baseline(db_path: str):
+    """Migrasyonlardan önceki şemayla siparişleri yaz, sonra dönüşümden önceki sürüme kadar migre et"""
+    orders = [
+        (f"ORD-{index:04d}", DATES[index % len(DATES)].format(day=index % 28 + 1), f"Müşteri {index % 9}",
+         f"Ürün {index % 5}", 10.0 + index, STATUSES[index % len(STATUSES)], ANOMALIES[index % len(ANOMALIES)],
+         "high" if index % 7 == 0 else None)
+        for index in range(120)
+    ]
+    conn = sqlite3.connect(db_path)
+    try:
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(migrations, "MIGRATIONS", [])
+            create_schema(conn)
+        conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)", orders)
+        # rowid boşlukları: dönüşüm rowid'leri korumalı
+        conn.execute("DELETE FROM orders WHERE id IN ('ORD-0003', 'ORD-0040', 'ORD-0041', 'ORD-0077')")
+        conn.commit()
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(migrations, "MIGRATIONS", MIGRATIONS[:COMPACT_VERSION - 1])
+            apply_migrations(conn)
+        assert get_schema_version(conn) == COMPACT_VERSION - 1
+    finally:
+        conn.close()
+
+
+def test_compact_conversion_resumes_after_interruption(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "ecommerce.db")
+    build_baseline(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        before = [tuple(row) for row in conn.execute("SELECT rowid, * FROM orders ORDER BY rowid").fetchall()]
+
+        # İlk parti commit edildikten sonra ikinci parti kopyalanırken kesilir
+        monkeypatch.setattr(migrations, "CONVERT_BATCH_SIZE", BATCH_SIZE)
+        copy = migrations.copy_legacy_orders
+        copies = []
+
+        def interrupted_copy(cursor, legacy, after_rowid, last_rowid):
+            if copies:
+                raise sqlite3.OperationalError("dönüşüm kesildi")
+            copies.append(last_rowid)
+            copy(cursor, legacy, after_rowid, last_rowid)
+
+        monkeypatch.setattr(migrations, "copy_legacy_orders", interrupted_copy)
+        with pytest.raises(sqlite3.OperationalError):
+            apply_migrations(conn)
+        assert get_schema_version(conn) == COMPACT_VERSION - 1
+        assert conn.execute(f"SELECT COUNT(*), MAX(rowid) FROM {ORDER_ROWS_TABLE}").fetchone()[:] == (BATCH_SIZE, copies[0])
+
+        monkeypatch.setattr(migrations, "copy_legacy_orders", copy)
+        apply_migrations(conn)
+        assert get_schema_version(conn) == SCHEMA_VERSION
+
+        after = [tuple(row) for row in conn.execute(f"SELECT rowid, {', '.join(ORDER_COLUMNS)} FROM orders ORDER BY rowid").fetchall()]
+        assert after == before
+
+        # /orders satırları: aynı sütunlar ve değerler, tarihe göre yeniden eskiye
+        rows = list(fetch_orders(conn, ORDER_COLUMNS))
+        assert {row['id']: tuple(row[column] for column in ORDER_COLUMNS) for row in rows} == \
+            {values[1]: values[1:] for values in before}
+        assert [row['sort_ts'] for row in rows] == sorted((row['sort_ts'] for row in rows), reverse=True)
+
+        cursor = conn.cursor()
+        assert check_counters(cursor) == []
+        assert check_rollups(cursor) == []
+        assert check_detector_aggregates(cursor) == []
+    finally:
+        conn.close()
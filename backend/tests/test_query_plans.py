@@ -0,0 +1,147 @@
+"""
+Sorgu planları: /orders, anomali tespiti ve saklama turlarının gerçekte çalıştırdığı sorgular hiçbir
+tabloyu indekssiz taramamalı. Sorgular elle kopyalanmaz; kod yolları migrasyonları uygulanmış ve ayları
+mühürlenmiş geçici bir veritabanında çalıştırılırken bağlantının izleme (trace) çıktısından toplanır.
+
+Kullanım (backend dizininden):
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from anomaly_detector import AnomalyDetector
+from database import init_database
+from db_pool import get_pool
+from main import ORDER_COLUMNS, build_order_search_query, fetch_orders
+from partitions import attached_partitions, order_partitions, seal_partitions
+from retention import run_retention
+from rollups import fetch_buckets
+
+STATUSES = ("pending", "shipped", "delivered", "cancelled")
+
+# Tam taranması beklenen küçük kayıt tabloları; "s" /orders?sort=relevance'ta order_search eşleşmeleridir
+ALLOWED_SCANS = {'order_partitions', 'retention_policies', 'sqlite_master', 'main.orders_fts_config', 's'}
+
+
+def full_scans(conn, statements):
+    """İzlenen SELECT sorgularının planlarında indekssiz tablo taramalarını döndür"""
+    failures = []
+    for sql in statements:
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            continue
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall():
+            step = row[3]
+            # "SCAN t USING INDEX ..." indeks sırasıyla, "SCAN json_each VIRTUAL TABLE INDEX ..." sanal
+            # tablo indeksiyle okur; "SCAN (subquery-N)", CTE'ler ve sabit satırlar zaten süzülmüş sonuçlardır
+            if (not step.startswith("SCAN ") or " USING " in step or " VIRTUAL TABLE INDEX " in step
+                    or step.startswith(("SCAN (subquery", "SCAN order_search", "SCAN CONSTANT ROW"))):
+                continue
+            if step.split()[1] not in ALLOWED_SCANS:
+                failures.append(f"{step}: {' '.join(sql.split())[:160]}")
+    return failures
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    """Örnek verili, 40-160 gün önceki siparişleri ay dosyalarına mühürlenmiş veritabanı"""
+    path = str(tmp_path_factory.mktemp("plans") / "ecommerce.db")
+    init_database(path)
+    today = datetime.now()
+    orders = [
+        (f"OLD-{day:03d}-{index}", (today - timedelta(days=day)).strftime('%Y-%m-%d'), f"Müşteri {index}",
+         f"Ürün {day % 5}", 10.0 + index, STATUSES[(day + index) % len(STATUSES)])
+        for day in range(40, 160) for index in range(3)
+    ]
+    conn = sqlite3.connect(path)
+    try:
+        conn.executemany("INSERT INTO orders(id, date, customer, product, amount, status) VALUES (?, ?, ?, ?, ?, ?)",
+                         orders)
+        conn.commit()
+        # Değişiklik günlüğü mühürlemeden önce özete katlanır (tespit turlarının yaptığı gibi)
+        AnomalyDetector(path).refresh_aggregates()
+        assert seal_partitions(conn)
+    finally:
+        conn.close()
+    yield path
+    get_pool(path).close_all()
+
+
+@contextmanager
+def traced(db_path):
+    """Havuzdan bu thread'in bağlantısını al ve çalıştırılan sorguları listeye topla.
+
+    Aynı thread'deki get_pool(db_path).acquire() çağrıları (ör. AnomalyDetector) bu bağlantıyı kullanır.
+    """
+    statements = []
+    conn = get_pool(db_path).acquire()
+    conn.set_trace_callback(statements.append)
+    try:
+        yield conn, statements
+    finally:
+        conn.set_trace_callback(None)
+        conn.close()
+
+
+def assert_no_full_scans(db_path, statements):
+    assert statements
+    # Sorgular ay dosyalarının şema adlarıyla izlenir; planlar aynı adlarla bağlanmış aylarda çıkarılır
+    conn = sqlite3.connect(db_path)
+    try:
+        with attached_partitions(conn, order_partitions(conn)):
+            conn.execute("CREATE TEMP TABLE order_search (rowid INTEGER PRIMARY KEY, rank REAL)")
+            assert full_scans(conn, statements) == []
+    finally:
+        conn.close()
+
+
+def days_ago(days: int) -> str:
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+ORDER_QUERIES = {
+    'sayfa': {},
+    'status': {'status': 'shipped'},
+    'tarih (sıcak aylar)': {'date_from': days_ago(10), 'date_to': days_ago(0)},
+    'tarih (ay dosyaları)': {'date_from': days_ago(100), 'date_to': days_ago(60)},
+    'arama': {'match': build_order_search_query('müşteri')},
+    'arama (skor)': {'match': build_order_search_query('müşteri'), 'by_relevance': True},
+}
+
+
+@pytest.mark.parametrize("filters", ORDER_QUERIES.values(), ids=ORDER_QUERIES.keys())
+def test_orders_queries_use_indexes(db_path, filters):
+    with traced(db_path) as (conn, statements):
+        # Sayfa boyu sıcak aylardaki siparişlerden büyük: dilimler ay dosyalarına da iner
+        rows = list(fetch_orders(conn, ORDER_COLUMNS, limit=2500, **filters))
+    assert rows
+    assert_no_full_scans(db_path, statements)
+
+
+def test_orders_cursor_query_uses_indexes(db_path):
+    with traced(db_path) as (conn, statements):
+        page = list(fetch_orders(conn, ORDER_COLUMNS, limit=50))
+        rows = list(fetch_orders(conn, ORDER_COLUMNS, after=(page[-1]['date'], page[-1]['id']), limit=2500))
+    assert rows
+    assert_no_full_scans(db_path, statements)
+
+
+def test_detection_queries_use_indexes(db_path):
+    with traced(db_path) as (conn, statements):
+        AnomalyDetector(db_path).run()
+        fetch_buckets(conn, f"{days_ago(30)} 00:00:00", f"{days_ago(0)} 00:00:00", 'day')
+    assert_no_full_scans(db_path, statements)
+
+
+def test_retention_queries_use_indexes(db_path):
+    with traced(db_path) as (conn, statements):
+        run_retention(conn, dry_run=True)
+        run_retention(conn, max_batches=2)
+    assert_no_full_scans(db_path, statements)
@@ -0,0 +1,68 @@
+"""
+Çok pencereli motorun mühürlenmiş aylarla tutarlılığı: anlık görüntü ay dosyalarındaki siparişleri
+de içermeli, geç kargo sayıları tespitin özet tablosundan saydığıyla aynı olmalı.
+
+Kullanım (backend dizininden):
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from anomaly_detector import AnomalyDetector
+from database import create_schema
+from db_pool import get_pool
+from partitions import seal_partitions
+from window_engine import evaluate_windows, load_snapshot
+
+LATE_THRESHOLDS_HOURS = (24, 48, 72)
+STATUSES = ("pending", "shipped", "delivered", "cancelled")
+
+
+def build_database(db_path: str, days: int = 150) -> int:
+    """Son `days` güne her gün birkaç sipariş yaz; yazılan sipariş sayısını döndür"""
+    today = datetime.now()
+    orders = [
+        (f"ORD-{day:03d}-{index}", (today - timedelta(days=day)).strftime('%Y-%m-%d'),
+         f"Müşteri {index}", f"Ürün {(day + index) % 7}", 100.0 + index, STATUSES[(day + index) % len(STATUSES)])
+        for day in range(days) for index in range(day % 4 + 1)
+    ]
+    conn = sqlite3.connect(db_path)
+    try:
+        create_schema(conn)
+        conn.executemany("INSERT INTO orders(id, date, customer, product, amount, status) VALUES (?, ?, ?, ?, ?, ?)",
+                         orders)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(orders)
+
+
+def test_window_counts_include_sealed_months(tmp_path):
+    db_path = str(tmp_path / "ecommerce.db")
+    total = build_database(db_path)
+    detector = AnomalyDetector(db_path)
+    try:
+        # Değişiklik günlüğü mühürlemeden önce özete katlanır (tespit turlarının yaptığı gibi)
+        detector.refresh_aggregates()
+        conn = get_pool(db_path).acquire()
+        try:
+            sealed = seal_partitions(conn)
+            assert sealed and sum(sealed.values()) > 0
+            hot = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+            assert hot < total
+
+            snapshot = load_snapshot(conn)
+        finally:
+            conn.close()
+
+        assert len(snapshot) == total
+        metrics = evaluate_windows(snapshot, late_thresholds_hours=LATE_THRESHOLDS_HOURS)
+        expected = [detector.count_late_shipping_orders(hours) for hours in LATE_THRESHOLDS_HOURS]
+        assert [int(count) for count in metrics.late_counts] == expected
+    finally:
+        get_pool(db_path).close_all()
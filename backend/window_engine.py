@@ -0,0 +1,212 @@
+"""
+Çok Pencereli Tespit Motoru
+Siparişleri bir kez NumPy sütun dizilerine (epoch zaman damgası, durum kodu, ürün kodu, tutar)
+yükler; iptal oranı, geç kargo sayıları ve ürün bazlı talebi birden çok pencere (1s/6s/24s/7g)
+için tek vektörel geçişte hesaplar.
+
+Her siparişin yaşı pencere ve eşik sınırlarına göre bir kovaya atanır; (kova, durum) ve
+(kova, ürün) histogramları bincount ile bir kez çıkarılır. Pencereler iç içe olduğundan
+pencere sayıları histogramların kümülatif toplamıdır; geç kargo ise eşikten yaşlı kovaların toplamıdır.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from order_store import DAY_SECONDS, DICTIONARY_TABLES, KNOWN_VALUES
+from partitions import each_order_table
+
+STATUSES = ('pending', 'shipped', 'delivered', 'cancelled')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+# Bilinmeyen durumlar için ayrılan kod
+OTHER_STATUS = len(STATUSES)
+LATE_STATUSES = ('pending', 'shipped')
+
+DEFAULT_WINDOWS_HOURS = (1, 6, 24, 7 * 24)
+DEFAULT_LATE_THRESHOLDS_HOURS = (24, 48, 72)
+
+SNAPSHOT_DTYPE = np.dtype([('ts', 'i8'), ('status', 'i1'), ('product', 'i4'), ('amount', 'f8')])
+
+# Anahtar değişmese de anlık görüntü bu süreden eski ise yeniden yüklenir (API dışı yazmalar için)
+SNAPSHOT_MAX_AGE_SECONDS = 300
+
+
+class OrderSnapshot:
+    """orders tablosunun sütunlu kopyası; ürünler products listesindeki index ile kodlanır"""
+
+    def __init__(self, columns: np.ndarray, products: List[str], loaded_at: float):
+        self.ts = columns['ts']
+        self.status = columns['status']
+        self.product = columns['product']
+        self.amount = columns['amount']
+        self.products = products
+        self.loaded_at = loaded_at
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+def load_snapshot(conn) -> OrderSnapshot:
+    """Siparişleri (mühürlenmiş aylar dahil) sütun dizilerine yükle.
+
+    Ad birleştirmesi yapılmadan doğrudan order_rows ve ay dosyaları okunur; tarih ts epoch saniyesinden
+    (ayın kaydırılan günleriyle), durum kodu SQLite içinde hesaplanır. Ürün anahtarı ada göre sıralı
+    products listesindeki index'e NumPy ile çevrilir; Python tarafında satır başına sadece fromiter
+    döngüsü çalışır. Tarihi çözülemeyen satırlar atlanır.
+    """
+    status_case = " ".join(f"WHEN {code} THEN {STATUS_CODES[status]}"
+                           for code, status in enumerate(KNOWN_VALUES['status'], start=1))
+    cursor = conn.cursor()
+    # Havuz bağlantıları sqlite3.Row döndürür; fromiter düz demet bekler
+    cursor.row_factory = None
+    parts = []
+    for source_cursor, table, shift_days in each_order_table(cursor):
+        source_cursor.execute(f"""
+            SELECT r.ts + {shift_days * DAY_SECONDS},
+                   CASE r.status_id {status_case} ELSE {OTHER_STATUS} END,
+                   r.product_id,
+                   r.amount
+            FROM {table} r
+            WHERE r.ts IS NOT NULL
+        """)
+        parts.append(np.fromiter(source_cursor, dtype=SNAPSHOT_DTYPE))
+    columns = np.concatenate(parts)
+
+    # Sözlük satırlardan sonra okunur: yükleme sırasında eklenen ürünlerin anahtarları da bulunur
+    rows = cursor.execute(f"SELECT id, name FROM {DICTIONARY_TABLES['product']} ORDER BY name").fetchall()
+    products = [name for _, name in rows]
+    codes = np.zeros(max((product_id for product_id, _ in rows), default=0) + 1, dtype=np.int32)
+    codes[[product_id for product_id, _ in rows]] = np.arange(len(rows), dtype=np.int32)
+    columns['product'] = codes[columns['product']]
+    return OrderSnapshot(columns, products, time.time())
+
+
+class SnapshotCache:
+    """Son yüklenen anlık görüntüyü anahtarıyla (ör. orders tablo sürümü) saklar.
+
+    Yükleme satır sayısıyla doğrusal ve hesaplamadan çok daha pahalıdır; anahtar değişmedikçe
+    aynı görüntü tüm isteklerde paylaşılır.
+    """
+
+    def __init__(self, max_age_seconds: float = SNAPSHOT_MAX_AGE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._key: Optional[Hashable] = None
+        self._snapshot: Optional[OrderSnapshot] = None
+        self.loads = 0
+        self.hits = 0
+
+    def get(self, key: Hashable, load: Callable[[], OrderSnapshot]) -> OrderSnapshot:
+        with self._lock:
+            snapshot = self._snapshot
+            if (snapshot is None or key != self._key
+                    or time.time() - snapshot.loaded_at > self.max_age_seconds):
+                snapshot = load()
+                self._snapshot, self._key = snapshot, key
+                self.loads += 1
+            else:
+                self.hits += 1
+            return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshot, self._key = None, None
+
+
+class WindowMetrics:
+    """evaluate_windows sonucu: pencere başına durum/ürün sayıları, ciro ve eşik başına geç kargo"""
+
+    def __init__(self, now: int, windows_hours: Sequence[int], late_thresholds_hours: Sequence[int],
+                 status_counts: np.ndarray, product_counts: np.ndarray, revenue: np.ndarray,
+                 late_counts: np.ndarray, products: List[str]):
+        self.now = now
+        self.windows_hours = list(windows_hours)
+        self.late_thresholds_hours = list(late_thresholds_hours)
+        self.status_counts = status_counts      # (pencere, durum)
+        self.product_counts = product_counts    # (pencere, ürün)
+        self.revenue = revenue                  # (pencere,)
+        self.late_counts = late_counts          # (eşik,)
+        self.products = products
+
+    def cancel_rate(self, window_index: int) -> float:
+        counts = self.status_counts[window_index]
+        total = int(counts.sum())
+        if total == 0:
+            return 0.0
+        return float(counts[STATUS_CODES['cancelled']]) / total * 100
+
+    def top_products(self, window_index: int, limit: int = 5) -> List[Dict]:
+        counts = self.product_counts[window_index]
+        order = np.argsort(-counts, kind='stable')[:limit]
+        return [{'product': self.products[code], 'orders': int(counts[code])} for code in order if counts[code] > 0]
+
+    def to_dict(self, top_products: int = 5) -> Dict:
+        windows = []
+        for index, hours in enumerate(self.windows_hours):
+            counts = self.status_counts[index]
+            windows.append({
+                'hours': hours,
+                'orders': int(counts.sum()),
+                'cancelled': int(counts[STATUS_CODES['cancelled']]),
+                'cancel_rate': round(self.cancel_rate(index), 2),
+                'revenue': round(float(self.revenue[index]), 2),
+                'top_products': self.top_products(index, top_products),
+            })
+        return {
+            'now': datetime.fromtimestamp(self.now, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'windows': windows,
+            'late_shipping': [
+                {'threshold_hours': hours, 'orders': int(count)}
+                for hours, count in zip(self.late_thresholds_hours, self.late_counts)
+            ],
+        }
+
+
+def evaluate_windows(snapshot: OrderSnapshot, now: Optional[int] = None,
+                     windows_hours: Sequence[int] = DEFAULT_WINDOWS_HOURS,
+                     late_thresholds_hours: Sequence[int] = DEFAULT_LATE_THRESHOLDS_HOURS) -> WindowMetrics:
+    """Tüm pencere ve eşikleri tek geçişte hesapla.
+
+    Pencere W: son W saat (yaş < W). Geç kargo T: LATE_STATUSES durumunda ve yaşı >= T saat.
+    """
+    now = int(time.time()) if now is None else int(now)
+    bounds_hours = sorted(set(windows_hours) | set(late_thresholds_hours))
+    bounds = np.array(bounds_hours, dtype=np.int64) * 3600
+    bucket_count = len(bounds) + 1
+    status_count = OTHER_STATUS + 1
+    product_count = max(len(snapshot.products), 1)
+
+    # Kova k: bounds[k-1] <= yaş < bounds[k]; gelecekteki siparişler ilk kovaya düşer
+    bucket = np.searchsorted(bounds, now - snapshot.ts, side='right')
+
+    status_hist = np.bincount(bucket * status_count + snapshot.status,
+                              minlength=bucket_count * status_count).reshape(bucket_count, status_count)
+    product_hist = np.bincount(bucket * product_count + snapshot.product,
+                               minlength=bucket_count * product_count).reshape(bucket_count, product_count)
+    revenue_hist = np.bincount(bucket, weights=snapshot.amount, minlength=bucket_count)
+
+    # Pencere W = bounds[k] için yaş < W, yani kova <= k
+    window_rows = [bounds_hours.index(hours) for hours in windows_hours]
+    status_cumulative = np.cumsum(status_hist, axis=0)
+    product_cumulative = np.cumsum(product_hist, axis=0)
+    revenue_cumulative = np.cumsum(revenue_hist)
+
+    # Eşik T = bounds[k] için yaş >= T, yani kova >= k + 1
+    late_codes = [STATUS_CODES[status] for status in LATE_STATUSES]
+    late_per_bucket = status_hist[:, late_codes].sum(axis=1)
+    late_from = np.cumsum(late_per_bucket[::-1])[::-1]
+    late_counts = np.array([late_from[bounds_hours.index(hours) + 1] for hours in late_thresholds_hours],
+                           dtype=np.int64)
+
+    return WindowMetrics(
+        now,
+        windows_hours,
+        late_thresholds_hours,
+        status_cumulative[window_rows],
+        product_cumulative[window_rows],
+        revenue_cumulative[window_rows],
+        late_counts,
+        snapshot.products,
+    )
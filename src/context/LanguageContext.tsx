@@ -38,6 +38,7 @@ const translations = {
     'orders.title': 'Order Management',
     'orders.subtitle': 'View and manage all orders across your marketplace channels',
     'orders.search': 'Search orders...',
+    'orders.loadMore': 'Load more',
     'orders.allStatus': 'All Status',
     'orders.pending': 'Pending',
     'orders.processing': 'Processing',
@@ -65,6 +66,8 @@ const translations = {
     'anomalies.stockOut': 'Stock Out',
     'anomalies.lateShipping': 'Late Shipping',
     'anomalies.priceAnomaly': 'Price Anomaly',
+    'anomalies.orderSpike': 'Order Spike',
+    'anomalies.orderDrop': 'Order Drop',
     
     // Notifications
     'notifications.title': 'Notifications Center',
@@ -229,12 +232,16 @@ const translations = {
     'anomaly.stockOut': 'Stock Out',
     'anomaly.lateShipping': 'Late Shipping',
     'anomaly.priceAnomaly': 'Price Anomaly',
+    'anomaly.orderSpike': 'Order Spike',
+    'anomaly.orderDrop': 'Order Drop',
     
     // Anomaly descriptions
     'anomaly.desc.highCancelRate': 'High cancellation rate detected',
     'anomaly.desc.stockOut': 'Stock shortage detected',
     'anomaly.desc.lateShipping': 'Shipping delays detected',
     'anomaly.desc.priceAnomaly': 'Price fluctuation detected',
+    'anomaly.desc.orderSpike': 'Unusual increase in orders detected',
+    'anomaly.desc.orderDrop': 'Unusual drop in orders detected',
     'anomaly.desc.generalCategory': 'General category anomaly - no specific order',
     
     // Notification types
@@ -272,6 +279,7 @@ const translations = {
     'orders.title': 'Sipariş Yönetimi',
     'orders.subtitle': 'Tüm pazar yeri kanallarınızdaki siparişleri görüntüleyin ve yönetin',
     'orders.search': 'Sipariş ara...',
+    'orders.loadMore': 'Daha fazla yükle',
     'orders.allStatus': 'Tüm Durumlar',
     'orders.pending': 'Beklemede',
     'orders.processing': 'İşleniyor',
@@ -299,6 +307,8 @@ const translations = {
     'anomalies.stockOut': 'Stok Tükendi',
     'anomalies.lateShipping': 'Geç Kargo',
     'anomalies.priceAnomaly': 'Fiyat Anomalisi',
+    'anomalies.orderSpike': 'Sipariş Artışı',
+    'anomalies.orderDrop': 'Sipariş Düşüşü',
     
     // Notifications
     'notifications.title': 'Bildirim Merkezi',
@@ -463,12 +473,16 @@ const translations = {
     'anomaly.stockOut': 'Stok Tükendi',
     'anomaly.lateShipping': 'Geç Kargo',
     'anomaly.priceAnomaly': 'Fiyat Anomalisi',
+    'anomaly.orderSpike': 'Sipariş Artışı',
+    'anomaly.orderDrop': 'Sipariş Düşüşü',
     
     // Anomaly descriptions
     'anomaly.desc.highCancelRate': 'Yüksek iptal oranı tespit edildi',
     'anomaly.desc.stockOut': 'Stok sıkıntısı tespit edildi',
     'anomaly.desc.lateShipping': 'Kargo gecikmeleri tespit edildi',
     'anomaly.desc.priceAnomaly': 'Fiyat dalgalanması tespit edildi',
+    'anomaly.desc.orderSpike': 'Olağandışı sipariş artışı tespit edildi',
+    'anomaly.desc.orderDrop': 'Olağandışı sipariş düşüşü tespit edildi',
     'anomaly.desc.generalCategory': 'Genel kategori anomalisi - belirli sipariş yok',
     
     // Notification types
@@ -54,7 +54,9 @@ export default function Anomalies() {
     'anomaly.lateShipping': { en: 'Shipping Delay Anomaly', tr: 'Kargo Gecikme Anomalisi' },
     'price_anomaly': { en: 'Price Anomaly', tr: 'Fiyat Anomalisi' },
     'anomaly.priceAnomaly': { en: 'Price Anomaly', tr: 'Fiyat Anomalisi' },
-    'anomaly.priceFluctuation': { en: 'Price Fluctuation Anomaly', tr: 'Fiyat Dalgalanma Anomalisi' }
+    'anomaly.priceFluctuation': { en: 'Price Fluctuation Anomaly', tr: 'Fiyat Dalgalanma Anomalisi' },
+    'anomaly.orderSpike': { en: 'Order Spike Anomaly', tr: 'Sipariş Artışı Anomalisi' },
+    'anomaly.orderDrop': { en: 'Order Drop Anomaly', tr: 'Sipariş Düşüşü Anomalisi' }
   };
 
   // Anomali açıklamaları için çeviri eşleştirmesi  
@@ -408,12 +410,9 @@ export default function Anomalies() {
       // Önce ayarları güncelle
       await apiService.updateSettings(updatedSettings);
       
-      // Sonra yeni eşiklere dayalı taze anomaliler almak için anomali tespitini tetikle
+      // Ayar kaydı tespiti kuyruğa alır; bu istek aynı işe eklenir ve iş bitene kadar beklenir
       await apiService.triggerAnomalyDetection();
       
-      // Veritabanı işlemlerinin tamamlanmasını sağlamak için küçük gecikme
-      await new Promise(resolve => setTimeout(resolve, 500));
-      
       // Mevcut eşik ayarlarına göre filtrelenmiş anomalileri getir
       const filteredAnomalies = await apiService.getFilteredAnomalies({
         cancel_rate_threshold: thresholds.cancelRateThreshold,
@@ -610,6 +609,21 @@ export default function Anomalies() {
                   </div>
                 )}
                 
+                {selectedAnomaly.subject && selectedAnomaly.scope !== 'order' && (
+                  <div className="bg-gray-50 dark:bg-gray-700 rounded-lg p-4">
+                    <h4 className="text-sm font-medium text-gray-900 dark:text-white mb-1">
+                      {selectedAnomaly.scope === 'customer'
+                        ? (language === 'tr' ? 'İlgili Müşteri' : 'Related Customer')
+                        : selectedAnomaly.scope === 'hour'
+                          ? (language === 'tr' ? 'İlgili Saat' : 'Related Hour')
+                          : (language === 'tr' ? 'İlgili Ürün' : 'Related Product')}
+                    </h4>
+                    <p className="text-gray-900 dark:text-white font-medium">
+                      {selectedAnomaly.subject}
+                    </p>
+                  </div>
+                )}
+                
                 {selectedAnomaly.orderId ? (
                   <div className="bg-gray-50 dark:bg-gray-700 rounded-lg p-4">
                     <h4 className="text-sm font-medium text-gray-900 dark:text-white mb-1">
@@ -8,13 +8,16 @@ export default function OrderList() {
   const { t } = useLanguage();
   const [orders, setOrders] = useState<Order[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   useEffect(() => {
     const fetchOrders = async () => {
       try {
         setLoading(true);
-        const ordersData = await apiService.getOrders();
-        setOrders(ordersData);
+        const page = await apiService.getOrdersPage();
+        setOrders(page.orders);
+        setNextCursor(page.nextCursor);
       } catch (error) {
         console.error('Siparişler getirilirken hata:', error);
       } finally {
@@ -25,6 +28,20 @@ export default function OrderList() {
     fetchOrders();
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await apiService.getOrdersPage(undefined, nextCursor);
+      setOrders(prev => [...prev, ...page.orders]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Sonraki sipariş sayfası getirilirken hata:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) {
     return (
       <div className="p-6">
@@ -57,6 +74,18 @@ export default function OrderList() {
       <div className="bg-white dark:bg-gray-800 rounded-xl border border-gray-200 dark:border-gray-700 h-[600px] overflow-y-auto">
         <OrderTable orders={orders} />
       </div>
+
+      {nextCursor && (
+        <div className="mt-4 flex justify-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 rounded-lg bg-blue-600 text-white hover:bg-blue-700 disabled:opacity-50"
+          >
+            {t('orders.loadMore')}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { Order, Anomaly, Notification, DashboardStats, ChartData, AnomalyTypeData, InventoryItem, InventoryUpdate } from '../types';
+import { Order, OrderPage, Anomaly, DetectionJob, Notification, DashboardStats, ChartData, AnomalyTypeData, InventoryItem, InventoryUpdate } from '../types';
 
 const API_BASE_URL = 'http://localhost:8000';
 
@@ -35,6 +35,32 @@ export const apiService = {
     }
   },
 
+  async getOrdersPage(filters?: {
+    status?: string;
+    date_from?: string;
+    date_to?: string;
+    search?: string;
+  }, cursor?: string | null, limit = 200): Promise<OrderPage> {
+    try {
+      const params = new URLSearchParams();
+      if (filters?.status && filters.status !== 'all') params.append('status', filters.status);
+      if (filters?.date_from) params.append('date_from', filters.date_from);
+      if (filters?.date_to) params.append('date_to', filters.date_to);
+      if (filters?.search) params.append('search', filters.search);
+      params.append('limit', limit.toString());
+      if (cursor) params.append('cursor', cursor);
+
+      const response = await api.get(`/orders?${params.toString()}`);
+      return {
+        orders: response.data,
+        nextCursor: response.headers['x-next-cursor'] ?? null,
+      };
+    } catch (error) {
+      console.error('Error fetching orders page:', error);
+      throw error;
+    }
+  },
+
   // Anomalies
   async getAnomalies(): Promise<Anomaly[]> {
     try {
@@ -109,10 +135,18 @@ export const apiService = {
     }
   },
 
-  async getChartData(): Promise<ChartData[]> {
+  async getChartData(range?: {
+    from?: string;
+    to?: string;
+    granularity?: 'hour' | 'day' | 'week';
+  }): Promise<ChartData[]> {
     try {
       console.log('Fetching chart data...');
-      const response = await api.get('/dashboard/chart-data');
+      const params = new URLSearchParams();
+      if (range?.from) params.append('from', range.from);
+      if (range?.to) params.append('to', range.to);
+      if (range?.granularity) params.append('granularity', range.granularity);
+      const response = await api.get(`/dashboard/chart-data?${params.toString()}`);
       console.log('Chart data response:', response);
       return response.data;
     } catch (error) {
@@ -158,18 +192,33 @@ export const apiService = {
   },
 
   // Anomaly Detection
-  async triggerAnomalyDetection(): Promise<any> {
+  // Tespit arka planda çalışır; iş bitene kadar durumu yoklanır
+  async triggerAnomalyDetection(timeoutMs = 30000): Promise<DetectionJob> {
     try {
       console.log('Triggering anomaly detection...');
       const response = await api.post('/anomalies/detect');
-      console.log('Anomaly detection response:', response);
-      return response.data;
+      let job: DetectionJob = response.data;
+      const deadline = Date.now() + timeoutMs;
+      while ((job.status === 'queued' || job.status === 'running') && Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, 300));
+        job = await apiService.getDetectionJob(job.job_id);
+      }
+      console.log('Anomaly detection job:', job);
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Anomaly detection failed');
+      }
+      return job;
     } catch (error) {
       console.error('Error triggering anomaly detection:', error);
       throw error;
     }
   },
 
+  async getDetectionJob(jobId: string): Promise<DetectionJob> {
+    const response = await api.get(`/anomalies/detect/${jobId}`);
+    return response.data;
+  },
+
   // Inventory
   async getInventory(): Promise<InventoryItem[]> {
     try {
@@ -9,6 +9,11 @@ export interface Order {
   severity?: 'low' | 'medium' | 'high';
 }
 
+export interface OrderPage {
+  orders: Order[];
+  nextCursor: string | null;
+}
+
 export interface Anomaly {
   id: string;
   type: string;
@@ -20,6 +25,37 @@ export interface Anomaly {
   cancel_rate_threshold?: number;
   late_shipping_threshold?: number;
   stock_out_threshold?: number;
+  scope?: 'product' | 'customer' | 'hour' | 'order' | null;
+  subject?: string | null;
+  source?: 'threshold' | 'group' | 'statistical' | null;
+  run_id?: string | null;
+}
+
+export interface DetectionWriteCounts {
+  inserted: number;
+  updated: number;
+  unchanged: number;
+  deleted: number;
+}
+
+export interface DetectionJob {
+  job_id: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  reasons: string[];
+  triggers: number;
+  requested_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  duration_ms: number | null;
+  // Sadece yazma sayıları; anomaliler /anomalies'ten okunur
+  result: {
+    run_id: string;
+    sources: Record<string, DetectionWriteCounts>;
+    total: DetectionWriteCounts;
+    new_anomalies_count: number;
+    active_anomalies_count: number;
+  } | null;
+  error: string | null;
 }
 
 export interface Notification {